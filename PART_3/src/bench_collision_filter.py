@@ -0,0 +1,62 @@
+''' Сравнение времени шага физики для двух способов сделать Ду проходящими сквозь друг друга.
+
+1. Обработчики столкновений (pre_solve возвращает False) -- Chipmunk вызывает Python для каждой пары Ду на каждом шаге.
+2. Фильтры столкновений (pm.ShapeFilter) -- пары Ду отбрасываются внутри Chipmunk.
+
+Свободные Ду создаются плотной кучей в игровой области, затем измеряется среднее время space.step.
+
+Запуск из консоли:
+	python bench_collision_filter.py --counts 100 1000 5000 --steps 30
+'''
+import argparse
+import random
+import time
+# Импортируем класс WorldState из файла world_state
+from world_state import WorldState
+# Импортируем класс Simulation из файла simulation
+from simulation import Simulation
+
+
+def measure_step_time(count, steps, native_filter, seed=0):
+	''' Функция для измерения среднего времени шага физики.
+
+	Аргументы:
+	----------
+	count : int
+		Число свободных Ду в куче.
+	steps : int
+		Число измеряемых шагов физики.
+	native_filter : bool
+		Используются ли фильтры столкновений вместо обработчиков.
+	seed : int
+		Зерно генератора случайных чисел (чтобы куча была одинаковой в обоих режимах).
+
+	Возвращаемое значение:
+	----------
+	float : Среднее время одного шага физики в миллисекундах.
+	'''
+	world = WorldState(400, 600)
+	simulation = Simulation(world, native_filter=native_filter)
+	rnd = random.Random(seed)
+	for i in range(count):
+		simulation.shape_creator.create_free_doo(rnd.uniform(20, world.width-20), rnd.uniform(100, world.ground_y-20))
+	space = simulation.space
+	dt = 1/simulation.fps
+	start = time.perf_counter()
+	for i in range(steps):
+		space.step(dt)
+	return (time.perf_counter() - start) / steps * 1000
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Время шага физики: обработчики столкновений против фильтров.')
+	parser.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 5000], help='число свободных Ду')
+	parser.add_argument('--steps', type=int, default=30, help='число измеряемых шагов')
+	args = parser.parse_args()
+
+	print('{0:>8} {1:>16} {2:>16} {3:>10}'.format('Ду', 'pre_solve, мс', 'ShapeFilter, мс', 'ускорение'))
+	for count in args.counts:
+		handlers = measure_step_time(count, args.steps, native_filter=False)
+		filters = measure_step_time(count, args.steps, native_filter=True)
+		print('{0:>8} {1:>16.3f} {2:>16.3f} {3:>9.1f}x'.format(count, handlers, filters, handlers/filters))
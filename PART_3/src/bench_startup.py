@@ -0,0 +1,171 @@
+''' Замер времени запуска игры (холодный старт).
+
+Каждый запуск выполняется в новом процессе Python (python bench_startup.py --child game), как при запуске игры из тестов.
+Процесс измеряет время этапов запуска и печатает их в последней строке вывода (JSON). Этапы игры:
+	interpreter -- запуск интерпретатора (время процесса, измеренное снаружи, минус время, измеренное внутри);
+	import_pygame, import_pymunk -- импорт библиотек;
+	import_game -- импорт модулей игры;
+	init, font, world, setup, first_frame -- инициализация pygame, загрузка шрифта, создание игровой области,
+	создание игровых объектов и первый кадр (см. атрибут startup_timer класса Game).
+Этапы режима без дисплея (--kind headless):
+	interpreter, import_pymunk, import_headless, setup (создание HeadlessGame), first_frame (один кадр).
+	Дополнительно проверяется, что модули только для дисплея (pygame) и NumPy не импортированы.
+
+Первый запуск выполняется без кэша шрифтов (см. модуль fonts), остальные -- с кэшем, поэтому первый запуск выводится отдельно.
+Для остальных выводятся медиана и минимум каждого этапа.
+Дисплей не нужен: по умолчанию используется видеодрайвер SDL dummy (--display -- настоящее окно).
+
+Запуск из консоли:
+	python bench_startup.py --runs 20 --out startup.json
+	python bench_startup.py --kind headless --runs 20
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Этапы запуска в порядке выполнения.
+PHASES = {
+	'game': ('interpreter', 'import_pygame', 'import_pymunk', 'import_game', 'init', 'font', 'world', 'setup', 'first_frame'),
+	'headless': ('interpreter', 'import_pymunk', 'import_headless', 'setup', 'first_frame'),
+}
+# Файл кэша шрифтов для замеров (отдельный, чтобы холодный запуск не удалял кэш игры).
+CACHE_PATH = os.path.join(tempfile.gettempdir(), 'world_of_doo_fonts_bench.json')
+
+
+def run_child(kind, font_cache):
+	''' Функция, выполняющая один запуск внутри процесса-потомка и печатающая время этапов.
+
+	Аргументы:
+	----------
+	kind : str
+		'game' или 'headless'.
+	font_cache : str или None
+		Путь к файлу кэша шрифтов. None -- без кэша.
+	'''
+	# Импортируем класс PhaseTimer из файла phase_timer
+	from phase_timer import PhaseTimer
+	timer = PhaseTimer()
+	if kind == 'game':
+		import pygame
+		timer.lap('import_pygame')
+		import pymunk
+		timer.lap('import_pymunk')
+		# Импортируем класс Game из файла game
+		from game import Game
+		timer.lap('import_game')
+		game = Game()
+		game.font_cache_path = font_cache
+		game.max_frames = 1
+		game.startup_timer = timer
+		try:
+			game.game_initialize()
+		except SystemExit:
+			pass
+	else:
+		import pymunk
+		timer.lap('import_pymunk')
+		# Импортируем класс HeadlessGame из файла headless
+		from headless import HeadlessGame
+		timer.lap('import_headless')
+		game = HeadlessGame()
+		timer.lap('setup')
+		game.simulation.frame((200, 300))
+		timer.lap('first_frame')
+	phases = {name: samples[0] * 1000 for name, samples in timer.samples.items()}
+	modules = {name: name in sys.modules for name in ('pygame', 'numpy')}
+	print(json.dumps({'phases': phases, 'modules': modules}))
+
+
+def measure(kind, font_cache, display=False):
+	''' Функция, выполняющая один запуск в новом процессе.
+
+	Аргументы:
+	----------
+	kind : str
+		'game' или 'headless'.
+	font_cache : str или None
+		Путь к файлу кэша шрифтов. None -- без кэша.
+	display : bool
+		Если True, то открывается настоящее окно (иначе видеодрайвер dummy).
+
+	Возвращаемое значение:
+	----------
+	dict : Время этапов в миллисекундах ('phases') и импортированные модули ('modules').
+	'''
+	env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+	if not display:
+		env['SDL_VIDEODRIVER'] = 'dummy'
+	command = [sys.executable, os.path.abspath(__file__), '--child', kind]
+	if font_cache is not None:
+		command += ['--font-cache', font_cache]
+	start = time.perf_counter()
+	output = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout
+	total = (time.perf_counter() - start) * 1000
+	result = json.loads(output.strip().splitlines()[-1])
+	result['phases']['interpreter'] = total - sum(result['phases'].values())
+	result['phases']['total'] = total
+	return result
+
+
+def summary(results, phases):
+	''' Функция, вычисляющая медиану и минимум времени каждого этапа.
+
+	Аргументы:
+	----------
+	results : list
+		Результаты функции measure.
+	phases : tuple
+		Названия этапов.
+
+	Возвращаемое значение:
+	----------
+	dict : Словарь {этап: {'median_ms': ..., 'min_ms': ...}}.
+	'''
+	stats = {}
+	for phase in phases + ('total',):
+		values = [result['phases'].get(phase, 0.0) for result in results]
+		stats[phase] = {'median_ms': statistics.median(values), 'min_ms': min(values)}
+	return stats
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то запускаем игру runs раз в новых процессах и выводим время этапов запуска.
+	'''
+	parser = argparse.ArgumentParser(description='Время запуска World of Doo.')
+	parser.add_argument('--kind', choices=list(PHASES), default='game', help='игра или режим без дисплея')
+	parser.add_argument('--runs', type=int, default=10, help='число запусков')
+	parser.add_argument('--no-font-cache', action='store_true', help='не использовать кэш шрифтов (шрифт ищется при каждом запуске)')
+	parser.add_argument('--display', action='store_true', help='открывать настоящее окно (по умолчанию видеодрайвер dummy)')
+	parser.add_argument('--out', default=None, help='файл для результатов (JSON)')
+	parser.add_argument('--child', choices=list(PHASES), default=None, help=argparse.SUPPRESS)
+	parser.add_argument('--font-cache', default=None, help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.child is not None:
+		run_child(args.child, args.font_cache)
+		sys.exit()
+
+	font_cache = None if args.no_font_cache else CACHE_PATH
+	if font_cache is not None and os.path.exists(font_cache):
+		os.remove(font_cache)
+	phases = PHASES[args.kind]
+	results = [measure(args.kind, font_cache, args.display) for i in range(args.runs)]
+	first = results[0]
+	stats = summary(results[1:] or results, phases)
+	print('{0:<16} {1:>12} {2:>12} {3:>12}'.format('этап', 'первый, мс', 'медиана, мс', 'минимум, мс'))
+	for phase in phases + ('total',):
+		print('{0:<16} {1:>12.1f} {2:>12.1f} {3:>12.1f}'.format(phase, first['phases'].get(phase, 0.0), stats[phase]['median_ms'], stats[phase]['min_ms']))
+	if args.kind == 'headless':
+		print('импортированы: ' + ', '.join('{0} -- {1}'.format(name, 'да' if imported else 'нет') for name, imported in first['modules'].items()))
+	if args.out is not None:
+		with open(args.out, 'w', encoding='utf-8') as f:
+			json.dump({'kind': args.kind, 'runs': args.runs, 'font_cache': font_cache is not None, 'python': platform.python_version(),
+						'platform': platform.platform(), 'first': first, 'summary': stats, 'results': results}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,146 @@
+''' Отчет о масштабировании шага физики по числу потоков (см. параметр threads класса Simulation).
+
+Для каждого числа тел измеряется среднее время space.step в однопоточном и в многопоточном пространстве симуляции
+в двух сценариях:
+	tower -- готовые башни из фиксированных Ду (много пружин, см. функцию generate_level модуля level);
+	rain -- дождь из свободных Ду над игровой областью (много контактов с полом, пружин нет).
+Сначала симуляция идет warmup шагов, чтобы тела успели упасть и появились контакты.
+
+В конце печатается порог: наименьшее число тел, начиная с которого многопоточное пространство быстрее хотя бы на 10% во всех сценариях.
+Его можно записать в Simulation.thread_bodies. Если многопоточное пространство нигде не быстрее
+(например, у процессора одно ядро), то автоматический выбор должен оставлять один поток.
+
+Запуск из консоли:
+	python bench_threads.py --counts 500 2000 5000 --steps 60 --out threads.json
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import time
+# Импортируем класс HeadlessGame из файла headless
+from headless import HeadlessGame
+# Импортируем функцию generate_level из файла level
+from level import generate_level
+# Импортируем константу MAX_THREADS из файла simulation
+from simulation import MAX_THREADS
+
+
+def create_game(scenario, count, threads, seed=0):
+	''' Функция, создающая симуляцию для сценария.
+
+	Аргументы:
+	----------
+	scenario : str
+		'tower' или 'rain'.
+	count : int
+		Число Ду.
+	threads : int
+		Число потоков.
+	seed : int
+		Зерно генератора случайных чисел (чтобы сцена была одинаковой при любом числе потоков).
+
+	Возвращаемое значение:
+	----------
+	HeadlessGame : Игра без дисплея.
+	'''
+	if scenario == 'tower':
+		level = generate_level(count, seed=seed)
+		return HeadlessGame(level.width, level.height, level=level, threads=threads)
+	game = HeadlessGame(threads=threads)
+	world = game.world
+	rnd = random.Random(seed)
+	for i in range(count):
+		game.simulation.shape_creator.create_free_doo(rnd.uniform(20, world.width-20), rnd.uniform(-2000, world.ground_y-300))
+	return game
+
+
+def measure_step_time(scenario, count, threads, steps, warmup):
+	''' Функция для измерения среднего времени шага физики.
+
+	Аргументы:
+	----------
+	scenario : str
+		'tower' или 'rain'.
+	count : int
+		Число Ду.
+	threads : int
+		Число потоков.
+	steps : int
+		Число измеряемых шагов физики.
+	warmup : int
+		Число шагов перед измерением.
+
+	Возвращаемое значение:
+	----------
+	float : Среднее время одного шага физики в миллисекундах.
+	'''
+	simulation = create_game(scenario, count, threads).simulation
+	space = simulation.space
+	dt = 1/simulation.fps
+	for i in range(warmup):
+		space.step(dt)
+	start = time.perf_counter()
+	for i in range(steps):
+		space.step(dt)
+	return (time.perf_counter() - start) / steps * 1000
+
+
+def threshold(results, speedup=1.1):
+	''' Функция, находящая наименьшее число тел, начиная с которого многопоточное пространство быстрее во всех сценариях.
+
+	Аргументы:
+	----------
+	results : list
+		Строки отчета: словари с ключами 'count' и 'speedup' (по сценариям).
+	speedup : float
+		Наименьшее ускорение, ради которого стоит включать потоки.
+
+	Возвращаемое значение:
+	----------
+	int или None : Порог числа тел. None -- потоки не помогают ни на каком числе тел.
+	'''
+	found = None
+	for row in sorted(results, key=lambda row: row['count'], reverse=True):
+		if min(row['speedup'].values()) < speedup:
+			break
+		found = row['count']
+	return found
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то измеряем время шага и печатаем отчет.
+	'''
+	parser = argparse.ArgumentParser(description='Время шага физики World of Doo в зависимости от числа потоков.')
+	parser.add_argument('--counts', type=int, nargs='+', default=[250, 1000, 2000, 5000], help='число Ду')
+	parser.add_argument('--scenarios', nargs='+', default=['tower', 'rain'], choices=['tower', 'rain'], help='сценарии')
+	parser.add_argument('--steps', type=int, default=60, help='число измеряемых шагов')
+	parser.add_argument('--warmup', type=int, default=30, help='число шагов перед измерением')
+	parser.add_argument('--out', default=None, help='файл для результатов (JSON)')
+	args = parser.parse_args()
+
+	print('ядер процессора: {0}'.format(os.cpu_count()))
+	print('{0:>8} {1:>8} {2:>12} {3:>12} {4:>10}'.format('Ду', 'сценарий', '1 поток, мс', '{0} потока, мс'.format(MAX_THREADS), 'ускорение'))
+	results = []
+	for count in args.counts:
+		row = {'count': count, 'single_ms': {}, 'threaded_ms': {}, 'speedup': {}}
+		for scenario in args.scenarios:
+			single = measure_step_time(scenario, count, 1, args.steps, args.warmup)
+			threaded = measure_step_time(scenario, count, MAX_THREADS, args.steps, args.warmup)
+			row['single_ms'][scenario] = single
+			row['threaded_ms'][scenario] = threaded
+			row['speedup'][scenario] = single / threaded
+			print('{0:>8} {1:>8} {2:>12.3f} {3:>12.3f} {4:>9.2f}x'.format(count, scenario, single, threaded, single / threaded))
+		results.append(row)
+
+	bodies = threshold(results)
+	if bodies is None:
+		print('Многопоточное пространство не быстрее ни на каком числе тел: автоматический выбор должен оставлять один поток.')
+	else:
+		print('Многопоточное пространство быстрее, начиная с {0} тел: Simulation.thread_bodies = {0}'.format(bodies))
+	if args.out is not None:
+		with open(args.out, 'w', encoding='utf-8') as f:
+			json.dump({'cpu_count': os.cpu_count(), 'platform': platform.platform(), 'steps': args.steps,
+						'results': results, 'thread_bodies': bodies}, f, indent=2)
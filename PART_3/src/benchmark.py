@@ -0,0 +1,365 @@
+''' Набор тестов производительности (бенчмарков) для горячих участков симуляции и отрисовки.
+
+Сценарии:
+	start -- только стартовая конструкция;
+	tower -- высокая башня из n фиксированных Ду, построенная через ShapeCreator.build;
+	rain -- дождь из n свободных Ду, созданных через create_free_doo;
+	spawner -- каждую секунду n свободных Ду появляются за стеной и сразу удаляются remove_escaped_doos (работает пул Ду);
+	drag -- схваченный Ду непрерывно перетаскивается вдоль башни из n узлов (работает Graph.find_fixed_doo_for_build);
+	view -- та же башня, что и в tower, но камера (Viewport) показывает только её низ: время draw не должно зависеть от n.
+
+Каждый кадр делится на этапы: step (space.step), remove_escaped, candidates (поиск узлов для строительства),
+draw (отрисовка на поверхности world) и flip (копирование на экран и pg.display.update).
+Для каждого этапа выводятся процентили времени и статистика пула Ду (см. модуль pool). Затем тот же сценарий повторяется с включенным tracemalloc,
+чтобы измерить выделение памяти (tracemalloc сильно замедляет работу, поэтому время в этом проходе не измеряется).
+
+Результаты сохраняются в JSON, чтобы сравнивать их между коммитами.
+Дисплей не нужен: используется видеодрайвер SDL dummy.
+
+Запуск из консоли:
+	python benchmark.py --scenarios start tower rain drag --n 1000 --frames 300 --out bench.json
+	python benchmark.py --scenarios spawner --pool-capacity 0 --out bench_no_pool.json
+'''
+import os
+# Видеодрайвер нужно выбрать до импорта pygame.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+import pygame as pg
+import pymunk as pm
+# Импортируем класс World из файла world
+from world import World
+# Импортируем класс Simulation из файла simulation
+from simulation import Simulation
+# Импортируем класс DooRenderer из файла renderer
+from renderer import DooRenderer
+# Импортируем класс PhaseTimer из файла phase_timer
+from phase_timer import PhaseTimer
+# Импортируем класс Viewport из файла viewport
+from viewport import Viewport
+
+
+# Этапы кадра в порядке выполнения.
+PHASES = ('step', 'remove_escaped', 'candidates', 'draw', 'flip')
+# Процентили, которые попадают в результаты.
+POINTS = (50, 90, 99)
+
+
+class Scenario():
+	''' Класс, описывающий один сценарий: игровую область, симуляцию и отрисовку.
+
+	В подклассах переопределяются методы setup (создание игровых объектов) и before_frame (действия игрока перед кадром).
+
+	Аргументы:
+	----------
+	n : int
+		Размер сценария (число Ду или узлов башни).
+	seed : int
+		Зерно генератора случайных чисел.
+	pool_capacity : int
+		Размер пула Ду (0 -- пул выключен).
+	sleep_time : float или None
+		Время покоя, после которого острова тел засыпают (None -- режим сна выключен).
+
+	Атрибуты:
+	----------
+	n : int
+		Размер сценария.
+	rnd : random.Random
+		Генератор случайных чисел.
+	camera : pygame.Surface
+		Экран (видеодрайвер dummy).
+	world : World
+		Игровая область.
+	simulation : Simulation
+		Симуляция.
+	renderer : DooRenderer
+		Объект для отрисовки пространства симуляции.
+	frame_number : int
+		Номер текущего кадра.
+	'''
+	name = None
+
+	def __init__(self, n, seed=0, pool_capacity=512, sleep_time=None):
+		self.n 				= n
+		self.rnd 			= random.Random(seed)
+		self.camera 		= pg.display.set_mode((400, 600))
+		self.world 			= World(400, 600, self.camera)
+		self.simulation 	= Simulation(self.world, pool_capacity=pool_capacity, sleep_time=sleep_time)
+		self.renderer 		= DooRenderer(self.world, self.simulation.space)
+		self.frame_number 	= 0
+		self.setup()
+
+	def setup(self):
+		''' Метод для создания игровых объектов сценария.
+		'''
+
+	def before_frame(self):
+		''' Метод для действий игрока перед кадром. Возвращает координаты курсора мыши.
+		'''
+		return self.simulation.mouse_pos
+
+	def frame(self, timer=None):
+		''' Метод, выполняющий один кадр игры так же, как игровой цикл (один шаг физики на кадр).
+
+		Аргументы:
+		----------
+		timer : PhaseTimer или None
+			Таймер для измерения времени этапов.
+		'''
+		simulation = self.simulation
+		world = self.world
+		simulation.handle_input(self.before_frame())
+		simulation.timer = timer
+		simulation.step()
+		if timer is not None:
+			timer.start()
+		self.renderer.space = simulation.space
+		self.renderer.draw()
+		if world.shape_being_dragged is not None:
+			world.draw_build_hint(simulation.graph)
+		world.draw_circle()
+		if timer is not None:
+			timer.lap('draw')
+		pg.display.update(world.blit_me())
+		if timer is not None:
+			timer.lap('flip')
+		self.frame_number += 1
+
+
+class StartScenario(Scenario):
+	''' Только стартовая конструкция.
+	'''
+	name = 'start'
+
+
+class TowerScenario(Scenario):
+	''' Высокая башня из n фиксированных Ду.
+
+	Башня -- лента из треугольников шириной width и с шагом step по высоте.
+	Каждый новый узел строится так же, как в игре: свободный Ду схвачен, fixed_doo_for_build -- два последних узла,
+	затем вызывается World.release_picked_doo, т.е. ShapeCreator.build.
+	'''
+	name = 'tower'
+	step = 40
+
+	def setup(self):
+		simulation = self.simulation
+		world = self.world
+		graph = simulation.graph
+		# Верхние узлы стартовой конструкции -- два последних добавленных в граф.
+		nodes = list(graph)[-2:]
+		for i in range(self.n):
+			a, b = nodes[-2], nodes[-1]
+			x = a.body.position.x
+			y = a.body.position.y - self.step
+			world.shape_being_dragged = simulation.shape_creator.create_free_doo(x, y)
+			graph.fixed_doo_for_build[:] = [a, b]
+			world.release_picked_doo(graph, simulation.shape_creator)
+			nodes.append(list(graph)[-1])
+		graph.fixed_doo_for_build.clear()
+
+
+class ViewScenario(TowerScenario):
+	''' Высокая башня из n фиксированных Ду, из которой на экране видна только нижняя часть.
+
+	Рисуются только Ду и пружины, попавшие в запрос space.bb_query (см. DooRenderer.draw_view).
+	'''
+	name = 'view'
+
+	def setup(self):
+		super().setup()
+		self.world.viewport = Viewport(self.world.get_width(), self.world.get_height(), self.world.width, self.world.height)
+		self.renderer.viewport = self.world.viewport
+		self.renderer.graph = self.simulation.graph
+
+
+class RainScenario(Scenario):
+	''' Дождь из n свободных Ду над игровой областью.
+	'''
+	name = 'rain'
+
+	def setup(self):
+		world = self.world
+		for i in range(self.n):
+			self.simulation.shape_creator.create_free_doo(self.rnd.uniform(20, world.width-20), self.rnd.uniform(-2000, world.ground_y-300))
+
+
+class SpawnerScenario(Scenario):
+	''' Поток свободных Ду: каждую секунду (fps кадров) появляются n Ду.
+
+	Ду появляются за правой стеной, поэтому на следующем шаге удаляются методом remove_escaped_doos.
+	Так измеряется стоимость создания и удаления Ду, а не физика.
+	'''
+	name = 'spawner'
+
+	def before_frame(self):
+		world = self.world
+		simulation = self.simulation
+		count = self.n * (self.frame_number + 1) // simulation.fps - self.n * self.frame_number // simulation.fps
+		for i in range(count):
+			simulation.shape_creator.create_free_doo(world.width + 20, self.rnd.uniform(50, world.ground_y - 50))
+		return simulation.mouse_pos
+
+
+class DragScenario(TowerScenario):
+	''' Схваченный Ду, который непрерывно перетаскивается вдоль башни из n узлов.
+
+	Курсор каждый кадр переходит к следующему узлу башни (со смещением вбок), поэтому поиск узлов для строительства
+	всегда находит кандидатов, а строительство не происходит (кнопка мыши не отпускается).
+	'''
+	name = 'drag'
+
+	def setup(self):
+		super().setup()
+		self.nodes = list(self.simulation.graph)
+		position = self.nodes[0].body.position
+		self.simulation.shape_creator.create_free_doo(position.x + 30, position.y - 30)
+		self.simulation.handle_input((position.x + 30, position.y - 30), ['pick'])
+
+	def before_frame(self):
+		position = self.nodes[self.frame_number % len(self.nodes)].body.position
+		angle = self.frame_number * 0.1
+		return (position.x + 30*math.cos(angle), position.y - 30*abs(math.sin(angle)))
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (StartScenario, TowerScenario, ViewScenario, RainScenario, SpawnerScenario, DragScenario)}
+
+
+def measure(scenario_class, n, frames, warmup, alloc_frames, seed=0, pool_capacity=512, sleep_time=None):
+	''' Функция для измерения одного сценария.
+
+	Аргументы:
+	----------
+	scenario_class : type
+		Класс сценария.
+	n : int
+		Размер сценария.
+	frames : int
+		Число измеряемых кадров.
+	warmup : int
+		Число кадров перед измерением (заполняются кэши отрисовки, башня начинает падать и т.д.).
+	alloc_frames : int
+		Число кадров для измерения выделения памяти.
+	seed : int
+		Зерно генератора случайных чисел.
+	pool_capacity : int
+		Размер пула Ду (0 -- пул выключен).
+	sleep_time : float или None
+		Время покоя, после которого острова тел засыпают (None -- режим сна выключен).
+
+	Возвращаемое значение:
+	----------
+	dict : Результаты сценария.
+	'''
+	start = time.perf_counter()
+	scenario = scenario_class(n, seed, pool_capacity, sleep_time)
+	setup_time = time.perf_counter() - start
+	for i in range(warmup):
+		scenario.frame()
+	timer = PhaseTimer()
+	for i in range(frames):
+		scenario.frame(timer)
+	phases = {}
+	for phase in PHASES:
+		samples = timer.samples.get(phase, [])
+		if not samples:
+			continue
+		result = {'mean_ms': sum(samples) / len(samples) * 1000, 'max_ms': max(samples) * 1000}
+		for point, value in timer.percentiles(phase, POINTS).items():
+			result['p{0}_ms'.format(point)] = value * 1000
+		phases[phase] = result
+	pool = scenario.simulation.shape_creator.pool.stats()
+	active, sleeping = scenario.simulation.sleep_counts()
+
+	# Второй проход: выделение памяти. Сценарий создается заново, чтобы кадры были такими же.
+	scenario = scenario_class(n, seed, pool_capacity, sleep_time)
+	for i in range(warmup):
+		scenario.frame()
+	tracemalloc.start()
+	tracemalloc.reset_peak()
+	before, _ = tracemalloc.get_traced_memory()
+	snapshot = tracemalloc.take_snapshot()
+	for i in range(alloc_frames):
+		scenario.frame()
+	after, peak = tracemalloc.get_traced_memory()
+	blocks = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'))
+	tracemalloc.stop()
+
+	return {
+		'n': n,
+		'bodies': len(scenario.simulation.space.bodies),
+		'constraints': len(scenario.simulation.space.constraints),
+		'sleeping': sleeping,
+		'drawn': {'doos': scenario.renderer.drawn[0], 'springs': scenario.renderer.drawn[1]},
+		'setup_ms': setup_time * 1000,
+		'frames': frames,
+		'phases': phases,
+		'pool': pool,
+		'alloc': {
+			'frames': alloc_frames,
+			'peak_kib': (peak - before) / 1024,
+			'retained_kib': (after - before) / 1024,
+			'retained_blocks': blocks,
+		},
+	}
+
+
+def git_commit():
+	''' Функция, возвращающая текущий коммит git (или None, если git недоступен).
+	'''
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то измеряем выбранные сценарии, выводим таблицу и сохраняем JSON.
+	'''
+	parser = argparse.ArgumentParser(description='Бенчмарки World of Doo (без дисплея).')
+	parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS), help='сценарии')
+	parser.add_argument('--n', type=int, default=1000, help='размер сценариев tower, view, rain, spawner и drag')
+	parser.add_argument('--frames', type=int, default=300, help='число измеряемых кадров')
+	parser.add_argument('--warmup', type=int, default=30, help='число кадров перед измерением')
+	parser.add_argument('--alloc-frames', type=int, default=30, help='число кадров для измерения памяти')
+	parser.add_argument('--seed', type=int, default=0, help='зерно генератора случайных чисел')
+	parser.add_argument('--pool-capacity', type=int, default=512, help='размер пула Ду (0 -- пул выключен)')
+	parser.add_argument('--sleep-time', type=float, default=None, help='время покоя до засыпания островов тел (по умолчанию сон выключен)')
+	parser.add_argument('--out', default='benchmark.json', help='файл для результатов')
+	args = parser.parse_args()
+
+	pg.init()
+	results = {
+		'commit': git_commit(),
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'pygame': pg.version.ver,
+		'pymunk': pm.version,
+		'pool_capacity': args.pool_capacity,
+		'sleep_time': args.sleep_time,
+		'platform': platform.platform(),
+		'scenarios': {},
+	}
+	for name in args.scenarios:
+		result = measure(SCENARIOS[name], args.n, args.frames, args.warmup, args.alloc_frames, args.seed, args.pool_capacity, args.sleep_time)
+		results['scenarios'][name] = result
+		print('{0} (тел: {1}, спят: {2}, пружин: {3}, нарисовано Ду: {4}, пружин: {5}, подготовка {6:.0f} мс)'.format(name, result['bodies'], result['sleeping'],
+			result['constraints'], result['drawn']['doos'], result['drawn']['springs'], result['setup_ms']))
+		for phase, stats in result['phases'].items():
+			print('  {0:<15} p50 {1:8.3f} мс   p90 {2:8.3f} мс   p99 {3:8.3f} мс'.format(phase, stats['p50_ms'], stats['p90_ms'], stats['p99_ms']))
+		pool = result['pool']
+		print('  пул Ду: размер {0}, попаданий {1:.1%} ({2} из {3})'.format(pool['size'], pool['hit_rate'], pool['hits'], pool['hits'] + pool['misses']))
+		alloc = result['alloc']
+		print('  память: пик {0:.1f} КиБ, осталось {1:.1f} КиБ ({2} блоков) за {3} кадров'.format(
+			alloc['peak_kib'], alloc['retained_kib'], alloc['retained_blocks'], alloc['frames']))
+	with open(args.out, 'w', encoding='utf-8') as f:
+		json.dump(results, f, ensure_ascii=False, indent=2)
+	print('Результаты сохранены в', args.out)
@@ -0,0 +1,275 @@
+''' Запись кадров игры в файл без остановки игрового цикла.
+
+В каждом кадре игровой цикл передает экран (или любую другую поверхность) в FrameCapture.capture.
+Метод только копирует пиксели поверхности одним вызовом (surface.get_buffer().raw -- буфер пикселей,
+на котором построены и представления pygame.surfarray.pixels*, без преобразования каждого пикселя)
+и кладет копию в ограниченную очередь. Преобразование и запись в файл выполняет фоновый поток.
+Если очередь заполнена (диск не успевает), то кадр выбрасывается: игровой цикл никогда не ждет записи.
+
+Форматы:
+	raw -- все кадры подряд в одном файле, пиксели как в памяти поверхности (строки по pitch байт).
+		Рядом записывается файл path + '.json' с размером кадра, форматом пикселей, числом записанных и выброшенных кадров
+		и временем каждого кадра. Если формат пикселей известен ffmpeg (pix_fmt), то из записи можно сделать видео:
+			ffmpeg -f rawvideo -pix_fmt bgr0 -s 400x600 -r 60 -i session.raw session.mp4
+		Функция load_frames читает запись в массив NumPy (кадры, высота, ширина, 3) в порядке RGB.
+	png -- по файлу PNG на кадр. path -- шаблон имени с номером кадра, например 'frames/frame_%05d.png'.
+		PNG кодируется функцией encode_png, а не pg.image.save: pg.image.save не отпускает GIL на время сжатия
+		и останавливал бы игровой цикл, а zlib.compress отпускает.
+
+NumPy нужен только функции load_frames.
+'''
+import json
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+import pygame as pg
+
+
+# Форматы пикселей ffmpeg для 32-битных поверхностей: маски (R, G, B) -> pix_fmt (при порядке байт little-endian).
+PIX_FMTS = {
+	(0xff0000, 0xff00, 0xff): 'bgr0',
+	(0xff, 0xff00, 0xff0000): 'rgb0',
+}
+
+
+class FrameCapture():
+	''' Класс для записи кадров в фоновом потоке.
+
+	Аргументы:
+	----------
+	path : str
+		Файл записи (raw) или шаблон имени файлов с номером кадра (png).
+	format : str
+		'raw' или 'png'.
+	queue_size : int
+		Наибольшее число кадров, ожидающих записи. Если очередь заполнена, то новые кадры выбрасываются.
+
+	Атрибуты:
+	----------
+	path : str
+		Файл записи или шаблон имени файлов.
+	format : str
+		'raw' или 'png'.
+	queue : queue.Queue
+		Очередь кадров для фонового потока: кортежи (время_кадра, байты_пикселей) и None (конец записи).
+	writer : threading.Thread
+		Фоновый поток, записывающий кадры.
+	size : tuple или None
+		Размер кадра (ширина, высота). Задается первым кадром, кадры другого размера не записываются.
+	pitch : int
+		Длина строки пикселей в байтах.
+	bitsize : int
+		Число бит на пиксель.
+	masks : tuple
+		Маски каналов (R, G, B, A) пикселя поверхности.
+	pix_fmt : str или None
+		Формат пикселей для ffmpeg. None -- формат неизвестен ffmpeg (тогда кадры записываются в формате RGB, см. метод capture).
+	frame_count : int
+		Число кадров, переданных в capture.
+	written : int
+		Число записанных кадров.
+	dropped : int
+		Число кадров, выброшенных из-за заполненной очереди.
+	times : list
+		Время каждого записанного кадра в секундах от первого кадра (в порядке записи).
+	start : float или None
+		Момент первого кадра (time.perf_counter).
+	stream : file или None
+		Открытый файл записи (raw).
+	error : Exception или None
+		Ошибка, остановившая фоновый поток (например, файл записи не открылся). Перевыбрасывается методом close.
+	'''
+	def __init__(self, path, format='raw', queue_size=16):
+		if format not in ('raw', 'png'):
+			raise ValueError('Неизвестный формат записи: {0}'.format(format))
+		self.path 			= path
+		self.format 		= format
+		self.queue 			= queue.Queue(queue_size)
+		self.writer 		= threading.Thread(target=self.write_frames, name='capture', daemon=True)
+		self.size 			= None
+		self.pitch 			= 0
+		self.bitsize 		= 0
+		self.masks 			= (0, 0, 0, 0)
+		self.pix_fmt 		= None
+		self.frame_count 	= 0
+		self.written 		= 0
+		self.dropped 		= 0
+		self.times 			= []
+		self.start 			= None
+		self.stream 		= None
+		self.error 			= None
+		self.writer.start()
+
+
+	def capture(self, surface):
+		''' Метод, передающий кадр в фоновый поток. Никогда не ждет: если очередь заполнена, то кадр выбрасывается.
+
+		32-битные поверхности копируются как есть (один вызов get_buffer().raw).
+		Остальные поверхности преобразуются в RGB вызовом pg.image.tobytes (тоже один вызов, но с преобразованием).
+
+		Аргументы:
+		----------
+		surface : pygame.Surface
+			Поверхность (обычно экран игры).
+		'''
+		now = time.perf_counter()
+		if self.size is None:
+			self.start = now
+			self.size = surface.get_size()
+			self.bitsize = surface.get_bitsize()
+			self.masks = surface.get_masks()
+			if self.bitsize == 32 and sys.byteorder == 'little':
+				self.pix_fmt = PIX_FMTS.get(self.masks[:3])
+			self.pitch = surface.get_pitch() if self.pix_fmt is not None else self.size[0] * 3
+		elif surface.get_size() != self.size:
+			return
+		self.frame_count += 1
+		if self.queue.full() or self.error is not None:
+			self.dropped += 1
+			return
+		if self.pix_fmt is not None:
+			data = surface.get_buffer().raw
+		else:
+			data = pg.image.tobytes(surface, 'RGB')
+		try:
+			self.queue.put_nowait((now - self.start, data))
+		except queue.Full:
+			self.dropped += 1
+
+	def write_frames(self):
+		''' Метод, выполняющийся в фоновом потоке: берет кадры из очереди и записывает их, пока не получит None.
+
+		Если запись не удалась, то ошибка сохраняется в атрибуте error и поток завершается
+		(после этого capture выбрасывает все кадры, а close перевыбрасывает ошибку).
+		'''
+		try:
+			while True:
+				item = self.queue.get()
+				if item is None:
+					break
+				moment, data = item
+				if self.format == 'raw':
+					if self.stream is None:
+						self.stream = open(self.path, 'wb')
+					self.stream.write(data)
+				else:
+					with open(self.path % self.written, 'wb') as f:
+						f.write(encode_png(self.rgb_bytes(data), self.size))
+				self.times.append(moment)
+				self.written += 1
+		except Exception as error:
+			self.error = error
+
+	def rgb_bytes(self, data):
+		''' Метод, преобразующий байты кадра в формат RGB (для записи PNG).
+
+		Аргументы:
+		----------
+		data : bytes
+			Пиксели кадра.
+
+		Возвращаемое значение:
+		----------
+		bytes : Пиксели кадра в формате RGB, строка за строкой.
+		'''
+		if self.pix_fmt is None:
+			return data
+		# Поверхность с теми же масками, что и у исходной: пиксели копируются в неё без преобразования.
+		frame = pg.Surface(self.size, 0, self.bitsize, self.masks)
+		frame.get_buffer().write(data)
+		return pg.image.tobytes(frame, 'RGB')
+
+	def close(self):
+		''' Метод, завершающий запись: ждет, пока фоновый поток запишет все кадры из очереди, и закрывает файл.
+
+		Для формата raw рядом с записью сохраняется файл path + '.json' с описанием кадров.
+		Если фоновый поток остановился из-за ошибки, то файл закрывается и ошибка выбрасывается снова
+		(поток уже не берет кадры из очереди, поэтому ждать его нельзя).
+
+		Возвращаемое значение:
+		----------
+		dict : Описание записи (размер кадра, формат пикселей, числа записанных и выброшенных кадров).
+		'''
+		# Ждем с таймаутом: если поток остановился из-за ошибки, пока очередь заполнена, то put(None) ждал бы вечно.
+		while self.writer.is_alive():
+			try:
+				self.queue.put(None, timeout=0.1)
+			except queue.Full:
+				continue
+			self.writer.join()
+		if self.stream is not None:
+			self.stream.close()
+			self.stream = None
+		if self.error is not None:
+			raise self.error
+		info = {
+			'format': self.format,
+			'width': self.size[0] if self.size else 0,
+			'height': self.size[1] if self.size else 0,
+			'pitch': self.pitch,
+			'pix_fmt': self.pix_fmt or 'rgb24',
+			'frames': self.written,
+			'dropped': self.dropped,
+			'times': self.times,
+		}
+		if self.format == 'raw':
+			with open(self.path + '.json', 'w', encoding='utf-8') as f:
+				json.dump(info, f)
+		return info
+
+
+def encode_png(rgb, size, level=6):
+	''' Функция, кодирующая кадр в формате RGB в файл PNG (8 бит на канал, без фильтров строк).
+
+	Аргументы:
+	----------
+	rgb : bytes
+		Пиксели кадра в формате RGB, строка за строкой.
+	size : tuple
+		Размер кадра (ширина, высота).
+	level : int
+		Степень сжатия zlib (от 1 -- быстро до 9 -- сильно).
+
+	Возвращаемое значение:
+	----------
+	bytes : Содержимое файла PNG.
+	'''
+	width, height = size
+	stride = width * 3
+	# Каждая строка начинается с байта типа фильтра (0 -- без фильтра).
+	rows = b''.join(b'\x00' + rgb[y*stride:(y+1)*stride] for y in range(height))
+
+	def chunk(kind, data):
+		return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+	header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+	return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows, level)) + chunk(b'IEND', b'')
+
+
+def load_frames(path):
+	''' Функция, читающая запись формата raw в массив NumPy.
+
+	Аргументы:
+	----------
+	path : str
+		Файл записи (рядом должен лежать path + '.json').
+
+	Возвращаемое значение:
+	----------
+	numpy.ndarray : Кадры, массив (кадры, высота, ширина, 3) типа uint8 в порядке RGB.
+	'''
+	# NumPy нужен только для чтения записи, поэтому импортируем его только здесь.
+	import numpy as np
+	with open(path + '.json', encoding='utf-8') as f:
+		info = json.load(f)
+	width, height, pitch = info['width'], info['height'], info['pitch']
+	data = np.fromfile(path, dtype=np.uint8)
+	frames = data[:info['frames'] * height * pitch].reshape(info['frames'], height, pitch)
+	if info['pix_fmt'] == 'rgb24':
+		return frames[:, :, :width*3].reshape(-1, height, width, 3)
+	pixels = frames[:, :, :width*4].reshape(-1, height, width, 4)
+	# bgr0: байты пикселя B, G, R, X; rgb0: R, G, B, X.
+	return pixels[..., 2::-1] if info['pix_fmt'] == 'bgr0' else pixels[..., :3]
@@ -0,0 +1,152 @@
+from collections import deque
+from itertools import count
+
+
+class Connectivity():
+	''' Класс, хранящий компоненты связности графа башни и обновляющий их при добавлении и удалении ребер.
+
+	Каждому узлу сопоставлен номер компоненты (component), каждой компоненте -- множество её узлов (members).
+	Вопрос "связаны ли два узла" решается сравнением номеров компонент за O(1), без обхода графа.
+
+	Добавление ребра: если концы в разных компонентах, то узлы меньшей компоненты переносим в большую.
+	Каждый узел переносится в компоненту хотя бы вдвое большей, поэтому на один узел приходится O(log n) переносов.
+	Удаление ребра: запускаем обход в ширину одновременно от обоих концов ребра (по одному узлу с каждой стороны по очереди).
+	Если обходы встретились, то компонента не распалась. Если один обход закончился раньше, то найденные им узлы
+	отделились -- переносим их в новую компоненту. Так работа пропорциональна меньшей из частей, а не всему графу.
+
+	Атрибуты:
+	----------
+	component : dict
+		Словарь component[узел] = номер компоненты.
+	members : dict
+		Словарь members[номер компоненты] = множество узлов.
+	ids : itertools.count
+		Генератор номеров новых компонент.
+	'''
+	def __init__(self):
+		self.component 	= {}
+		self.members 	= {}
+		self.ids 		= count()
+
+
+	def clear(self):
+		''' Метод для удаления всех узлов.
+		'''
+		self.component.clear()
+		self.members.clear()
+
+	def add_node(self, node):
+		''' Метод для добавления узла без ребер (новая компонента из одного узла).
+
+		Аргументы:
+		----------
+		node : DooFixed
+			Узел графа.
+		'''
+		if node not in self.component:
+			i = next(self.ids)
+			self.component[node] = i
+			self.members[i] = {node}
+
+	def add_edge(self, a, b):
+		''' Метод, объединяющий компоненты концов нового ребра.
+
+		Аргументы:
+		----------
+		a, b : DooFixed
+			Концы ребра.
+		'''
+		ca = self.component[a]
+		cb = self.component[b]
+		if ca == cb:
+			return
+		if len(self.members[ca]) < len(self.members[cb]):
+			ca, cb = cb, ca
+		moved = self.members.pop(cb)
+		for node in moved:
+			self.component[node] = ca
+		self.members[ca] |= moved
+
+	def remove_edge(self, a, b, adjacency):
+		''' Метод, обновляющий компоненты после удаления ребра (a, b). Ребро уже должно быть удалено из adjacency.
+
+		Аргументы:
+		----------
+		a, b : DooFixed
+			Концы удаленного ребра.
+		adjacency : dict
+			Соседи узлов: adjacency[узел] = {соседний_узел: ...} (см. класс Graph).
+
+		Возвращаемое значение:
+		----------
+		set : Узлы, отделившиеся в новую компоненту (пустое множество, если компонента не распалась).
+			Возвращается копия: множество members новой компоненты меняется при следующих изменениях графа.
+		'''
+		if self.component[a] != self.component[b]:
+			return set()
+		seen_a = {a}
+		seen_b = {b}
+		frontier_a = deque([a])
+		frontier_b = deque([b])
+		while True:
+			if not frontier_a:
+				split = seen_a
+				break
+			if self.expand(frontier_a, seen_a, seen_b, adjacency):
+				return set()
+			if not frontier_b:
+				split = seen_b
+				break
+			if self.expand(frontier_b, seen_b, seen_a, adjacency):
+				return set()
+		old = self.component[a]
+		new = next(self.ids)
+		self.members[old] -= split
+		self.members[new] = split
+		for node in split:
+			self.component[node] = new
+		return set(split)
+
+	def expand(self, frontier, seen, other, adjacency):
+		''' Метод, выполняющий один шаг обхода в ширину: берем узел из frontier и добавляем его непосещенных соседей.
+
+		Аргументы:
+		----------
+		frontier : collections.deque
+			Очередь узлов обхода.
+		seen : set
+			Узлы, найденные этим обходом.
+		other : set
+			Узлы, найденные встречным обходом.
+		adjacency : dict
+			Соседи узлов.
+
+		Возвращаемое значение:
+		----------
+		bool : True, если обход встретился со встречным обходом.
+		'''
+		for neighbour in adjacency[frontier.popleft()]:
+			if neighbour in other:
+				return True
+			if neighbour not in seen:
+				seen.add(neighbour)
+				frontier.append(neighbour)
+		return False
+
+	def remove_node(self, node):
+		''' Метод для удаления узла, у которого уже нет ребер.
+
+		Аргументы:
+		----------
+		node : DooFixed
+			Узел графа.
+		'''
+		i = self.component.pop(node)
+		self.members[i].discard(node)
+		if not self.members[i]:
+			del self.members[i]
+
+	def connected(self, a, b):
+		''' Метод, проверяющий, находятся ли два узла в одной компоненте.
+		'''
+		return self.component[a] == self.component[b]
@@ -1,6 +1,13 @@
 import pymunk as pm
 
 
+# Категории фигур для фильтрации столкновений (pm.ShapeFilter). Каждой категории соответствует свой бит.
+DOO_FREE_CATEGORY	= 0b01
+DOO_FIXED_CATEGORY	= 0b10
+# Маска Ду: Ду сталкиваются со всеми фигурами, кроме других Ду (и свободных, и фиксированных).
+DOO_MASK			= pm.ShapeFilter.ALL_MASKS ^ (DOO_FREE_CATEGORY | DOO_FIXED_CATEGORY)
+
+
 class Doo(pm.Poly):
 	''' Класс, описывающий ОБЩИЕ черты всех видов Ду (свободных и фиксированных).
 	
@@ -22,6 +29,9 @@ class Doo(pm.Poly):
 		Момент инерции Ду (значение по умолчанию подобрано эмпирически). Момент инерции - мера инертности при вращательном движении.
 	r : float или int
 		Радиус Ду, т.е. половина стороны квадрата.
+	native_filter : bool
+		Если True, то Ду получает фильтр shape_filter своего класса.
+		Тогда Chipmunk отбрасывает пары Ду-Ду еще на этапе broadphase, и обработчики столкновений (pre_solve) для них не вызываются.
 
 
 	Атрибуты (добавленные в классе Doo):
@@ -31,7 +41,7 @@ class Doo(pm.Poly):
 	ground : bool
 		Если данная логическая переменная равна True, то Ду касается земли (пола).
 	'''
-	def __init__(self, x, y, mass=10, moment=10000, r=10):
+	def __init__(self, x, y, mass=10, moment=10000, r=10, native_filter=False):
 		# Вызываем метод __init__() класса pm.Poly (подробнее см. класс World).
 		# Объекты класса Shape привязываются к объектам класса Body. Создаем такой объект на лету (pm.Body()).
 		# [(-r,-r), (r,-r), (r,r), (-r,r)] -- координаты вершин многоугольника относительно объекта Body (~ центр масс тела).
@@ -39,6 +49,8 @@ class Doo(pm.Poly):
 		self.body.position	= x,y
 		self.rad			= r
 		self.ground 		= False
+		if native_filter:
+			self.filter 	= self.shape_filter
 		
 	def check_ground(self, world):
 		''' Метод для проверки того,коснулся ли Ду пола.
@@ -71,11 +83,16 @@ class DooFree(Doo):
 	collision_type : int
 		Параметр, позволяющий нам различать разные типы объектов. Используется при обработке столкновений. 
 		Значение 0 будет соответствовать свободным Ду.
+	shape_filter : pymunk.ShapeFilter
+		Фильтр столкновений свободных Ду (используется, если native_filter равен True).
+		Свободные Ду проходят сквозь других свободных и фиксированных Ду.
 	'''
-	def __init__(self,x,y):
+	shape_filter = pm.ShapeFilter(categories=DOO_FREE_CATEGORY, mask=DOO_MASK)
+
+	def __init__(self, x, y, native_filter=False):
 		# Переопределяем значение атрибутов
 		
-		super(DooFree, self).__init__(x,y)
+		super(DooFree, self).__init__(x, y, native_filter=native_filter)
 		# Переопределм значения атрибутов
 		self.friction = 10
 		self.collision_type = 0
@@ -104,15 +121,20 @@ class DooFixed(Doo):
 	collision_type : int
 		Параметр, позволяющий нам различать разные типы объектов. Используется при обработке столкновений. 
 		Значение 1 будет соответствовать фиксированным Ду.
-	distance : float
-		Расстояние между Ду и некоторой точкой (например, положением курсора мыши).
-		Используется для нахождения подходящих (и ближайших) фиксированных Ду при строительстве.
+	order : int
+		Порядковый номер Ду в графе башни (присваивается классом Graph).
+		Используется при строительстве, если два фиксированных Ду находятся на одинаковом расстоянии от схваченного Ду.
 	color : tuple
 		Цвет фиксированных Ду в формате RGBA. Фиксированных Ду будут желтыми.
+	shape_filter : pymunk.ShapeFilter
+		Фильтр столкновений фиксированных Ду (используется, если native_filter равен True).
+		Фиксированные Ду проходят сквозь других фиксированных и свободных Ду.
 	"""
-	def __init__(self, x, y, r=8, mass=10):
-		super(DooFixed, self).__init__(x, y, r=r, mass=mass)
+	shape_filter = pm.ShapeFilter(categories=DOO_FIXED_CATEGORY, mask=DOO_MASK)
+
+	def __init__(self, x, y, r=8, mass=10, moment=10000, native_filter=False):
+		super(DooFixed, self).__init__(x, y, r=r, mass=mass, moment=moment, native_filter=native_filter)
 		self.friction = 100
 		self.collision_type = 1
-		self.distance = 0.0
+		self.order = 0
 		self.color = (200, 200, 0, 255)
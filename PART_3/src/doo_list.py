@@ -0,0 +1,74 @@
+class DooList():
+	''' Класс, описывающий список Ду с добавлением и удалением за O(1).
+
+	Обычный список python удаляет элемент (list.remove) за O(n): сначала ищет его, а потом сдвигает все следующие элементы.
+	Здесь для каждого Ду хранится его индекс в списке (словарь index).
+	При удалении на место удаляемого Ду ставим последний Ду списка, поэтому ничего сдвигать не нужно.
+	Порядок Ду в списке при этом меняется, но для свободных Ду он не важен.
+
+	Удалять Ду во время перебора списка нельзя (как и у обычного списка). Удаляемых Ду сначала собираем, а потом удаляем методом remove_many.
+
+	Атрибуты:
+	----------
+	items : list
+		Список Ду.
+	index : dict
+		Словарь index[ду] = индекс Ду в списке items.
+	'''
+	def __init__(self):
+		self.items = []
+		self.index = {}
+
+	def __len__(self):
+		return len(self.items)
+
+	def __iter__(self):
+		return iter(self.items)
+
+	def __contains__(self, doo):
+		return doo in self.index
+
+	def append(self, doo):
+		''' Метод для добавления Ду в конец списка. Ду, который уже есть в списке, повторно не добавляется.
+
+		Аргументы:
+		----------
+		doo : Doo
+			Добавляемый Ду.
+		'''
+		if doo not in self.index:
+			self.index[doo] = len(self.items)
+			self.items.append(doo)
+
+	def remove(self, doo):
+		''' Метод для удаления Ду из списка.
+
+		На место удаляемого Ду ставим последний Ду списка.
+
+		Аргументы:
+		----------
+		doo : Doo
+			Удаляемый Ду. Если его нет в списке, то возникает KeyError.
+		'''
+		i = self.index.pop(doo)
+		last = self.items.pop()
+		if last is not doo:
+			self.items[i] = last
+			self.index[last] = i
+
+	def remove_many(self, doos):
+		''' Метод для удаления нескольких Ду (например, собранных во время перебора списка).
+
+		Аргументы:
+		----------
+		doos : list
+			Удаляемые Ду.
+		'''
+		for doo in doos:
+			self.remove(doo)
+
+	def clear(self):
+		''' Метод для удаления всех Ду из списка.
+		'''
+		self.items.clear()
+		self.index.clear()
@@ -0,0 +1,122 @@
+class FixedStepLoop():
+	''' Класс, определяющий, сколько шагов физики нужно сделать за один кадр игры.
+
+	Шаг физики всегда одинаковый (1/physics_rate), а кадры отрисовываются с той частотой, с которой получается.
+	Время, прошедшее с прошлого кадра, накапливается в accumulator, и делается столько шагов физики, сколько в нем помещается.
+	Поэтому при медленной отрисовке симуляция не замедляется, а при быстрой -- не тратит лишнее время на физику.
+	Остаток времени (меньше одного шага) переходит в следующий кадр. По нему же вычисляется alpha для интерполяции при отрисовке.
+
+	Если кадр длился слишком долго (например, окно перетаскивали), то делаем не больше max_substeps шагов, а остальное время выбрасываем.
+	Иначе каждый следующий кадр требовал бы еще больше шагов физики и длился бы еще дольше ("спираль смерти").
+
+	Аргументы:
+	----------
+	physics_rate : int или float
+		Частота шагов физики в [шаги/секунда].
+	max_substeps : int
+		Максимальное число шагов физики за один кадр.
+
+	Атрибуты:
+	----------
+	physics_rate : int или float
+		Частота шагов физики в [шаги/секунда].
+	dt : float
+		Шаг физики в секундах.
+	max_substeps : int
+		Максимальное число шагов физики за один кадр.
+	accumulator : float
+		Накопленное, но еще не просимулированное время в секундах.
+	dropped_time : float
+		Суммарное время в секундах, выброшенное из-за ограничения max_substeps.
+	'''
+	def __init__(self, physics_rate=60, max_substeps=5):
+		self.physics_rate 	= physics_rate
+		self.dt 			= 1/physics_rate
+		self.max_substeps 	= max_substeps
+		self.accumulator 	= 0.0
+		self.dropped_time 	= 0.0
+
+	@property
+	def alpha(self):
+		''' Доля шага физики, прошедшая после последнего шага (от 0 до 1). Используется для интерполяции при отрисовке.
+		'''
+		return self.accumulator / self.dt
+
+	def advance(self, frame_time):
+		''' Метод, добавляющий время кадра и возвращающий число шагов физики, которые нужно сделать.
+
+		Аргументы:
+		----------
+		frame_time : float
+			Время, прошедшее с прошлого кадра, в секундах.
+
+		Возвращаемое значение:
+		----------
+		int : Число шагов физики (от 0 до max_substeps).
+		'''
+		self.accumulator += frame_time
+		steps = 0
+		while self.accumulator >= self.dt and steps < self.max_substeps:
+			self.accumulator -= self.dt
+			steps += 1
+		if self.accumulator >= self.dt:
+			# Не успеваем: выбрасываем целые шаги, оставляя только дробную часть.
+			dropped = self.accumulator - self.accumulator % self.dt
+			self.dropped_time += dropped
+			self.accumulator -= dropped
+		return steps
+
+
+
+
+class Interpolator():
+	''' Класс для интерполяции положений тел между двумя последними шагами физики.
+
+	Перед последним шагом физики в кадре сохраняем положения и углы поворота всех динамических тел (метод save).
+	При отрисовке тело рисуется между сохраненным и текущим положением: previous + (current - previous) * alpha.
+	Так движение выглядит плавным, даже если частота шагов физики не совпадает с частотой кадров.
+	Тела, появившиеся после сохранения, рисуются в текущем положении.
+
+	Атрибуты:
+	----------
+	previous : dict
+		Словарь previous[body] = (x, y, angle) -- состояние тела перед последним шагом физики.
+	'''
+	def __init__(self):
+		self.previous = {}
+
+	def save(self, space):
+		''' Метод для сохранения положений и углов поворота всех тел пространства симуляции.
+
+		Аргументы:
+		----------
+		space : pymunk.Space
+			Пространство симуляции.
+		'''
+		previous = {}
+		for body in space.bodies:
+			position = body.position
+			previous[body] = (position.x, position.y, body.angle)
+		self.previous = previous
+
+	def transform(self, body, alpha):
+		''' Метод для нахождения интерполированных положения и угла поворота тела.
+
+		Аргументы:
+		----------
+		body : pymunk.Body
+			Тело.
+		alpha : float
+			Доля шага физики, прошедшая после последнего шага (см. FixedStepLoop.alpha).
+
+		Возвращаемое значение:
+		----------
+		tuple : (x, y, angle).
+		'''
+		position = body.position
+		angle = body.angle
+		state = self.previous.get(body)
+		if state is None:
+			return position.x, position.y, angle
+		x, y, a = state
+		return x + (position.x - x)*alpha, y + (position.y - y)*alpha, a + (angle - a)*alpha
@@ -0,0 +1,71 @@
+''' Загрузка шрифтов с кэшем путей к файлам шрифтов.
+
+pg.font.SysFont при первом вызове составляет список всех шрифтов системы (на Linux запускает fc-list, на Windows читает реестр).
+Это занимает заметную часть запуска игры, хотя результат почти никогда не меняется.
+Поэтому путь к файлу найденного шрифта сохраняется в файл кэша (JSON), и при следующих запусках
+шрифт загружается сразу из файла (pg.font.Font), без поиска по системе.
+Если файл шрифта из кэша пропал, то шрифт ищется заново.
+'''
+import json
+import os
+import tempfile
+import pygame as pg
+
+
+# Файл кэша по умолчанию: во временной папке, чтобы не засорять папку игры.
+CACHE_PATH = os.path.join(tempfile.gettempdir(), 'world_of_doo_fonts.json')
+
+
+def read_cache(path):
+	''' Функция для чтения кэша путей к шрифтам.
+
+	Аргументы:
+	----------
+	path : str
+		Путь к файлу кэша.
+
+	Возвращаемое значение:
+	----------
+	dict : Словарь {название_шрифта: путь к файлу или None}. Пустой, если файла нет или он испорчен.
+	'''
+	try:
+		with open(path, encoding='utf-8') as f:
+			cache = json.load(f)
+	except (OSError, ValueError):
+		return {}
+	return cache if isinstance(cache, dict) else {}
+
+
+def load_font(name, size, cache_path=CACHE_PATH):
+	''' Функция, возвращающая шрифт name размера size (замена pg.font.SysFont).
+
+	Если системного шрифта с таким названием нет, то используется шрифт pygame по умолчанию (как в pg.font.SysFont).
+	Это тоже запоминается в кэше, чтобы не искать шрифт при каждом запуске.
+
+	Аргументы:
+	----------
+	name : str
+		Название шрифта (например, 'Arial').
+	size : int
+		Размер шрифта.
+	cache_path : str или None
+		Путь к файлу кэша. None -- без кэша (шрифт ищется каждый раз).
+
+	Возвращаемое значение:
+	----------
+	pygame.font.Font : Шрифт.
+	'''
+	cache = read_cache(cache_path) if cache_path is not None else {}
+	key = name.lower()
+	if key in cache and (cache[key] is None or os.path.exists(cache[key])):
+		return pg.font.Font(cache[key], size)
+	path = pg.font.match_font(name)
+	if cache_path is not None:
+		cache[key] = path
+		try:
+			with open(cache_path, 'w', encoding='utf-8') as f:
+				json.dump(cache, f)
+		except OSError:
+			# Кэш только ускоряет запуск: если записать его нельзя, то просто ищем шрифт в следующий раз.
+			pass
+	return pg.font.Font(path, size)
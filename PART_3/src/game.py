@@ -1,13 +1,23 @@
+import time
 import pygame as pg 
-import pymunk as pm
-# Импортируем pygame_util, чтобы направление оси Y совпадало для pygame и pymunk
-from pymunk import pygame_util
 # Импортируем класс World из файла world
 from world import World
-# Импортируем класс ShapeCreator из файла shape_creator
-from shape_creator import ShapeCreator
-# Импортируем класс Graph из файла graph
-from graph import Graph
+# Импортируем класс Simulation из файла simulation
+from simulation import Simulation
+# Импортируем классы FixedStepLoop и Interpolator из файла fixed_step
+from fixed_step import FixedStepLoop, Interpolator
+# Импортируем класс DooRenderer из файла renderer
+from renderer import DooRenderer
+# Импортируем класс Profiler из файла profiler
+from profiler import Profiler
+# Импортируем класс Viewport из файла viewport
+from viewport import Viewport
+# Импортируем функцию load_level из файла level
+from level import load_level
+# Импортируем класс PhysicsThread и константу PHASES из файла physics_thread
+from physics_thread import PhysicsThread, PHASES
+# Импортируем функцию load_font и константу CACHE_PATH из файла fonts
+from fonts import load_font, CACHE_PATH
 
 
 class Game():
@@ -19,38 +29,130 @@ class Game():
 		Название игры и заголовок окна игры.
 	fps : int
 		Верхняя граница частоты обновления кадров в [кадры/секунда].
+	physics_rate : int
+		Частота шагов физики в [шаги/секунда]. Не зависит от частоты кадров (см. класс FixedStepLoop).
+	max_substeps : int
+		Максимальное число шагов физики за один кадр. Защищает игру от "спирали смерти" при очень медленных кадрах.
+	interpolate : bool
+		Если True, то тела рисуются в интерполированном положении между двумя последними шагами физики.
+	debug_draw : bool
+		Если True, то пространство симуляции рисуется медленным space.debug_draw (удобно для отладки физики), а не DooRenderer.
 	camera_width : int
 		Ширина экрана игры в пикселях.
 	camera_height : int
 		Высота экрана игры в пикселях.
+	level_width : int или None
+		Ширина игровой области в пикселях. None -- равна ширине экрана.
+	level_height : int или None
+		Высота игровой области в пикселях. None -- равна высоте экрана.
+		Если игровая область больше экрана, то камеру можно прокручивать стрелками и масштабировать колесом мыши,
+		а рисуется только видимая часть (см. класс Viewport). space.debug_draw камеру не учитывает.
+	level_path : str или None
+		Файл уровня (см. модуль level). None -- стандартный уровень. Размер игровой области по умолчанию берется из уровня.
+		Если у уровня есть регионы и игровая область больше экрана, то регионы подгружаются по мере приближения камеры.
+	stream_margin : int
+		На сколько пикселей за краем экрана подгружаются регионы уровня.
+	record_path : str или None
+		Если задан, то действия игрока записываются и при выходе сохраняются в этот файл (см. модуль replay).
+		В записи хранятся уровень и подгруженные регионы, поэтому она воспроизводится на любом уровне.
+	profile : bool
+		Если True, то профайлер (время этапов кадра поверх игры) включен с самого начала. Переключается клавишей F3.
+	profile_path : str или None
+		Если задан, то время этапов каждого кадра при включенном профайлере записывается в этот файл (.csv или .jsonl).
+	stress_heatmap : bool
+		Если True, то пружины с самого начала рисуются как карта нагрузки. Переключается клавишей H. Нужен NumPy.
+	break_strain : float или None
+		Деформация (по модулю), при которой пружины рвутся (см. модуль stress). None -- пружины не рвутся. Нужен NumPy.
+	sleep_time : float или None
+		Время покоя в секундах, после которого успокоившиеся части башни и лежащие Ду засыпают (см. класс Simulation).
+		None -- режим сна выключен (по умолчанию). В режиме сна фиксированные Ду не вращаются, т.е. физика игры меняется,
+		поэтому режим включается только явно (например, 0.5). Числа неспящих и спящих тел показывает профайлер.
+	idle_speed : float
+		Скорость [пиксели/секунда], ниже которой тело считается покоящимся (0 -- выбирает Chipmunk, около 15 пикселей/секунда).
+	physics_threads : int
+		Число потоков для шага физики (см. класс Simulation): 1, 2 или 0 -- выбирать автоматически по числу тел.
+		При записи сессии (record_path) всегда 1, иначе запись не воспроизвести бит в бит.
+	threaded_physics : bool
+		Если True, то ввод и шаги физики выполняются в отдельном потоке, а игровой цикл рисует последний снимок кадра
+		(см. модуль physics_thread). Время кадра -- большее из времени физики и времени отрисовки, а не их сумма.
+		С debug_draw физика всегда идет в основном потоке: space.debug_draw читает пространство симуляции.
+	capture_path : str или None
+		Если задан, то каждый кадр экрана записывается в фоновом потоке (см. модуль capture): в файл (capture_format 'raw')
+		или в файлы PNG по шаблону имени с номером кадра (capture_format 'png'). Если запись не успевает, то кадры выбрасываются.
+	capture_format : str
+		'raw' или 'png'.
+	font_cache_path : str или None
+		Файл кэша путей к шрифтам (см. модуль fonts). None -- шрифт ищется среди шрифтов системы при каждом запуске.
+	max_frames : int или None
+		Если задан, то игра завершается после max_frames кадров (для тестов и замера времени запуска, см. bench_startup.py).
+	startup_timer : PhaseTimer или None
+		Если задан, то в нем сохраняется время этапов запуска: 'init', 'font', 'world', 'setup' и 'first_frame'.
 	"""
 	def __init__(self):
 		self.caption 		= 'World of Doo'
 		self.fps 			= 60
+		self.physics_rate 	= 60
+		self.max_substeps 	= 5
+		self.interpolate 	= True
+		self.debug_draw 	= False
 		self.camera_width 	= 400
 		self.camera_height 	= 600
+		self.level_width 	= None
+		self.level_height 	= None
+		self.level_path 	= None
+		self.stream_margin 	= 200
+		self.record_path 	= None
+		self.profile 		= False
+		self.profile_path 	= None
+		self.stress_heatmap = False
+		self.break_strain 	= None
+		self.sleep_time 	= None
+		self.idle_speed 	= 5
+		self.physics_threads = 0
+		self.threaded_physics = True
+		self.capture_path 	= None
+		self.capture_format = 'raw'
+		self.font_cache_path = CACHE_PATH
+		self.max_frames 	= None
+		self.startup_timer 	= None
 
 
 	def game_initialize(self):
 		""" Метод для инициализации pygame и запуска инициализации игры.
 
+		Инициализируем только те модули pygame, которые нужны игре (дисплей и шрифты). pg.init() инициализирует еще и звук,
+		а поиск звуковых устройств заметно замедляет запуск.
 		Создаем окно (экран) игры с названием нашей игры.
 		Создаем объект Clock для работы с частотой кадров.
-		Добавляем в игру шрифт для вывода надписей и подсказок.
+		Добавляем в игру шрифт для вывода надписей и подсказок. Путь к файлу шрифта берем из кэша (см. модуль fonts).
+		Загружаем уровень, если он задан.
 		Создаем игровую область.
-		Переворачиваем ось Y в пространстве симуляции, чтобы она совпадала по направлению с осью Y в Pygame.
 		Запускаем игру.
 		"""
-		pg.init()
+		timer = self.startup_timer
+		pg.display.init()
+		pg.font.init()
 		camera = pg.display.set_mode((self.camera_width, self.camera_height))
 		pg.display.set_caption(self.caption)
 		clock = pg.time.Clock()
-		font = pg.font.SysFont('Arial', 14)
-		world = World(self.camera_width, self.camera_height, camera)
-		pm.pygame_util.positive_y_is_up = False
-		self.game_run(camera, clock, font, world)
+		if timer is not None:
+			timer.lap('init')
+		font = load_font('Arial', 14, self.font_cache_path)
+		if timer is not None:
+			timer.lap('font')
+		level = None
+		if self.level_path is not None:
+			level = load_level(self.level_path)
+			self.level_width = self.level_width or level.width
+			self.level_height = self.level_height or level.height
+		world = World(self.camera_width, self.camera_height, camera, level_width=self.level_width, level_height=self.level_height)
+		if world.width > self.camera_width or world.height > self.camera_height:
+			world.viewport = Viewport(self.camera_width, self.camera_height, world.width, world.height)
+		if timer is not None:
+			timer.lap('world')
+		self.game_run(camera, clock, font, world, level)
 
-	def game_run(self, camera, clock, font, world):
+	def game_run(self, camera, clock, font, world, level=None):
 		""" Метод для инициализации игровых объектов и запуска игрового цикла.
 
 		Для этой функции сделал (избыточно) подробный комментарий.
@@ -65,101 +167,316 @@ class Game():
 			Шрифт для вывода надписей и подсказок.
 		world : World
 			Игровая область. Используется для отображения пространства симуляции.
+		level : Level или None
+			Уровень. None -- стандартный уровень.
 		"""
-		# Будем отображать пространство симуляции на поверхность world.
-		draw_options = pm.pygame_util.DrawOptions(world)
-		# Создаем пространство симуляции.
-		space = pm.Space()
-		# Устанавливаем ускорение свободного падения вдоль оси Y.
-		space.gravity = (0.0,900.0)
-		# Настраиваем число итераций физических расчетов для одного кадра игры
-		# чем больше, тем точнее рассчитывается поведение объектов и меньше всяких отклонений
-		# (объектов, проваливающихся сквозь пол и друг друга)
-		# по умолчанию = 10.
-		space.iterations = 20
-		# Создаем обработчики столкновений. В качестве аргументов передаем значения collision_type объектов.
-		# С помощью pre_solve мы зададим правила взаимодействия указанных объектов при столкновении.
-		# Обрабатываем столкновения свободных Ду с другими свободными Ду.
-		ch1 = space.add_collision_handler(0,0)
-		ch1.pre_solve = world.collide_doo_with_doo
-		# Обрабатываем столкновения свободных Ду с фиксированными Ду.
-		ch2 = space.add_collision_handler(0,1)
-		ch2.pre_solve = world.collide_doo_with_doo
-		# Обрабатываем столкновения фиксированных Ду с другими фиксированными Ду.
-		ch3 = space.add_collision_handler(1,1)
-		ch3.pre_solve = world.collide_doo_with_doo
-		# Создадим экземпляр класса Shape Creator
-		shape_creator = ShapeCreator(world, space)
-		# Создадим пол = нижнюю границу игровой области:
-		shape_creator.create_static_floor()
-		# Создадим стены = боковые границы игровой области:
-		shape_creator.create_static_wall(0, world.ground_y)
-		shape_creator.create_static_wall(world.width-1, world.ground_y)
-		# Создадим экземпляр класса Graph, описывающий башню.
-		graph = Graph()
-		# Создаем стартовую конструкцию (фундамент башни).
-		shape_creator.create_start_construction(graph, 300)
+		# space.debug_draw нужен только для отладки, поэтому pygame_util импортируем только здесь.
+		# Переворачиваем ось Y в pygame_util, чтобы она совпадала по направлению с осью Y в Pygame.
+		draw_options = None
+		if self.debug_draw:
+			from pymunk import pygame_util
+			pygame_util.positive_y_is_up = False
+			draw_options = pygame_util.DrawOptions(world)
+		# Создаем пространство симуляции, пол, стены и стартовую конструкцию (фундамент башни).
+		# Всё это делает объект класса Simulation, который также используется в режиме без дисплея (см. модуль headless).
+		# Шаг физики равен 1/physics_rate и не зависит от частоты кадров.
+		# Пространство симуляции берем из simulation.space в каждом кадре: при восстановлении снимка оно заменяется новым.
+		# Если у уровня есть регионы, а на экране видна только часть игровой области, то уровень подгружается по мере прокрутки камеры.
+		lazy_level = level is not None and bool(level.region_size) and world.viewport is not None
+		# Многопоточное пространство симуляции не дает повторяемого результата, поэтому при записи сессии физика идет в одном потоке.
+		threads = self.physics_threads if self.record_path is None else 1
+		simulation = Simulation(world, self.physics_rate, sleep_time=self.sleep_time, idle_speed=self.idle_speed, level=level, lazy_level=lazy_level,
+								threads=threads)
+		graph = simulation.graph
+		# Если нужно записывать сессию, то все вызовы симуляции идут через Recorder.
+		# Модуль replay нужен только для записи, поэтому импортируем его только здесь.
+		recorder = None
+		if self.record_path is not None:
+			from replay import Recorder
+			recorder = Recorder(simulation)
+		control = simulation if recorder is None else recorder
+		# Объект, определяющий число шагов физики в каждом кадре.
+		loop = FixedStepLoop(self.physics_rate, self.max_substeps)
+		# Объект, хранящий положения тел перед последним шагом физики (для плавной отрисовки).
+		interpolator = Interpolator()
+		# Будем отображать пространство симуляции на поверхность world с помощью DooRenderer.
+		renderer = DooRenderer(world, simulation.space)
+		# Если игровая область больше экрана, то рисуем только видимую часть. Пружины видимых узлов берем из графа.
+		viewport = world.viewport
+		renderer.viewport = viewport
+		renderer.graph = graph
+		# Анализ нагрузки на башню нужен для разрыва пружин и для карты нагрузки.
+		if self.break_strain is not None:
+			# NumPy нужен только для анализа нагрузки, поэтому модуль stress импортируем только здесь.
+			from stress import StressAnalyzer
+			simulation.stress = StressAnalyzer(simulation, self.break_strain)
+		# Профайлер измеряет время этапов кадра. Когда он выключен, timer равен None, и измерения ничего не стоят.
+		profiler = Profiler(['input', 'step', 'remove_escaped', 'candidates', 'draw', 'blit', 'overlay', 'flip'], stream_path=self.profile_path)
+		if self.profile:
+			profiler.toggle()
+		# Если физика идет в отдельном потоке, то дальше с симуляцией работает только он.
+		# Игровой цикл передает ему ввод (physics.send) и функции (physics.call), а рисует последний опубликованный снимок кадра.
+		physics = None
+		if self.threaded_physics and not self.debug_draw:
+			physics = PhysicsThread(simulation, control, self.physics_rate, self.max_substeps)
+			physics.start()
+		if self.stress_heatmap:
+			self.toggle_heatmap(simulation, renderer, physics)
+		# Суммарное время этапов шага физики в потоке физики на момент предыдущего кадра (для профайлера).
+		phase_time = (0.0,) * len(PHASES)
+		# Если нужно записывать кадры, то копии экрана передаем в фоновый поток записи.
+		# Модуль capture нужен только для записи кадров, поэтому импортируем его только здесь.
+		capture = None
+		if self.capture_path is not None:
+			from capture import FrameCapture
+			capture = FrameCapture(self.capture_path, self.capture_format)
+		# Число показанных кадров.
+		frames = 0
+		if self.startup_timer is not None:
+			self.startup_timer.lap('setup')
+		# Время предыдущего кадра в секундах. Для первого кадра считаем, что прошел ровно один шаг физики.
+		frame_time = loop.dt
 
 		while True:
+			timer = profiler.timer if profiler.enabled else None
+			if physics is None:
+				simulation.timer = timer
+			else:
+				# Время этапов шага физики поток физики измеряет своим таймером.
+				physics.timing = timer is not None
+				if physics.error is not None:
+					raise physics.error
+			if timer is not None:
+				timer.start()
 			# Получаем позицию мыши, чтобы не вызывать данный метод в других местах.
+			# Если есть камера, то переводим координаты экрана в координаты пространства симуляции.
 			mouse_pos = pg.mouse.get_pos()
-			# Определяем, находится ли под курсором какой-нибудь свободный Ду.
-			world.find_free_doo_under_cursor(space, mouse_pos)
+			if viewport is not None:
+				self.move_viewport(viewport, frame_time)
+				mouse_pos = viewport.screen_to_world(mouse_pos)
+				if lazy_level:
+					# Подгрузка регионов идет через control: при записи сессии Recorder записывает подгруженные регионы.
+					if physics is None:
+						control.stream_level(viewport.bb(self.stream_margin))
+					else:
+						physics.call(lambda simulation, bb=viewport.bb(self.stream_margin): control.stream_level(bb))
+			# Список действий игрока в этом кадре (см. метод handle класса Simulation).
+			actions = []
 
 			# Обрабатываем события с клавиатуры и мыши.
 			for event in pg.event.get():
 				if event.type == pg.QUIT:
-					quit()
+					self.game_quit(recorder, profiler, physics, capture)
 				# Обрабатываем нажатие клавиш.
 				if event.type == pg.KEYDOWN:
 					if event.key == pg.K_ESCAPE:
-						quit()
+						self.game_quit(recorder, profiler, physics, capture)
 					# Сброс (перезапуск) игры при нажатии клавиши R.
 					if event.key == pg.K_r:
-						self.restart(shape_creator, graph)
+						actions.append('restart')
+					# Отмена последней постройки при нажатии клавиши Z.
+					if event.key == pg.K_z:
+						actions.append('undo')
+					# Сохранение и восстановление контрольной точки при нажатии клавиш F5 и F9.
+					if event.key == pg.K_F5:
+						actions.append('save')
+					if event.key == pg.K_F9:
+						actions.append('load')
+					# Включение и выключение карты нагрузки при нажатии клавиши H.
+					if event.key == pg.K_h:
+						self.toggle_heatmap(simulation, renderer, physics)
+					# Включение и выключение профайлера при нажатии клавиши F3.
+					if event.key == pg.K_F3:
+						profiler.toggle()
 				# Обрабатываем нажатие кнопок мыши.
 				if event.type == pg.MOUSEBUTTONDOWN:
 					# Хватание свободного Ду при нажатии левой кнопки мыши (ЛКМ).
 					if event.button == 1:
-						world.pick_free_doo()
+						actions.append('pick')
 					# Cоздание свободного Ду при нажатии правой кнопки мыши (ПКМ)
 					if event.button == 3:
-						if world.shape_being_dragged is None and mouse_pos[1] < world.ground_y:
-							shape_creator.create_free_doo(mouse_pos[0], mouse_pos[1])
+						actions.append('create')
+				# Масштабирование камеры колесом мыши (относительно точки под курсором).
+				if event.type == pg.MOUSEWHEEL and viewport is not None:
+					viewport.zoom_at(pg.mouse.get_pos(), event.y)
 				# Обрабатываем отпускание кнопок мыши
 				if event.type == pg.MOUSEBUTTONUP:
 					# Отпускание схваченного Ду при отпускании ЛКМ
 					if event.button == 1:
-						world.release_picked_doo(graph, shape_creator)
-
-			space.step(1/self.fps)
-			# Удаляем свободных Ду, вылетевших за пределы игровой области (иногда бывает).
-			shape_creator.remove_escaped_doos()
-			# Проверяем работает, ли удаление Ду:
-			# Выводим в консоли длины массивов
-			# print(str(len(space.bodies)) + '    ' + str(len(world.free_doos)))
-			# Перетаскивание схваченного Ду
-			world.move_picked_doo(mouse_pos)
-			if world.shape_being_dragged is not None:
-				graph.find_fixed_doo_for_build(world)
-			# Заливаем поверхность world фоновым цветом.
-			world.fill_me()
-			# Отображаем пространство симуляции
-			space.debug_draw(draw_options)
-			# Рисование подсказок для строительства
-			if world.shape_being_dragged is not None:
-				world.draw_build_hint(graph)
-			# Нарисовать окружность вокруг свободного Ду, находящегося под курсором мыши.
-			world.draw_circle()
-			# Отобразим world на экране
-			world.blit_me()
+						actions.append('release')
+
+			if physics is not None:
+				# Передаем ввод в поток физики. Видимая часть нужна ему, чтобы класть в снимок только видимые Ду.
+				physics.send(mouse_pos, actions, None if viewport is None else viewport.bb(renderer.cull_margin))
+				if timer is not None:
+					timer.lap('input')
+				# Рисуем последний снимок кадра. Между ним и предыдущим снимком тела интерполируются по времени, прошедшему после снимка.
+				state, previous = physics.latest()
+				alpha = min(1.0, (time.perf_counter() - state.time) * self.physics_rate)
+				world.track_dirty = True
+				renderer.draw_state(state, previous if self.interpolate else None, alpha)
+				world.draw_hint(state.hint)
+				world.draw_circle_at(state.hover)
+				if timer is not None:
+					# Добавляем к кадру время шагов физики, сделанных потоком физики после предыдущего кадра.
+					for phase, total, last in zip(PHASES, state.phase_time, phase_time):
+						if total > last:
+							timer.add(phase, total - last)
+					timer.lap('draw')
+				phase_time = state.phase_time
+			else:
+				# Определяем, находится ли под курсором какой-нибудь свободный Ду, и обрабатываем действия игрока.
+				control.handle_input(mouse_pos, actions)
+				if timer is not None:
+					timer.lap('input')
+				# Делаем столько шагов физики, сколько помещается во время прошедшего кадра.
+				# Каждый шаг: шаг физики, удаление вылетевших Ду, перетаскивание схваченного Ду и поиск узлов для строительства.
+				steps = loop.advance(frame_time)
+				for i in range(steps):
+					# Перед последним шагом сохраняем положения тел для интерполяции.
+					if self.interpolate and i == steps-1:
+						interpolator.save(simulation.space)
+					control.step()
+				# Отображаем пространство симуляции
+				# При space.debug_draw вся игровая область рисуется заново, поэтому отслеживать изменившиеся области нельзя.
+				world.track_dirty = not self.debug_draw
+				if self.debug_draw:
+					# Заливаем поверхность world фоновым цветом.
+					world.fill_me()
+					simulation.space.debug_draw(draw_options)
+				else:
+					# DooRenderer сам рисует фон вместе с полом и стенами.
+					renderer.space = simulation.space
+					renderer.draw(interpolator if self.interpolate else None, loop.alpha)
+				# Рисование подсказок для строительства
+				if world.shape_being_dragged is not None:
+					world.draw_build_hint(graph)
+				# Нарисовать окружность вокруг свободного Ду, находящегося под курсором мыши.
+				world.draw_circle()
+				if timer is not None:
+					timer.lap('draw')
+			# Отобразим на экране изменившиеся области world
+			rects = world.blit_me()
+			if timer is not None:
+				timer.lap('blit')
 			# Выводим количество кадров в секунду (FPS) поверх всех других изображений.
 			# FPS служит для грубой оценки производительности игры.
 			# FPS будет уменьшаться при очень большом числе объектов в игре.
 			# (метод .tick() объекта Clock ограничивает FPS сверху, но не снизу)
-			self.show_fps(camera, clock, font)
-			pg.display.flip()
-			clock.tick(self.fps)
+			fps_rect = self.show_fps(camera, clock, font)
+			# Надпись нарисована прямо на экране. В следующем кадре её место нужно заново скопировать из world.
+			world.dirty_rects.append(fps_rect)
+			rects.append(fps_rect)
+			# Панель профайлера тоже рисуется прямо на экране.
+			if timer is not None:
+				profiler_rect = profiler.draw(camera, font)
+				world.dirty_rects.append(profiler_rect)
+				rects.append(profiler_rect)
+				timer.lap('overlay')
+			# Обновляем на экране только изменившиеся области (вместо pg.display.flip).
+			pg.display.update(rects)
+			if capture is not None:
+				capture.capture(camera)
+			frames += 1
+			if frames == 1 and self.startup_timer is not None:
+				self.startup_timer.lap('first_frame')
+			if frames == self.max_frames:
+				self.game_quit(recorder, profiler, physics, capture)
+			if timer is not None:
+				timer.lap('flip')
+				if physics is None:
+					profiler.end_frame(simulation)
+				elif state.counts is not None:
+					# Числа тел поток физики кладет в снимок: пространство симуляции из этого потока не читаем.
+					profiler.end_frame(None, state.counts)
+			# Ограничиваем частоту кадров и запоминаем время кадра в секундах.
+			frame_time = clock.tick(self.fps) / 1000
+
+	def move_viewport(self, viewport, frame_time):
+		''' Метод для прокрутки камеры клавишами со стрелками.
+
+		Аргументы:
+		----------
+		viewport : Viewport
+			Видимая часть игровой области.
+		frame_time : float
+			Время предыдущего кадра в секундах.
+		'''
+		keys = pg.key.get_pressed()
+		dx = keys[pg.K_RIGHT] - keys[pg.K_LEFT]
+		dy = keys[pg.K_DOWN] - keys[pg.K_UP]
+		if dx or dy:
+			viewport.pan(dx * viewport.pan_speed * frame_time, dy * viewport.pan_speed * frame_time)
+
+	def toggle_heatmap(self, simulation, renderer, physics=None):
+		''' Метод для включения и выключения карты нагрузки.
+
+		Флаг карты нагрузки у renderer меняется в основном потоке. Анализ нагрузки (simulation.stress) включается
+		и выключается методом update_stress: если физика идет в отдельном потоке, то в этом потоке (через physics.call),
+		и тогда renderer рисует деформации из снимков кадра, а не из объекта StressAnalyzer.
+
+		Аргументы:
+		----------
+		simulation : Simulation
+			Симуляция.
+		renderer : DooRenderer
+			Объект для отрисовки пространства симуляции.
+		physics : PhysicsThread или None
+			Поток физики.
+		'''
+		renderer.heatmap = not renderer.heatmap
+		if physics is None:
+			self.update_stress(simulation, renderer.heatmap)
+			renderer.stress = simulation.stress if renderer.heatmap else None
+		else:
+			physics.heatmap = renderer.heatmap
+			physics.call(lambda simulation, heatmap=renderer.heatmap: self.update_stress(simulation, heatmap))
+
+	def update_stress(self, simulation, heatmap):
+		''' Метод, включающий анализ нагрузки, если он нужен для карты нагрузки, и выключающий его,
+		если он не нужен ни для карты, ни для разрыва пружин.
+
+		Аргументы:
+		----------
+		simulation : Simulation
+			Симуляция.
+		heatmap : bool
+			Включена ли карта нагрузки.
+		'''
+		if heatmap and simulation.stress is None:
+			# NumPy нужен только для анализа нагрузки, поэтому модуль stress импортируем только здесь.
+			from stress import StressAnalyzer
+			simulation.stress = StressAnalyzer(simulation, self.break_strain)
+		elif not heatmap and self.break_strain is None:
+			simulation.stress = None
+
+	def game_quit(self, recorder, profiler, physics=None, capture=None):
+		''' Метод для выхода из игры. Если сессия записывалась, то сохраняем запись в файл record_path.
+
+		Поток физики останавливаем первым: запись можно сохранять только после его последнего шага.
+
+		Аргументы:
+		----------
+		recorder : Recorder или None
+			Объект, записывающий действия игрока.
+		profiler : Profiler
+			Профайлер. Закрываем его файл с измерениями.
+		physics : PhysicsThread или None
+			Поток физики.
+		capture : FrameCapture или None
+			Объект записи кадров. Дожидаемся записи кадров из очереди.
+		'''
+		if physics is not None:
+			physics.stop()
+		# Ошибку записи кадров (см. FrameCapture.close) выбрасываем только после сохранения записи сессии и профайлера.
+		try:
+			if capture is not None:
+				capture.close()
+		finally:
+			if recorder is not None:
+				recorder.save(self.record_path)
+			profiler.close()
+		quit()
 
 	def show_fps(self, camera, clock, font):
 		''' Метод для отображения FPS (часоты кадров) игры на экране.
@@ -178,30 +495,15 @@ class Game():
 			Объект, с помощью которого получаем значение FPS игры в данный момент.
 		font : pygame.font.Font
 			Шрифт для вывода текста.
-		'''
-		fps = font.render('{0:.2f}'.format(clock.get_fps()), True, [50,50,50])
-		camera.blit(fps, [10,10])
-
-	def restart(self, shape_creator, graph):
-		''' Метод, возврщающий игру к исходному состоянию.
-		
-		Значительно облегчит тестирование игры.
-		Удаляем всех свободных Ду.
-		Удаляем башню (всех фиксированных Ду и все пружины).
-		Заново создаем фундамент для башни.
 
-		Аргументы:
+		Возвращаемое значение:
 		----------
-		shape_creator : ShapeCreator
-			Объект, позволяющий удалить игровые объекты.
-		graph : Graph
-			Объект, описывающий башню в игре.
+		pygame.Rect : Область экрана, занятая надписью.
 		'''
-		shape_creator.remove_all_doos()
-		shape_creator.remove_construction(graph)
-		shape_creator.create_start_construction(graph, 300)
+		fps = font.render('{0:.2f}'.format(clock.get_fps()), True, [50,50,50])
+		return camera.blit(fps, [10,10])
+
 
-		
 
 if __name__ == '__main__':
 	''' Если скрипт запущен самостоятельно, а не вызван из другого скрипта, то:
@@ -1,11 +1,20 @@
+import math
+import pymunk as pm
+# Импортируем класс Connectivity из файла connectivity
+from connectivity import Connectivity
+
+
 class Graph(dict):
 	""" Класс, описывающий башню в игре. Башня описывается ненаправленным графом.
 	
 	Модифицирует стандартный класс dict языка python.
 	Башню образуют фиксированные Ду.
 	Структура словаря:
-		graph[фиксированный_ду] = [соседний_фиксированный_ду, соседний_фиксированный_ду, ...]
-	То есть каждому фиксированному Ду (узлу) в графе сопоставляется список соседних (т.е. соединенных с ним пружинками) фиксированных Ду (соседних узлов графа).
+		graph[фиксированный_ду] = {соседний_фиксированный_ду: пружина, соседний_фиксированный_ду: пружина, ...}
+	То есть каждому фиксированному Ду (узлу) в графе сопоставляется словарь соседних (т.е. соединенных с ним пружинками) фиксированных Ду
+	(соседних узлов графа). Значение -- пружина (pm.DampedSpring), соединяющая узлы. Одна и та же пружина хранится у обоих концов ребра.
+	Поэтому проверка "соседи ли два узла" (fd_1 in graph[fd_2]), поиск пружины ребра и удаление ребра выполняются за O(1).
+	Словари python сохраняют порядок добавления, поэтому соседи перебираются в том же порядке, в котором добавлялись ребра.
 
 	Атрибуты (добавленные и переопределенные в классе DooFixed):
 	----------
@@ -22,6 +31,16 @@ class Graph(dict):
 		Максимальное расстояние между свободным Ду и фиксированным Ду при строительстве. Значение подобрано эмпирически.
 	between_dist : int или float
 		Минимальное рассстояние между двумя фиксированными Ду при строительстве. Значение подобрано эмпирически.
+	node_count : int
+		Число узлов, когда-либо добавленных в граф. Используется для нумерации узлов в порядке добавления (см. атрибут order у DooFixed).
+	connectivity : Connectivity
+		Компоненты связности графа. Обновляются при каждом добавлении и удалении ребра (см. класс Connectivity).
+		Поэтому ребра нужно добавлять методом add_edge, а удалять методом remove_edge, а не изменять словари соседей напрямую.
+	base : set
+		Узлы фундамента башни (см. Level.base). Узел держится за землю, если он связан с фундаментом.
+	edge_version : int
+		Номер версии набора узлов и ребер. Увеличивается при каждом изменении графа (добавление и удаление узлов и ребер, очистка,
+		а значит, и при загрузке уровня и восстановлении снимка). По нему можно узнать, изменился ли граф, не сравнивая списки пружин.
 	"""
 	def __init__(self):
 		super(Graph, self).__init__()
@@ -29,32 +48,236 @@ class Graph(dict):
 		self.closest_dist = 20
 		self.furthest_dist = 100
 		self.between_dist = 40
+		self.node_count = 0
+		self.connectivity = Connectivity()
+		self.base = set()
+		self.edge_version = 0
+
+	def __setitem__(self, fixed_doo, neighbours):
+		""" Метод для добавления узла в граф (graph[фиксированный_ду] = {...}).
+
+		Новому узлу присваивается порядковый номер order.
+		При равных расстояниях порядок добавления узлов определяет, какой из них будет выбран для строительства.
+		Узел объединяется в одну компоненту связности с теми соседями, которые уже есть в графе
+		(остальные соседи сделают это сами, когда их добавят в граф со списком, содержащим этот узел).
+
+		Аргументы:
+		----------
+		fixed_doo : DooFixed
+			Узел графа.
+		neighbours : dict
+			Словарь {соседний_узел: пружина}. Пружина нужна каждому ребру: по графу пружины удаляются из пространства симуляции
+			(см. ShapeCreator.remove_construction) и находятся для анализа нагрузки.
+		"""
+		if not isinstance(neighbours, dict):
+			raise TypeError('Соседи узла задаются словарем {соседний_узел: пружина}')
+		if None in neighbours.values():
+			raise ValueError('У каждого ребра графа должна быть пружина')
+		if fixed_doo not in self:
+			fixed_doo.order = self.node_count
+			self.node_count += 1
+		super(Graph, self).__setitem__(fixed_doo, neighbours)
+		self.edge_version += 1
+		self.connectivity.add_node(fixed_doo)
+		for neighbour in neighbours:
+			if neighbour in self:
+				self.connectivity.add_edge(fixed_doo, neighbour)
+
+	def clear(self):
+		""" Метод для удаления всех узлов графа вместе с компонентами связности и фундаментом.
+		"""
+		super(Graph, self).clear()
+		self.edge_version += 1
+		self.connectivity.clear()
+		self.base.clear()
+
+	def add_node(self, fixed_doo):
+		""" Метод для добавления узла без соседей.
+
+		Аргументы:
+		----------
+		fixed_doo : DooFixed
+			Узел графа.
+		"""
+		if fixed_doo not in self:
+			self[fixed_doo] = {}
+
+	def add_edge(self, fd_1, fd_2, spring):
+		""" Метод для добавления ребра графа. Компоненты связности концов ребра объединяются.
+
+		Аргументы:
+		----------
+		fd_1 : DooFixed
+			Первый узел ребра (уже есть в графе).
+		fd_2 : DooFixed
+			Второй узел ребра (уже есть в графе).
+		spring : pymunk.DampedSpring
+			Пружина, соединяющая узлы.
+		"""
+		if fd_2 in self[fd_1]:
+			raise ValueError('Ребро уже есть в графе')
+		if spring is None:
+			raise ValueError('У каждого ребра графа должна быть пружина')
+		self[fd_1][fd_2] = spring
+		self[fd_2][fd_1] = spring
+		self.edge_version += 1
+		self.connectivity.add_edge(fd_1, fd_2)
+
+	def springs(self):
+		""" Метод, возвращающий все пружины графа (каждую один раз) в порядке добавления узлов.
+
+		Возвращаемое значение:
+		----------
+		list : Пружины.
+		"""
+		springs = []
+		for fixed_doo, neighbours in self.items():
+			for neighbour, spring in neighbours.items():
+				if fixed_doo.order < neighbour.order:
+					springs.append(spring)
+		return springs
+
+	def remove_edge(self, fd_1, fd_2):
+		""" Метод для удаления ребра графа (например, когда порвалась пружина).
+
+		Узлы остаются в графе, даже если у них не осталось соседей.
+		Пружина ребра из пространства симуляции не удаляется (см. ShapeCreator.disconnect).
+		Если граф распался, то отделившиеся узлы переносятся в новую компоненту связности (см. Connectivity.remove_edge).
+
+		Аргументы:
+		----------
+		fd_1 : DooFixed
+			Первый узел ребра.
+		fd_2 : DooFixed
+			Второй узел ребра.
 
+		Возвращаемое значение:
+		----------
+		set : Узлы, отделившиеся от компоненты (пустое множество, если граф не распался).
+		"""
+		del self[fd_1][fd_2]
+		del self[fd_2][fd_1]
+		self.edge_version += 1
+		return self.connectivity.remove_edge(fd_1, fd_2, self)
+
+	def remove_node(self, fixed_doo):
+		""" Метод для удаления узла вместе со всеми его ребрами.
+
+		Аргументы:
+		----------
+		fixed_doo : DooFixed
+			Узел графа.
+
+		Возвращаемое значение:
+		----------
+		list : Компоненты связности, на которые распались соседи узла, кроме самой большой
+			(пустой список, если соседи остались связаны друг с другом).
+		"""
+		neighbours = list(self[fixed_doo])
+		for neighbour in neighbours:
+			self.remove_edge(fixed_doo, neighbour)
+		self.connectivity.remove_node(fixed_doo)
+		self.base.discard(fixed_doo)
+		super(Graph, self).__delitem__(fixed_doo)
+		self.edge_version += 1
+		members = self.connectivity.members
+		parts = {self.connectivity.component[neighbour] for neighbour in neighbours}
+		largest = max(parts, key=lambda i: len(members[i]), default=None)
+		return [set(members[i]) for i in parts if i != largest]
+
+	def is_grounded(self, fixed_doo):
+		""" Метод, проверяющий, связан ли узел с фундаментом башни (за O(число узлов фундамента), без обхода графа).
+
+		Аргументы:
+		----------
+		fixed_doo : DooFixed
+			Узел графа.
+		"""
+		component = self.connectivity.component[fixed_doo]
+		return any(self.connectivity.component[base] == component for base in self.base)
+
+	def detached(self):
+		""" Метод, возвращающий компоненты связности, не связанные с фундаментом башни.
 
-	def find_fixed_doo_for_build(self, world):
+		Возвращаемое значение:
+		----------
+		list : Множества узлов.
+		"""
+		grounded = {self.connectivity.component[base] for base in self.base}
+		return [nodes for i, nodes in self.connectivity.members.items() if i not in grounded]
+
+
+	def find_fixed_doo_for_build(self, world, space=None):
 		""" Метод для нахождения фиксированных Ду (узлов графа), подходящих для строительства.
 
 		Сначала очищаем список fixed_doo_for_build.
-		Для каждого фиксированного Ду находим расстояние до схваченного Ду в данный момент.
-		Если данное расстояние больше closest_dist и меньше furthest_dist, то добавляем Ду в список и сохраняем вычисленное расстояние
-		в атрибуте distance.
-		Затем полученный список сортируем по возрастанию по значению атрибута distance.
-		Оставляем только первых двух фиксированных Ду, то есть двух ближайших к схваченному Ду.
-		Затем проверяем, насколько близко расположены подходящие фиксированные Ду друг к другу.
-		Если расстояние между ними меньше between_dist, то подходящих для строительства узлов графа не найдено.
+		Затем выбираем пару узлов для строительства в точке, где находится схваченный Ду (см. метод build_pair).
+		Если пара найдена, то сохраняем её в fixed_doo_for_build.
 
 		Аргументы:
 		----------
 		world : World
-			Объект содержащий переменную со схваченным Ду и методы для нахождения расстояний.
+			Объект содержащий переменную со схваченным Ду.
+		space : pymunk.Space или None
+			Пространство симуляции, в котором находятся узлы графа.
 		"""
 		self.fixed_doo_for_build.clear()
-		for fixed_doo in self.keys():
-			distance = world.distance_between_bodies(fixed_doo.body, world.shape_being_dragged.body)
+		pair = self.build_pair(world.shape_being_dragged.body.position, space)
+		if pair is not None:
+			self.fixed_doo_for_build.extend(pair)
+
+	def build_pair(self, position, space=None):
+		""" Метод, выбирающий пару узлов графа, к которым достраивается башня, если отпустить Ду в точке position.
+
+		Ничего не меняет ни в графе, ни в узлах, поэтому им можно проверять любые точки, а не только точку схваченного Ду
+		(так автоматический строитель перебирает места для постройки, см. модуль planner).
+		Если передано пространство симуляции, то кандидатов ищем с помощью его пространственного индекса (метод point_query).
+		Chipmunk сам обновляет этот индекс при каждом вызове space.step, поэтому нам не нужно перебирать все узлы графа.
+		point_query возвращает фигуры, ГРАНИЦА которых не дальше furthest_dist от точки.
+		Центр Ду лежит внутри квадрата, поэтому все подходящие узлы точно попадут в этот список (и еще несколько лишних).
+		Если пространство не передано, то кандидатами будут все узлы графа.
+		Для каждого кандидата находим расстояние до точки position.
+		Из кандидатов, расстояние до которых больше closest_dist и меньше furthest_dist, оставляем только двух ближайших
+		(без сортировки всего списка).
+		При равных расстояниях выбираем узел, добавленный в граф раньше (как при устойчивой сортировке по порядку графа).
+		Затем проверяем, насколько близко расположены подходящие фиксированные Ду друг к другу.
+		Если расстояние между ними меньше between_dist, то подходящих для строительства узлов графа нет.
+
+		Аргументы:
+		----------
+		position : tuple или pymunk.Vec2d
+			Точка, в которой отпускают Ду.
+		space : pymunk.Space или None
+			Пространство симуляции, в котором находятся узлы графа.
+
+		Возвращаемое значение:
+		----------
+		tuple или None : Пара узлов (ближайший, второй по близости) или None, если строить негде.
+		"""
+		x, y = position
+		if space is None:
+			candidates = self.keys()
+		else:
+			query = space.point_query((x, y), self.furthest_dist, pm.ShapeFilter())
+			candidates = [info.shape for info in query if info.shape in self]
+		# Ближайшие узлы храним кортежами (расстояние, order, узел): они сравниваются сначала по расстоянию, потом по order.
+		first = None
+		second = None
+		for fixed_doo in candidates:
+			node = fixed_doo.body.position
+			dx = node.x - x
+			dy = node.y - y
+			distance = math.sqrt(dx*dx + dy*dy)
 			if distance > self.closest_dist and distance < self.furthest_dist:
-				self.fixed_doo_for_build.append(fixed_doo)
-				fixed_doo.distance = distance
-		self.fixed_doo_for_build.sort(key=lambda fixed_doo: fixed_doo.distance)
-		self.fixed_doo_for_build = self.fixed_doo_for_build[:2] 	# Даже если длина списка меньше 2, то все работает и не выдает ошибку.
-		if len(self.fixed_doo_for_build) < 2 or (world.distance_between_bodies(self.fixed_doo_for_build[0].body, self.fixed_doo_for_build[1].body) < self.between_dist):
-			self.fixed_doo_for_build.clear()
+				key = (distance, fixed_doo.order, fixed_doo)
+				if first is None or key[:2] < first[:2]:
+					first, second = key, first
+				elif second is None or key[:2] < second[:2]:
+					second = key
+		if second is None:
+			return None
+		a = first[2].body.position
+		b = second[2].body.position
+		if math.sqrt((a.x - b.x)**2 + (a.y - b.y)**2) < self.between_dist:
+			return None
+		return first[2], second[2]
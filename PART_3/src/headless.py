@@ -0,0 +1,137 @@
+''' Запуск симуляции без дисплея (headless).
+
+Строит такое же пространство симуляции, как и игра (см. класс Simulation), но ничего не отображает и не ждет таймера.
+Действия игрока берутся не из pg.event.get(), а из сценария -- списка объектов Action.
+Этот модуль не импортирует pygame, поэтому работает на серверах без дисплея.
+
+Формат файла сценария: одна строка -- одно действие, поля разделены пробелами:
+	номер_кадра действие x y
+Например:
+	0 create 200 100
+	1 pick 200 100
+	30 move 220 150
+	60 release 220 150
+Строки, начинающиеся с #, пропускаются.
+
+Запуск из консоли:
+	python headless.py --steps 10000 --script actions.txt
+'''
+import argparse
+import time
+from collections import namedtuple
+# Импортируем класс WorldState из файла world_state
+from world_state import WorldState
+# Импортируем класс Simulation из файла simulation
+from simulation import Simulation
+
+
+# Действие игрока в кадре step.
+# kind -- 'move' (просто перемещение мыши) или одно из действий метода Simulation.handle.
+# x, y -- координаты курсора мыши в момент действия.
+Action = namedtuple('Action', ['step', 'kind', 'x', 'y'])
+
+
+def load_actions(path):
+	''' Функция для чтения сценария из текстового файла.
+
+	Аргументы:
+	----------
+	path : str
+		Путь к файлу сценария.
+
+	Возвращаемое значение:
+	----------
+	list : Список объектов Action.
+	'''
+	actions = []
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			step, kind, x, y = line.split()
+			actions.append(Action(int(step), kind, float(x), float(y)))
+	return actions
+
+
+class HeadlessGame():
+	''' Класс для запуска игры без дисплея и без ограничения частоты кадров.
+
+	Аргументы:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+	fps : int
+		Частота кадров игры. Определяет шаг физики (1/fps), а не скорость работы.
+	sleep_time : float или None
+		Время покоя, после которого острова тел засыпают (см. класс Simulation). None -- режим сна выключен.
+	idle_speed : float
+		Скорость, ниже которой тело считается покоящимся (см. класс Simulation).
+	level : Level или None
+		Уровень (см. модуль level). None -- стандартный уровень.
+	lazy_level : bool
+		Если True, то уровень подгружается по регионам (см. Simulation.stream_level).
+	threads : int
+		Число потоков для шага физики (см. класс Simulation). 0 -- выбирается автоматически по числу тел.
+
+	Атрибуты:
+	----------
+	world : WorldState
+		Игровая область без отображения.
+	simulation : Simulation
+		Симуляция с пространством, полом, стенами и стартовой конструкцией.
+	'''
+	def __init__(self, width=400, height=600, fps=60, sleep_time=None, idle_speed=0, level=None, lazy_level=False, threads=1):
+		self.world 		= WorldState(width, height)
+		self.simulation = Simulation(self.world, fps, sleep_time=sleep_time, idle_speed=idle_speed, level=level, lazy_level=lazy_level,
+									threads=threads)
+
+
+	def run(self, steps, actions=()):
+		''' Метод, выполняющий заданное число кадров с действиями из сценария.
+
+		Действия сортируются по номеру кадра. Действия одного кадра выполняются в порядке следования в сценарии.
+		Координаты курсора мыши сохраняются до следующего действия.
+
+		Аргументы:
+		----------
+		steps : int
+			Число кадров.
+		actions : list
+			Список объектов Action.
+
+		Возвращаемое значение:
+		----------
+		float : Время работы в секундах.
+		'''
+		actions = sorted(actions, key=lambda action: action.step)
+		simulation = self.simulation
+		mouse_pos = simulation.mouse_pos
+		i = 0
+		start = time.perf_counter()
+		for step in range(simulation.step_count, simulation.step_count + steps):
+			frame_actions = []
+			while i < len(actions) and actions[i].step <= step:
+				mouse_pos = (actions[i].x, actions[i].y)
+				if actions[i].kind != 'move':
+					frame_actions.append(actions[i].kind)
+				i += 1
+			simulation.frame(mouse_pos, frame_actions)
+		return time.perf_counter() - start
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то выполняем сценарий и выводим скорость симуляции.
+	'''
+	parser = argparse.ArgumentParser(description='Запуск World of Doo без дисплея.')
+	parser.add_argument('--steps', type=int, default=10000, help='число кадров')
+	parser.add_argument('--script', default=None, help='файл сценария с действиями игрока')
+	args = parser.parse_args()
+
+	game = HeadlessGame()
+	actions = load_actions(args.script) if args.script else []
+	elapsed = game.run(args.steps, actions)
+	print('{0} шагов за {1:.3f} с: {2:.0f} шагов/с'.format(args.steps, elapsed, args.steps/elapsed))
@@ -0,0 +1,612 @@
+''' Уровни: статическая геометрия, готовая башня, спаунеры и цели, и их загрузка в симуляцию.
+
+Уровень (класс Level) описывает:
+	- статическую геометрию: многоугольники ('poly') и отрезки ('segment') с трением и collision_type (пол, стены, платформы);
+	- начальных фиксированных Ду (узлы) и ребра графа башни между ними; узлы фундамента (base);
+	- спаунеры: точки, в которых каждые period секунд появляется свободный Ду;
+	- цели: круги, которых должна достичь башня (см. LevelLoader.reached_goals).
+Уровень без region_size загружается целиком. Если задан region_size, то узлы делятся на квадратные области (регионы) со стороной region_size,
+и регионы можно подгружать по мере приближения камеры (см. LevelLoader.stream).
+
+Два формата файла с номером версии:
+	- JSON (расширение .json) -- для чтения и правки руками;
+	- двоичный (любое другое расширение, например .level) -- заголовок (HEADER), описание геометрии, спаунеров и целей в JSON,
+	  затем массивы узлов (x, y, масса), ребер и флагов фундамента. Массивы читаются модулем array без разбора по одному числу.
+Масса узла None (в двоичном формате 0) означает массу по умолчанию (ShapeCreator.fixed_doo_mass).
+
+Загрузка создает тела, фигуры и пружины и добавляет их в пространство симуляции одним вызовом space.add, как и модуль snapshot.
+
+Запуск из консоли:
+	python level.py tower.level --generate 5000    # создать уровень с готовой башней из 5000 узлов
+	python level.py tower.level --out tower.json   # преобразовать в другой формат
+	python level.py tower.level                    # измерить время загрузки
+'''
+import argparse
+import gc
+import json
+import math
+import random
+import struct
+import time
+from array import array
+import pymunk as pm
+
+
+# Название и версия формата. Версию нужно увеличивать при любом изменении формата.
+FORMAT = 'doo-level'
+VERSION = 1
+# Метка двоичного формата.
+MAGIC = b'DOOL'
+# Заголовок двоичного формата: метка, версия, размер описания в JSON (в байтах), число узлов, число ребер.
+HEADER = struct.Struct('<4sHIII')
+
+
+class Level():
+	''' Класс, описывающий уровень.
+
+	Аргументы:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+
+	Атрибуты:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+	statics : list
+		Статические фигуры: словари {'type': 'poly', 'position', 'vertices', 'friction', 'collision_type'}
+		или {'type': 'segment', 'position', 'a', 'b', 'radius', 'friction', 'collision_type'}.
+	nodes : list
+		Начальные фиксированные Ду: кортежи (x, y, масса). Масса None -- масса по умолчанию.
+	edges : list
+		Ребра графа башни: пары индексов узлов (i, j).
+	base : list
+		Индексы узлов фундамента башни.
+	spawners : list
+		Спаунеры: словари {'x', 'y', 'period'}; period -- период появления свободных Ду в секундах.
+	goals : list
+		Цели: словари {'x', 'y', 'radius'}.
+	region_size : float или None
+		Сторона региона в пикселях. None -- уровень загружается целиком.
+	'''
+	def __init__(self, width, height):
+		self.width 			= width
+		self.height 		= height
+		self.statics 		= []
+		self.nodes 			= []
+		self.edges 			= []
+		self.base 			= []
+		self.spawners 		= []
+		self.goals 			= []
+		self.region_size 	= None
+
+
+	def region_key(self, x, y):
+		''' Метод, возвращающий регион, в который попадает точка (x, y).
+
+		Возвращаемое значение:
+		----------
+		tuple : Номер региона по осям X и Y. Если region_size не задан, то (0, 0).
+		'''
+		if not self.region_size:
+			return (0, 0)
+		return (math.floor(x / self.region_size), math.floor(y / self.region_size))
+
+	def regions(self):
+		''' Метод, разбивающий узлы по регионам.
+
+		Возвращаемое значение:
+		----------
+		dict : Словарь {регион: список индексов узлов по возрастанию}.
+		'''
+		regions = {}
+		for i, (x, y, mass) in enumerate(self.nodes):
+			regions.setdefault(self.region_key(x, y), []).append(i)
+		return regions
+
+	def check(self):
+		''' Метод, проверяющий ребра и фундамент уровня (вызывается при чтении уровня).
+
+		Ребро должно соединять два разных существующих узла, и каждая пара узлов соединяется не больше одного раза
+		(иначе Graph.add_edge отказался бы добавлять ребро, когда его пружина уже в пространстве симуляции).
+		Концы ребра не должны совпадать: у пружины нулевой длины нет деформации (см. модуль stress).
+		Узлы фундамента должны существовать.
+
+		Возвращаемое значение:
+		----------
+		Level : Этот же уровень.
+		'''
+		n = len(self.nodes)
+		seen = set()
+		for i, j in self.edges:
+			if not (0 <= i < n and 0 <= j < n):
+				raise ValueError('Испорченный уровень: ребро ({0}, {1}) ссылается на несуществующий узел'.format(i, j))
+			if i == j:
+				raise ValueError('Испорченный уровень: ребро ({0}, {1}) соединяет узел с самим собой'.format(i, j))
+			if self.nodes[i][:2] == self.nodes[j][:2]:
+				raise ValueError('Испорченный уровень: концы ребра ({0}, {1}) совпадают'.format(i, j))
+			key = (i, j) if i < j else (j, i)
+			if key in seen:
+				raise ValueError('Испорченный уровень: ребро ({0}, {1}) повторяется'.format(i, j))
+			seen.add(key)
+		for i in self.base:
+			if not 0 <= i < n:
+				raise ValueError('Испорченный уровень: узел фундамента {0} не существует'.format(i))
+		return self
+
+	def to_dict(self):
+		''' Метод, возвращающий уровень в виде словаря для JSON.
+		'''
+		return {'format': FORMAT, 'version': VERSION, 'width': self.width, 'height': self.height, 'region_size': self.region_size,
+				'statics': self.statics, 'spawners': self.spawners, 'goals': self.goals,
+				'nodes': [[x, y] if mass is None else [x, y, mass] for x, y, mass in self.nodes],
+				'edges': [list(edge) for edge in self.edges], 'base': list(self.base)}
+
+	@classmethod
+	def from_dict(cls, data):
+		''' Метод, создающий уровень из словаря (см. метод to_dict).
+
+		Узел может быть списком [x, y] или [x, y, масса].
+		'''
+		if data.get('format') != FORMAT or data.get('version') != VERSION:
+			raise ValueError('Неизвестный формат уровня: {0} версии {1}'.format(data.get('format'), data.get('version')))
+		level = cls(data['width'], data['height'])
+		level.region_size 	= data.get('region_size')
+		level.statics 		= data.get('statics', [])
+		level.spawners 		= data.get('spawners', [])
+		level.goals 		= data.get('goals', [])
+		level.nodes 		= [(node[0], node[1], node[2] if len(node) > 2 else None) for node in data.get('nodes', [])]
+		level.edges 		= [(i, j) for i, j in data.get('edges', [])]
+		level.base 			= list(data.get('base', []))
+		return level.check()
+
+	def to_bytes(self):
+		''' Метод, возвращающий уровень в двоичном формате.
+		'''
+		meta = json.dumps({'width': self.width, 'height': self.height, 'region_size': self.region_size,
+							'statics': self.statics, 'spawners': self.spawners, 'goals': self.goals}, separators=(',', ':')).encode('utf-8')
+		# Дополняем описание пробелами, чтобы массивы double начинались с адреса, кратного 8.
+		meta += b' ' * (-(HEADER.size + len(meta)) % 8)
+		floats = array('d')
+		for x, y, mass in self.nodes:
+			floats.extend((x, y, mass or 0.0))
+		edges = array('I')
+		for i, j in self.edges:
+			edges.extend((i, j))
+		base = array('B', bytes(len(self.nodes)))
+		for i in self.base:
+			base[i] = 1
+		header = HEADER.pack(MAGIC, VERSION, len(meta), len(self.nodes), len(self.edges))
+		return b''.join((header, meta, floats.tobytes(), edges.tobytes(), base.tobytes()))
+
+	@classmethod
+	def from_bytes(cls, data):
+		''' Метод, создающий уровень из двоичного формата (см. метод to_bytes).
+		'''
+		magic, version = struct.unpack_from('<4sH', data)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError('Неизвестный формат уровня: {0} версии {1}'.format(magic, version))
+		magic, version, meta_size, n_nodes, n_edges = HEADER.unpack_from(data)
+		view = memoryview(data)
+		offset = HEADER.size + meta_size
+		meta = json.loads(bytes(view[HEADER.size:offset]))
+		floats = array('d')
+		floats.frombytes(view[offset:offset + 24*n_nodes])
+		offset += 24*n_nodes
+		edges = array('I')
+		edges.frombytes(view[offset:offset + 8*n_edges])
+		offset += 8*n_edges
+		base = bytes(view[offset:offset + n_nodes])
+
+		level = cls(meta['width'], meta['height'])
+		level.region_size 	= meta['region_size']
+		level.statics 		= meta['statics']
+		level.spawners 		= meta['spawners']
+		level.goals 		= meta['goals']
+		values = iter(floats.tolist())
+		level.nodes 		= [(x, y, mass or None) for x, y, mass in zip(values, values, values)]
+		values = iter(edges.tolist())
+		level.edges 		= list(zip(values, values))
+		level.base 			= [i for i, flag in enumerate(base) if flag]
+		if len(level.nodes) != n_nodes or len(level.edges) != n_edges or len(base) != n_nodes:
+			raise ValueError('Испорченный уровень: файл короче, чем указано в заголовке')
+		return level.check()
+
+
+def save_level(level, path):
+	''' Функция для записи уровня в файл: в JSON, если расширение .json, иначе в двоичном формате.
+	'''
+	if path.endswith('.json'):
+		# Каждый элемент списка (фигура, узел, ребро) -- на отдельной строке, чтобы файл было удобно читать и править.
+		lines = []
+		for key, value in level.to_dict().items():
+			if isinstance(value, list) and value and isinstance(value[0], (list, dict)):
+				items = ',\n'.join('\t\t' + json.dumps(item) for item in value)
+				lines.append('\t{0}: [\n{1}\n\t]'.format(json.dumps(key), items))
+			else:
+				lines.append('\t{0}: {1}'.format(json.dumps(key), json.dumps(value)))
+		with open(path, 'w', encoding='utf-8') as f:
+			f.write('{\n' + ',\n'.join(lines) + '\n}\n')
+	else:
+		with open(path, 'wb') as f:
+			f.write(level.to_bytes())
+
+
+def load_level(path):
+	''' Функция для чтения уровня из файла (формат определяется по расширению, как в функции save_level).
+
+	Возвращаемое значение:
+	----------
+	Level : Уровень.
+	'''
+	if path.endswith('.json'):
+		with open(path, encoding='utf-8') as f:
+			return Level.from_dict(json.load(f))
+	with open(path, 'rb') as f:
+		return Level.from_bytes(f.read())
+
+
+def default_level(width, height, ground_y, start_height=290):
+	''' Функция, возвращающая стандартный уровень: пол, две стены и стартовая конструкция (фундамент башни).
+
+	Пол -- многоугольник, а не отрезок, в надежде, что Ду не будут пролетать сквозь пол при больших скоростях (например, при падении с большой высоты).
+	Центр стены расположен в её нижней вершине. Коэффициенты трения подобраны эмпирически: в Pymunk используется модель Кулона для трения,
+	и результирующий коэффициент трения находится перемножением коэффициентов трения соприкасающихся фигур.
+	collision_type: 2 -- пол, 3 -- стены.
+
+	Стартовая конструкция -- трапеция из четырех фиксированных Ду, соединенных шестью пружинами.
+	Нижние узлы тяжелые, чтобы башня стояла устойчиво. Размеры трапеции выбраны совершенно произвольно.
+
+	Аргументы:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+	ground_y : int
+		Положение пола по оси Y.
+	start_height : int
+		Высота над полом, на которой появляется фундамент башни (потом он падает на пол).
+
+	Возвращаемое значение:
+	----------
+	Level : Уровень.
+	'''
+	floor_height = 15
+	semiwidth_bottom = 70
+	semiwidth_top = 55
+	construction_height = 122
+	level = Level(width, height)
+	semiwidth = width/2
+	level.statics = [
+		{'type': 'poly', 'position': [width/2, ground_y],
+		 'vertices': [[-semiwidth, 0], [semiwidth, 0], [-semiwidth, floor_height], [semiwidth, floor_height]], 'friction': 10, 'collision_type': 2},
+		{'type': 'segment', 'position': [0, ground_y], 'a': [0, 0], 'b': [0, -height], 'radius': 1, 'friction': 100, 'collision_type': 3},
+		{'type': 'segment', 'position': [width-1, ground_y], 'a': [0, 0], 'b': [0, -height], 'radius': 1, 'friction': 100, 'collision_type': 3},
+	]
+	y = ground_y - start_height
+	level.nodes = [
+		(width//2 - semiwidth_bottom, y, 1000),
+		(width//2 + semiwidth_bottom, y, 1000),
+		(width//2 - semiwidth_top, y - construction_height, None),
+		(width//2 + semiwidth_top, y - construction_height, None),
+	]
+	level.edges = [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+	level.base = [0, 1, 2, 3]
+	return level
+
+
+def capture_level(simulation, region_size=None):
+	''' Функция, сохраняющая текущую башню симуляции как уровень (готовая башня становится начальной).
+
+	Статическая геометрия, спаунеры и цели берутся из уровня симуляции. Массы, отличные от массы по умолчанию, сохраняются.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	region_size : float или None
+		Сторона региона нового уровня.
+
+	Возвращаемое значение:
+	----------
+	Level : Уровень.
+	'''
+	source = simulation.level
+	graph = simulation.graph
+	default_mass = simulation.shape_creator.fixed_doo_mass
+	level = Level(source.width, source.height)
+	level.statics 		= source.statics
+	level.spawners 		= source.spawners
+	level.goals 		= source.goals
+	level.region_size 	= region_size
+	index = {}
+	for i, fixed_doo in enumerate(graph):
+		index[fixed_doo] = i
+		position = fixed_doo.body.position
+		mass = fixed_doo.body.mass
+		level.nodes.append((position.x, position.y, None if mass == default_mass else mass))
+	for fixed_doo, neighbours in graph.items():
+		for neighbour in neighbours:
+			if index[fixed_doo] < index[neighbour]:
+				level.edges.append((index[fixed_doo], index[neighbour]))
+	level.base = sorted(index[fixed_doo] for fixed_doo in graph.base)
+	return level
+
+
+class LevelLoader():
+	''' Класс, загружающий уровень в симуляцию целиком или по регионам.
+
+	Узлы региона создаются вместе с пружинами ко всем уже загруженным соседям.
+	Пружина к соседу из еще не загруженного региона создается, когда загружается регион соседа.
+	Фиксированные Ду берутся из пула (см. класс DooPool), параметры пружин и Ду -- из ShapeCreator.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	level : Level
+		Уровень.
+
+	Атрибуты:
+	----------
+	simulation : Simulation
+		Симуляция.
+	level : Level
+		Уровень.
+	regions : dict
+		Словарь {регион: индексы узлов}.
+	incident : list
+		Для каждого узла -- список его соседей по ребрам уровня.
+	doos : dict
+		Загруженные узлы: словарь {индекс узла: фиксированный Ду}.
+	loaded : set
+		Загруженные регионы.
+	'''
+	def __init__(self, simulation, level):
+		self.simulation 	= simulation
+		self.level 			= level
+		self.regions 		= level.regions()
+		self.incident 		= [[] for node in level.nodes]
+		self.doos 			= {}
+		self.loaded 		= set()
+		for i, j in level.edges:
+			self.incident[i].append(j)
+			self.incident[j].append(i)
+
+
+	@property
+	def pending(self):
+		''' Число еще не загруженных регионов.
+		'''
+		return len(self.regions) - len(self.loaded)
+
+	def create_statics(self):
+		''' Метод для создания статической геометрии уровня в пространстве симуляции (одним вызовом space.add).
+
+		Для статических тел в пространство симуляции добавляется только shape.
+		'''
+		shapes = []
+		for static in self.level.statics:
+			body = pm.Body(body_type=pm.Body.STATIC)
+			body.position = static['position']
+			if static['type'] == 'poly':
+				shape = pm.Poly(body, [tuple(vertex) for vertex in static['vertices']])
+			elif static['type'] == 'segment':
+				shape = pm.Segment(body, tuple(static['a']), tuple(static['b']), static['radius'])
+			else:
+				raise ValueError('Неизвестная статическая фигура: {0}'.format(static['type']))
+			shape.friction = static['friction']
+			shape.collision_type = static['collision_type']
+			shapes.append(shape)
+		self.simulation.space.add(*shapes)
+
+	def reset(self):
+		''' Метод, забывающий загруженные узлы и регионы (после удаления башни, см. Simulation.restart).
+		'''
+		self.doos.clear()
+		self.loaded.clear()
+
+	def load(self, keys=None):
+		''' Метод для загрузки регионов.
+
+		Сначала создаются все Ду, затем пружины, и всё добавляется в пространство симуляции одним вызовом space.add.
+		Затем узлы и ребра добавляются в граф.
+		Пока создаются тысячи объектов, сборщик мусора выключен: он все равно ничего не найдет, а работает долго.
+
+		Аргументы:
+		----------
+		keys : iterable или None
+			Регионы. None -- все регионы уровня. Уже загруженные регионы пропускаются.
+
+		Возвращаемое значение:
+		----------
+		int : Число загруженных узлов.
+		'''
+		if keys is None:
+			keys = self.regions
+		indices = []
+		for key in sorted(keys):
+			if key in self.regions and key not in self.loaded:
+				self.loaded.add(key)
+				indices.extend(self.regions[key])
+		if not indices:
+			return 0
+		indices.sort()
+
+		simulation = self.simulation
+		shape_creator = simulation.shape_creator
+		pool = shape_creator.pool
+		graph = simulation.graph
+		nodes = self.level.nodes
+		base = set(self.level.base)
+		doos = self.doos
+		stiffness = shape_creator.spring_strength
+		damping = shape_creator.damping
+		default_mass = shape_creator.fixed_doo_mass
+		moment = shape_creator.fixed_doo_moment
+
+		gc_enabled = gc.isenabled()
+		gc.disable()
+		try:
+			objects = []
+			for i in indices:
+				x, y, mass = nodes[i]
+				fixed_doo = pool.fixed_doo(x, y, default_mass if mass is None else mass, moment)
+				doos[i] = fixed_doo
+				objects.append(fixed_doo.body)
+				objects.append(fixed_doo)
+			# Ребро (i, j) создаем, когда загружены оба конца. Если оба конца загружаются сейчас, то ребро создает узел с меньшим индексом.
+			new = set(indices)
+			edges = []
+			for i in indices:
+				a = doos[i]
+				for j in self.incident[i]:
+					b = doos.get(j)
+					if b is None or (j in new and j < i):
+						continue
+					# Длина пружины в расслабленном состоянии -- расстояние между узлами (как в ShapeCreator.create_spring),
+					# но считаем её по координатам уровня, не обращаясь к телам pymunk.
+					dx = nodes[i][0] - nodes[j][0]
+					dy = nodes[i][1] - nodes[j][1]
+					spring = pm.DampedSpring(a.body, b.body, (0, 0), (0, 0), math.sqrt(dx*dx + dy*dy), stiffness, damping)
+					objects.append(spring)
+					edges.append((a, b, spring))
+			simulation.space.add(*objects)
+
+			for i in indices:
+				graph.add_node(doos[i])
+				if i in base:
+					graph.base.add(doos[i])
+			for a, b, spring in edges:
+				graph.add_edge(a, b, spring)
+		finally:
+			if gc_enabled:
+				gc.enable()
+		return len(indices)
+
+	def stream(self, bb):
+		''' Метод, загружающий регионы, которые пересекаются с прямоугольником bb (например, с видимой частью уровня).
+
+		Аргументы:
+		----------
+		bb : pymunk.BB
+			Прямоугольник в координатах пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		int : Число загруженных узлов.
+		'''
+		if not self.pending:
+			return 0
+		if not self.level.region_size:
+			return self.load()
+		# В pymunk.BB bottom -- меньшая координата Y, top -- большая.
+		x0, y0 = self.level.region_key(bb.left, bb.bottom)
+		x1, y1 = self.level.region_key(bb.right, bb.top)
+		keys = [key for key in self.regions if key not in self.loaded and x0 <= key[0] <= x1 and y0 <= key[1] <= y1]
+		return self.load(keys)
+
+	def reached_goals(self):
+		''' Метод, возвращающий цели уровня, которых касается хотя бы один узел башни.
+
+		Возвращаемое значение:
+		----------
+		list : Словари целей (см. атрибут Level.goals).
+		'''
+		space = self.simulation.space
+		graph = self.simulation.graph
+		reached = []
+		for goal in self.level.goals:
+			for info in space.point_query((goal['x'], goal['y']), goal['radius'], pm.ShapeFilter()):
+				if info.shape in graph:
+					reached.append(goal)
+					break
+		return reached
+
+
+def generate_level(nodes, width=4000, height=600, region_size=400, seed=0):
+	''' Функция, создающая уровень с готовыми башнями (для проверки скорости загрузки).
+
+	Башни -- ленты из треугольников, как в сценарии tower модуля benchmark, стоят рядом друг с другом на полу.
+
+	Аргументы:
+	----------
+	nodes : int
+		Общее число узлов.
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Наименьшая высота игровой области в пикселях (если башни выше, то область выше).
+	region_size : float или None
+		Сторона региона.
+	seed : int
+		Зерно генератора случайных чисел (небольшой разброс положений узлов).
+
+	Возвращаемое значение:
+	----------
+	Level : Уровень.
+	'''
+	rnd = random.Random(seed)
+	columns = list(range(60, width - 60, 120))
+	per_tower = math.ceil(nodes / len(columns))
+	# Игровая область должна вмещать башни по высоте.
+	height = max(height, per_tower*40 + 100)
+	level = default_level(width, height, height - 10)
+	level.nodes = []
+	level.edges = []
+	level.base = []
+	level.region_size = region_size
+	ground_y = height - 10
+	for x in columns:
+		start = len(level.nodes)
+		count = min(per_tower, nodes - start)
+		for k in range(count):
+			level.nodes.append((x + (k % 2)*60 + rnd.uniform(-2, 2), ground_y - 8 - k*40, 1000 if k < 2 else None))
+			i = start + k
+			if k >= 1:
+				level.edges.append((i - 1, i))
+			if k >= 2:
+				level.edges.append((i - 2, i))
+		level.base.extend(range(start, start + min(count, 2)))
+	return level
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то создаем или преобразуем уровень и измеряем время его загрузки.
+	'''
+	# Импортируем класс HeadlessGame из файла headless (здесь, чтобы не было циклического импорта)
+	from headless import HeadlessGame
+
+	parser = argparse.ArgumentParser(description='Уровни World of Doo: создание, преобразование и время загрузки.')
+	parser.add_argument('path', help='файл уровня (.json -- JSON, иначе двоичный формат)')
+	parser.add_argument('--generate', type=int, default=None, metavar='N', help='создать уровень с готовыми башнями из N узлов')
+	parser.add_argument('--region-size', type=float, default=400, help='сторона региона для --generate (0 -- без регионов)')
+	parser.add_argument('--out', default=None, help='записать уровень в другой файл (формат по расширению)')
+	args = parser.parse_args()
+
+	if args.generate is not None:
+		save_level(generate_level(args.generate, region_size=args.region_size or None), args.path)
+	start = time.perf_counter()
+	level = load_level(args.path)
+	read_time = time.perf_counter() - start
+	if args.out is not None:
+		save_level(level, args.out)
+
+	start = time.perf_counter()
+	game = HeadlessGame(level.width, level.height, level=level)
+	full_time = time.perf_counter() - start
+	# Первый экран -- левый нижний угол игровой области размером 400x600.
+	start = time.perf_counter()
+	lazy_game = HeadlessGame(level.width, level.height, level=level, lazy_level=True)
+	lazy_game.simulation.stream_level(pm.BB(0, level.height - 600, 400, level.height))
+	lazy_time = time.perf_counter() - start
+	print('узлов {0}, ребер {1}, регионов {2}'.format(len(level.nodes), len(level.edges), len(game.simulation.level_loader.regions)))
+	print('чтение файла {0:.1f} мс'.format(read_time*1000))
+	print('загрузка целиком {0:.1f} мс (узлов: {1})'.format(full_time*1000, len(game.simulation.graph)))
+	print('загрузка первого экрана {0:.1f} мс (узлов: {1})'.format(lazy_time*1000, len(lazy_game.simulation.graph)))
@@ -0,0 +1,85 @@
+import time
+
+
+class PhaseTimer():
+	''' Класс для измерения времени отдельных этапов кадра (шаг физики, удаление вылетевших Ду, поиск узлов, отрисовка и т.д.).
+
+	Перед первым этапом вызываем start, после каждого этапа -- lap с названием этапа.
+	Время этапа -- время от предыдущего вызова start или lap. Все измерения хранятся в списках samples[название].
+	Если объекту (например, симуляции) таймер не нужен, то вместо него хранится None, и измерения ничего не стоят.
+
+	Атрибуты:
+	----------
+	samples : dict
+		Словарь samples[название_этапа] = [время, время, ...] в секундах.
+	last : float
+		Момент последнего вызова start или lap (time.perf_counter).
+	'''
+	def __init__(self):
+		self.samples 	= {}
+		self.last 		= time.perf_counter()
+
+	def start(self):
+		''' Метод, отмечающий начало первого этапа.
+		'''
+		self.last = time.perf_counter()
+
+	def lap(self, name):
+		''' Метод, сохраняющий время этапа name и отмечающий начало следующего этапа.
+
+		Аргументы:
+		----------
+		name : str
+			Название закончившегося этапа.
+		'''
+		now = time.perf_counter()
+		samples = self.samples.get(name)
+		if samples is None:
+			samples = self.samples[name] = []
+		samples.append(now - self.last)
+		self.last = now
+
+	def add(self, name, seconds):
+		''' Метод, сохраняющий время этапа name, измеренное в другом месте (например, в потоке физики).
+
+		Аргументы:
+		----------
+		name : str
+			Название этапа.
+		seconds : float
+			Время этапа в секундах.
+		'''
+		samples = self.samples.get(name)
+		if samples is None:
+			samples = self.samples[name] = []
+		samples.append(seconds)
+
+	def clear(self):
+		''' Метод для удаления всех измерений.
+		'''
+		self.samples.clear()
+
+	def percentiles(self, name, points=(50, 90, 99)):
+		''' Метод для нахождения процентилей времени этапа.
+
+		Используется метод ближайшего ранга: p-й процентиль -- наименьшее измерение, не меньшее p% всех измерений.
+
+		Аргументы:
+		----------
+		name : str
+			Название этапа.
+		points : tuple
+			Процентили (числа от 0 до 100).
+
+		Возвращаемое значение:
+		----------
+		dict : Словарь {процентиль: время в секундах}. Пустой, если измерений не было.
+		'''
+		samples = sorted(self.samples.get(name, ()))
+		if not samples:
+			return {}
+		result = {}
+		for p in points:
+			rank = max(1, -(-p * len(samples) // 100))
+			result[p] = samples[min(rank, len(samples)) - 1]
+		return result
@@ -0,0 +1,370 @@
+''' Физика в отдельном потоке: поток симуляции публикует снимки кадра, а основной поток рисует последний из них.
+
+Без этого модуля ввод, шаги физики, отрисовка и pg.display.update выполняются в игровом цикле друг за другом,
+и время кадра равно их сумме. Здесь шаги физики делает поток PhysicsThread со своим таймером (см. класс FixedStepLoop),
+а основной поток только собирает события, рисует и выводит картинку на экран. Время кадра -- большее из двух времен.
+
+Обмен между потоками устроен так, чтобы потокам не приходилось ждать друг друга:
+1. Ввод (координаты курсора, действия игрока и видимая часть игровой области) основной поток кладет в очередь inputs
+   (collections.deque: append и popleft атомарны, блокировок не нужно). Поток физики разбирает очередь перед шагами.
+2. После шага поток физики собирает неизменяемый снимок кадра FrameState (положения и углы Ду, концы пружин, подсказки)
+   и публикует его в одном из двух слотов states, после чего переключает индекс front (двойная буферизация).
+   Основной поток читает states[front] и больше никогда не обращается к пространству симуляции.
+   Второй слот -- предыдущий снимок. Между ними основной поток интерполирует положения тел.
+3. Всё остальное, что меняет симуляцию (например, включение карты нагрузки), передается в поток физики функцией (метод call).
+
+Интерпретатор Python выполняет байт-код только в одном потоке (GIL), поэтому потоки идут действительно параллельно,
+только пока один из них находится в C: space.step (Chipmunk через cffi) и вывод на экран (SDL) отпускают GIL.
+'''
+import threading
+import time
+from collections import deque
+import pymunk as pm
+# Импортируем класс FixedStepLoop из файла fixed_step
+from fixed_step import FixedStepLoop
+# Импортируем класс PhaseTimer из файла phase_timer
+from phase_timer import PhaseTimer
+
+
+# Этапы шага физики, время которых поток физики передает профайлеру (см. метод Simulation.step).
+PHASES = ('step', 'remove_escaped', 'candidates')
+
+
+class FrameState():
+	''' Класс для неизменяемого снимка кадра, по которому основной поток рисует игровую область.
+
+	Все координаты -- координаты пространства симуляции. Снимок создается в потоке физики и после публикации не меняется.
+	Тела хранятся только как ключи для интерполяции: их атрибуты основной поток не читает.
+
+	Атрибуты:
+	----------
+	step_count : int
+		Номер шага физики, после которого сделан снимок.
+	time : float
+		Момент создания снимка (time.perf_counter).
+	bodies : tuple
+		Тела, положения которых есть в снимке.
+	transforms : tuple
+		Положения и углы поворота тел в виде кортежей (x, y, angle) в том же порядке, что и bodies.
+	doos : tuple
+		Ду, которые нужно нарисовать, в виде кортежей (номер_тела, цвет или None, радиус).
+	springs : tuple
+		Пружины в виде кортежей (номер_тела_a, номер_тела_b, rest_length).
+	strain : tuple или None
+		Деформации пружин в том же порядке, что и springs (None у пружин, которых нет в графе),
+		вычисленные анализом нагрузки (см. модуль stress). None, если карта нагрузки выключена или анализ нагрузки не включен.
+	static_shapes : tuple
+		Статические фигуры (пол, стены). Они никогда не двигаются, поэтому их можно рисовать из любого потока.
+	hover : tuple или None
+		Положение свободного Ду под курсором мыши.
+	hint : tuple или None
+		Подсказка для строительства (см. метод WorldState.build_hint).
+	phase_time : tuple
+		Суммарное время этапов PHASES в секундах с начала работы потока физики.
+	counts : dict или None
+		Числа тел, спящих тел, фигур, пружин и узлов графа (для профайлера). None, если профайлер выключен.
+	'''
+	def __init__(self, step_count, bodies, transforms, doos, springs, strain, static_shapes, hover, hint, phase_time, counts):
+		self.step_count 	= step_count
+		self.time 			= time.perf_counter()
+		self.bodies 		= bodies
+		self.transforms 	= transforms
+		self.doos 			= doos
+		self.springs 		= springs
+		self.strain 		= strain
+		self.static_shapes 	= static_shapes
+		self.hover 			= hover
+		self.hint 			= hint
+		self.phase_time 	= phase_time
+		self.counts 		= counts
+
+
+	def blend(self, previous, alpha):
+		''' Метод, возвращающий положения тел между предыдущим снимком и этим: previous + (current - previous) * alpha.
+
+		Тела, которых нет в предыдущем снимке, остаются в текущем положении (как в классе Interpolator).
+
+		Аргументы:
+		----------
+		previous : FrameState или None
+			Снимок, сделанный на шаг раньше. None -- положения не интерполируются.
+		alpha : float
+			Доля шага физики, прошедшая после этого снимка (от 0 до 1).
+
+		Возвращаемое значение:
+		----------
+		tuple или list : Положения тел (x, y, angle) в том же порядке, что и bodies.
+		'''
+		if previous is None or alpha >= 1:
+			return self.transforms
+		prior = dict(zip(previous.bodies, previous.transforms))
+		transforms = []
+		for body, current in zip(self.bodies, self.transforms):
+			state = prior.get(body)
+			if state is None:
+				transforms.append(current)
+				continue
+			x, y, a = state
+			transforms.append((x + (current[0] - x)*alpha, y + (current[1] - y)*alpha, a + (current[2] - a)*alpha))
+		return transforms
+
+
+
+
+class PhysicsThread(threading.Thread):
+	''' Класс потока, в котором выполняются ввод и шаги физики.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция. После запуска потока с ней работает только поток физики.
+	control : Simulation или Recorder
+		Объект, через который вызываются handle_input и step (Recorder при записи сессии).
+	physics_rate : int
+		Частота шагов физики в [шаги/секунда].
+	max_substeps : int
+		Максимальное число шагов физики подряд, если поток не успевает (см. класс FixedStepLoop).
+
+	Атрибуты:
+	----------
+	simulation : Simulation
+		Симуляция.
+	control : Simulation или Recorder
+		Объект, через который вызываются handle_input и step.
+	loop : FixedStepLoop
+		Объект, определяющий число шагов физики по прошедшему времени.
+	inputs : collections.deque
+		Очередь ввода от основного потока: кортежи ('input', координаты_курсора, действия, видимая_часть) и ('call', функция).
+	states : list
+		Два слота для снимков кадра (FrameState или None).
+	front : int
+		Номер слота с последним опубликованным снимком.
+	view : pymunk.BB или None
+		Видимая часть игровой области (с запасом). Если задана, то в снимок попадают только видимые Ду и их пружины.
+	timing : bool
+		Если True, то время этапов шага физики измеряется, а в снимок записываются числа тел (включается вместе с профайлером).
+	heatmap : bool
+		Если True, то в снимок записываются деформации пружин для карты нагрузки (переключается основным потоком).
+	timer : PhaseTimer
+		Таймер для этапов шага физики.
+	phase_time : dict
+		Суммарное время этапов PHASES в секундах.
+	running : bool
+		Поток работает, пока running равен True (см. метод stop).
+	error : Exception или None
+		Исключение, на котором остановился поток физики. Основной поток должен его проверить и выбросить у себя.
+	space : pymunk.Space или None
+		Пространство симуляции, для которого найдены static_shapes (при восстановлении снимка оно заменяется новым).
+	static_shapes : tuple
+		Статические фигуры пространства симуляции.
+	shapes : list
+		Набор фигур пространства симуляции, для которого найдены doo_shapes.
+	doo_shapes : list
+		Динамические фигуры (Ду) пространства симуляции.
+	'''
+	def __init__(self, simulation, control=None, physics_rate=60, max_substeps=5):
+		threading.Thread.__init__(self, name='physics', daemon=True)
+		self.simulation 	= simulation
+		self.control 		= control if control is not None else simulation
+		self.loop 			= FixedStepLoop(physics_rate, max_substeps)
+		self.inputs 		= deque()
+		self.states 		= [None, None]
+		self.front 			= 0
+		self.view 			= None
+		self.timing 		= False
+		self.heatmap 		= False
+		self.timer 			= PhaseTimer()
+		self.phase_time 	= dict.fromkeys(PHASES, 0.0)
+		self.running 		= True
+		self.error 			= None
+		self.space 			= None
+		self.static_shapes 	= ()
+		self.shapes 		= []
+		self.doo_shapes 	= []
+		# Первый снимок делаем до запуска потока, чтобы основному потоку всегда было что рисовать.
+		self.publish(self.capture())
+
+
+	def send(self, mouse_pos, actions=(), view=None):
+		''' Метод для передачи ввода одного кадра в поток физики (вызывается из основного потока).
+
+		Аргументы:
+		----------
+		mouse_pos : tuple
+			Координаты курсора мыши в пространстве симуляции.
+		actions : list
+			Действия игрока (см. метод Simulation.handle).
+		view : pymunk.BB или None
+			Видимая часть игровой области с запасом. None -- рисуется вся игровая область.
+		'''
+		self.inputs.append(('input', mouse_pos, actions, view))
+
+	def call(self, function):
+		''' Метод для выполнения function(simulation) в потоке физики между шагами (вызывается из основного потока).
+
+		Аргументы:
+		----------
+		function : function
+			Функция одного аргумента (симуляции).
+		'''
+		self.inputs.append(('call', function))
+
+	def latest(self):
+		''' Метод, возвращающий последний и предыдущий снимки кадра (вызывается из основного потока).
+
+		Пока основной поток читает слоты, поток физики может опубликовать новые снимки.
+		Снимки неизменяемы, поэтому каждый из них цел. Но предыдущий снимок годится для интерполяции,
+		только если он сделан ровно на шаг раньше последнего. Иначе вместо него возвращается None.
+
+		Возвращаемое значение:
+		----------
+		tuple : (последний снимок, предыдущий снимок или None).
+		'''
+		front = self.front
+		current = self.states[front]
+		previous = self.states[1 - front]
+		if previous is None or previous.step_count != current.step_count - 1:
+			previous = None
+		return current, previous
+
+	def stop(self):
+		''' Метод для остановки потока физики. Возвращается, когда поток закончил последний шаг.
+		'''
+		self.running = False
+		if self.is_alive():
+			self.join()
+
+	def run(self):
+		''' Метод, выполняющийся в потоке физики.
+
+		Разбираем очередь ввода, делаем столько шагов физики, сколько помещается в прошедшее время, и публикуем снимки
+		двух последних шагов (для интерполяции). Если шагать пока рано, то спим до следующего шага (сон отпускает GIL).
+		'''
+		loop = self.loop
+		last = time.perf_counter()
+		try:
+			while self.running:
+				self.handle_inputs()
+				now = time.perf_counter()
+				steps = loop.advance(now - last)
+				last = now
+				self.simulation.timer = self.timer if self.timing else None
+				for i in range(steps):
+					self.control.step()
+					if i >= steps - 2:
+						self.publish(self.capture())
+				if steps == 0:
+					time.sleep(loop.dt - loop.accumulator)
+		except Exception as error:
+			self.error = error
+			self.running = False
+
+	def handle_inputs(self):
+		''' Метод, разбирающий очередь ввода от основного потока.
+		'''
+		inputs = self.inputs
+		while inputs:
+			item = inputs.popleft()
+			if item[0] == 'input':
+				kind, mouse_pos, actions, self.view = item
+				self.control.handle_input(mouse_pos, actions)
+			else:
+				item[1](self.simulation)
+
+	def publish(self, state):
+		''' Метод для публикации снимка: записываем его в свободный слот и только потом переключаем front.
+
+		Аргументы:
+		----------
+		state : FrameState
+			Снимок кадра.
+		'''
+		back = 1 - self.front
+		self.states[back] = state
+		self.front = back
+
+	def capture(self):
+		''' Метод, создающий снимок кадра по текущему состоянию симуляции.
+
+		Если задана видимая часть (view), то видимые Ду находим запросом space.bb_query (как DooRenderer.draw_view),
+		а пружины -- по графу. Концы пружин, уходящих за край экрана, тоже попадают в снимок, но не рисуются как Ду.
+
+		Возвращаемое значение:
+		----------
+		FrameState : Снимок кадра.
+		'''
+		simulation = self.simulation
+		space = simulation.space
+		world = simulation.world
+		graph = simulation.graph
+		view = self.view
+		if space is not self.space:
+			self.space = space
+			self.static_shapes = tuple(shape for shape in space.shapes if shape.body.body_type == pm.Body.STATIC)
+			self.shapes = []
+		if view is None:
+			shapes = space.shapes
+			if shapes != self.shapes:
+				self.doo_shapes = [shape for shape in shapes if shape.body.body_type != pm.Body.STATIC]
+				self.shapes = shapes
+			doo_shapes = self.doo_shapes
+		else:
+			doo_shapes = [shape for shape in space.bb_query(view, pm.ShapeFilter()) if shape.body.body_type != pm.Body.STATIC]
+		bodies = []
+		transforms = []
+		doos = []
+		index = {}
+		for shape in doo_shapes:
+			body = shape.body
+			index[body] = len(bodies)
+			position = body.position
+			doos.append((len(bodies), getattr(shape, 'color', None), shape.rad))
+			bodies.append(body)
+			transforms.append((position.x, position.y, body.angle))
+		if view is None:
+			constraints = space.constraints
+		else:
+			# Каждую пружину берем один раз: если видны оба конца, то со стороны узла с меньшим order.
+			constraints = []
+			for shape in doo_shapes:
+				if shape in graph:
+					for neighbour, spring in graph[shape].items():
+						if neighbour.body not in index or shape.order < neighbour.order:
+							constraints.append(spring)
+		# Деформации берем из анализа нагрузки, только если их нужно рисовать и они вычислены для текущего графа.
+		stress = simulation.stress
+		strain = None
+		if self.heatmap and stress is not None and stress.current():
+			values = stress.strain.tolist()
+			spring_index = stress.index
+			strain = []
+		springs = []
+		for spring in constraints:
+			ends = []
+			for body in (spring.a, spring.b):
+				i = index.get(body)
+				if i is None:
+					i = index[body] = len(bodies)
+					position = body.position
+					bodies.append(body)
+					transforms.append((position.x, position.y, body.angle))
+				ends.append(i)
+			springs.append((ends[0], ends[1], spring.rest_length))
+			if strain is not None:
+				i = spring_index.get(spring)
+				strain.append(None if i is None else values[i])
+		hover = None
+		if world.free_doo_under_cursor is not None:
+			position = world.free_doo_under_cursor.body.position
+			hover = (position.x, position.y)
+		hint = world.build_hint(graph) if world.shape_being_dragged is not None else None
+		counts = None
+		if self.timing:
+			for phase, samples in self.timer.samples.items():
+				self.phase_time[phase] = self.phase_time.get(phase, 0.0) + sum(samples)
+			self.timer.clear()
+			counts = simulation.counts()
+		phase_time = tuple(self.phase_time.get(phase, 0.0) for phase in PHASES)
+		return FrameState(simulation.step_count, tuple(bodies), tuple(transforms), tuple(doos), tuple(springs),
+							None if strain is None else tuple(strain), self.static_shapes,
+							hover, hint, phase_time, counts)
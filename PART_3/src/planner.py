@@ -0,0 +1,445 @@
+''' Автоматический строитель башни: перебор мест для постройки с проверкой каждого симуляцией (rollout).
+
+Одно решение строителя:
+	1. Кандидаты (функция candidates): точки, в которых можно отпустить Ду так, чтобы игра приняла постройку
+	   (пару узлов выбирает тот же метод Graph.build_pair, что и при строительстве игроком):
+		- над и под каждым ребром (a, b) на расстояниях distances от обоих узлов -- постройка нового узла;
+		- посередине между двумя несоседними узлами -- постройка пружины между ними.
+	   Из всех точек проверяются max_candidates: половина -- самые высокие (рост башни), остальные -- ниже (укрепление башни).
+	2. Проверка (функция rollout): состояние симуляции сохраняется в снимок (см. модуль snapshot), для каждого кандидата
+	   снимок восстанавливается в отдельной симуляции без дисплея, Ду отпускается в точке кандидата (строит ShapeCreator.build)
+	   и симуляция идет rollout_time секунд. Результат -- высота башни, наибольшее растяжение пружин и число отделившихся узлов.
+	3. Выбор (функция choose): самая высокая башня без отделившихся узлов и с растяжением пружин не больше max_stretch.
+	   Выбранная постройка выполняется в настоящей симуляции так же, как её сделал бы игрок (с записью в историю для отмены).
+
+Кандидаты проверяются параллельно в процессах ProcessPoolExecutor. Каждый процесс один раз создает свою симуляцию
+(функция init_worker), а для каждой проверки только восстанавливает в ней снимок: снимок -- строка байтов,
+поэтому передача состояния в процесс стоит одного pickle этих байтов. Кандидаты делятся на пачки по числу процессов,
+и снимок передается один раз на пачку.
+При workers=0 кандидаты проверяются в текущем процессе (тоже в отдельной симуляции, настоящая симуляция не меняется).
+
+Запуск из консоли:
+	python planner.py --builds 100 --workers 4 --out tower.level
+'''
+import argparse
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import pymunk as pm
+# Импортируем класс HeadlessGame из файла headless
+from headless import HeadlessGame
+# Импортируем функции save_state и load_state из файла snapshot
+from snapshot import save_state, load_state
+# Импортируем параметры и функции из файла sweep
+from sweep import PARAMETERS, apply_params
+# Импортируем функции capture_level и save_level из файла level
+from level import capture_level, save_level
+
+
+# Место для постройки: точка, в которой отпускается Ду, и номера order пары узлов, к которым достраивается башня.
+Candidate = namedtuple('Candidate', ['x', 'y', 'first', 'second'])
+# Результат проверки кандидата: высота башни в конце, наибольшее растяжение пружин, число отделившихся узлов
+# и наклон (насколько центр масс башни вышел за фундамент по оси X, 0 -- не вышел).
+Outcome = namedtuple('Outcome', ['candidate', 'height', 'stretch', 'detached', 'lean'])
+
+# Симуляция процесса, проверяющего кандидатов (создается функцией init_worker один раз на процесс).
+worker_game = None
+
+
+def candidates(simulation, distances=(55, 70, 85), max_candidates=32):
+	''' Функция, возвращающая места для постройки, которые примет игра.
+	Если мест больше max_candidates, то половина из них -- самые высокие, остальные выбираются равномерно из более низких.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	distances : tuple
+		Расстояния от точки постройки нового узла до концов ребра.
+	max_candidates : int
+		Наибольшее число кандидатов.
+
+	Возвращаемое значение:
+	----------
+	list : Объекты Candidate, отсортированные по высоте (сначала самые высокие).
+	'''
+	graph = simulation.graph
+	world = simulation.world
+	space = simulation.space
+	points = []
+	for a, neighbours in graph.items():
+		pa = a.body.position
+		for b in neighbours:
+			if b.order < a.order:
+				continue
+			pb = b.body.position
+			mx, my = (pa.x + pb.x) / 2, (pa.y + pb.y) / 2
+			dx, dy = pb.x - pa.x, pb.y - pa.y
+			half = math.hypot(dx, dy) / 2
+			if half == 0:
+				continue
+			# Единичный перпендикуляр к ребру: точки строим по обе его стороны.
+			nx, ny = -dy / (2*half), dx / (2*half)
+			for distance in distances:
+				if distance <= half:
+					continue
+				height = math.sqrt(distance*distance - half*half)
+				points.append((mx + nx*height, my + ny*height))
+				points.append((mx - nx*height, my - ny*height))
+		# Пружина к несоседним узлам: Ду отпускается посередине между ними.
+		for info in space.point_query(pa, 2*graph.furthest_dist, pm.ShapeFilter()):
+			b = info.shape
+			if b in graph and b.order > a.order and b not in neighbours:
+				pb = b.body.position
+				points.append(((pa.x + pb.x) / 2, (pa.y + pb.y) / 2))
+	# Строитель растит башню вверх: проверяем сначала самые высокие точки (ось Y направлена вниз).
+	points.sort(key=lambda point: point[1])
+	result = []
+	seen = set()
+	for x, y in points:
+		if y >= world.ground_y or x <= 0 or x >= world.width:
+			continue
+		key = (round(x), round(y))
+		if key in seen:
+			continue
+		seen.add(key)
+		# Новый узел поверх старого (ближе closest_dist) башню не достраивает.
+		if any(info.shape in graph for info in space.point_query((x, y), graph.closest_dist, pm.ShapeFilter())):
+			continue
+		pair = graph.build_pair((x, y), space)
+		if pair is None:
+			continue
+		result.append(Candidate(x, y, pair[0].order, pair[1].order))
+	if len(result) <= max_candidates:
+		return result
+	# Половина кандидатов -- самые высокие точки (рост башни), остальные -- равномерно из более низких (укрепление башни).
+	top = max_candidates - max_candidates // 2
+	rest = result[top:]
+	count = max_candidates - top
+	return result[:top] + [rest[i * len(rest) // count] for i in range(count)]
+
+
+def drop(simulation, x, y):
+	''' Функция, создающая свободного Ду в точке (x, y), хватающая его и делающая шаг (ищутся узлы для строительства),
+	так же, как это делал бы игрок. После неё остается только отпустить Ду.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	x, y : float
+		Точка постройки.
+
+	Возвращаемое значение:
+	----------
+	list : Номера order пары узлов, к которой будет достроена башня, по возрастанию (пустой список, если строить негде).
+		Кандидат одинаково удален от обоих концов ребра, поэтому порядок узлов в паре (см. Graph.build_pair) зависит
+		от шага физики, и сравнивать нужно только сами узлы.
+	'''
+	simulation.handle_input((x, y), ['create'])
+	simulation.handle_input((x, y), ['pick'])
+	simulation.step()
+	return sorted(fixed_doo.order for fixed_doo in simulation.graph.fixed_doo_for_build)
+
+
+def init_worker(settings):
+	''' Функция, создающая симуляцию процесса для проверки кандидатов. Выполняется один раз при запуске процесса.
+
+	Аргументы:
+	----------
+	settings : dict
+		Настройки симуляции (см. функцию simulation_settings).
+	'''
+	global worker_game
+	# NumPy нужен только для проверки кандидатов, поэтому модуль stress импортируем только здесь.
+	from stress import StressAnalyzer
+	worker_game = HeadlessGame(settings['width'], settings['height'], settings['fps'], settings['sleep_time'], settings['idle_speed'],
+								settings['level'], settings['lazy_level'])
+	apply_params(worker_game.simulation, settings['params'])
+	worker_game.simulation.stress = StressAnalyzer(worker_game.simulation, settings['break_strain'])
+
+
+def simulation_settings(simulation):
+	''' Функция, собирающая настройки симуляции, нужные, чтобы создать такую же симуляцию в другом процессе.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+
+	Возвращаемое значение:
+	----------
+	dict : Настройки (размеры, шаг физики, режим сна, уровень, параметры из sweep.PARAMETERS и разрыв пружин).
+	'''
+	params = {name: getattr(getattr(simulation, owner), attribute) for name, (owner, attribute) in PARAMETERS.items()}
+	break_strain = simulation.stress.break_strain if simulation.stress is not None else None
+	return {'width': simulation.world.width, 'height': simulation.world.height, 'fps': simulation.fps,
+			'sleep_time': simulation.sleep_time, 'idle_speed': simulation.idle_speed,
+			'level': simulation.level, 'lazy_level': simulation.lazy_level, 'params': params, 'break_strain': break_strain}
+
+
+def rollout(data, batch, steps):
+	''' Функция, проверяющая пачку кандидатов в симуляции процесса. Выполняется в процессе ProcessPoolExecutor.
+
+	Для каждого кандидата: восстанавливаем снимок, отпускаем Ду в точке кандидата (строит ShapeCreator.build)
+	и выполняем steps шагов. Деформацию пружин после каждого шага вычисляет StressAnalyzer симуляции процесса
+	(если в настоящей симуляции пружины рвутся, то и при проверке они рвутся так же).
+
+	Аргументы:
+	----------
+	data : bytes
+		Снимок состояния симуляции (см. функцию save_state).
+	batch : list
+		Объекты Candidate.
+	steps : int
+		Число шагов симуляции после постройки.
+
+	Возвращаемое значение:
+	----------
+	list : Объекты Outcome (None для кандидатов, постройка которых не совпала с ожидаемой).
+	'''
+	simulation = worker_game.simulation
+	world = simulation.world
+	graph = simulation.graph
+	outcomes = []
+	for candidate in batch:
+		load_state(simulation, data)
+		if drop(simulation, candidate.x, candidate.y) != sorted((candidate.first, candidate.second)):
+			outcomes.append(None)
+			continue
+		# Отпускаем Ду без сохранения снимка для отмены (Simulation.handle('release') сохранил бы его).
+		world.release_picked_doo(graph, simulation.shape_creator)
+		stretch = 0.0
+		for i in range(steps):
+			simulation.step()
+			if len(simulation.stress.strain):
+				stretch = max(stretch, float(abs(simulation.stress.strain).max()))
+		height = world.ground_y - min(fixed_doo.body.position.y for fixed_doo in graph)
+		detached = sum(len(nodes) for nodes in graph.detached())
+		outcomes.append(Outcome(candidate, height, stretch, detached, lean(graph)))
+	return outcomes
+
+
+def lean(graph):
+	''' Функция, возвращающая, насколько центр масс башни вышел по оси X за фундамент (за отрезок между крайними узлами фундамента).
+	Башня, центр масс которой вышел за фундамент, опрокидывается (если её не держит стена).
+
+	Аргументы:
+	----------
+	graph : Graph
+		Башня из фиксированных Ду.
+
+	Возвращаемое значение:
+	----------
+	float : Расстояние от центра масс до фундамента по оси X (0, если центр масс над фундаментом).
+	'''
+	mass = sum(fixed_doo.body.mass for fixed_doo in graph)
+	x = sum(fixed_doo.body.position.x * fixed_doo.body.mass for fixed_doo in graph) / mass
+	base = [fixed_doo.body.position.x for fixed_doo in graph.base]
+	return max(min(base) - x, x - max(base), 0.0)
+
+
+def choose(outcomes, max_stretch=0.5):
+	''' Функция, выбирающая лучшую постройку: самую высокую устойчивую башню без отделившихся узлов
+	и с допустимым растяжением пружин. Башни с меньшим наклоном (см. функцию lean) всегда лучше башен с большим,
+	при равной высоте выбирается постройка с меньшим растяжением.
+
+	Аргументы:
+	----------
+	outcomes : list
+		Объекты Outcome (None пропускаются).
+	max_stretch : float
+		Наибольшее допустимое относительное растяжение пружин.
+
+	Возвращаемое значение:
+	----------
+	Outcome или None : Лучший результат (None, если ни одна постройка не подходит).
+	'''
+	valid = [outcome for outcome in outcomes if outcome is not None and not outcome.detached]
+	if not valid:
+		return None
+	allowed = [outcome for outcome in valid if outcome.stretch <= max_stretch]
+	if not allowed:
+		# Любая постройка перегружает пружины: выбираем ту, что нагружает их меньше всего (обычно это укрепление башни).
+		return min(valid, key=lambda outcome: (outcome.lean, outcome.stretch))
+	return max(allowed, key=lambda outcome: (-outcome.lean, outcome.height, -outcome.stretch))
+
+
+class Planner():
+	''' Класс автоматического строителя башни.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция, в которой строится башня.
+	workers : int или None
+		Число процессов для проверки кандидатов. None -- по числу ядер процессора, 0 -- проверка в текущем процессе.
+	rollout_time : float
+		Сколько секунд симуляции проверяется каждая постройка.
+	max_candidates : int
+		Наибольшее число кандидатов на одно решение.
+	max_stretch : float
+		Наибольшее допустимое относительное растяжение пружин (см. функцию choose).
+
+	Атрибуты:
+	----------
+	simulation : Simulation
+		Симуляция, в которой строится башня.
+	workers : int
+		Число процессов (0 -- проверка в текущем процессе).
+	rollout_steps : int
+		Число шагов симуляции при проверке каждой постройки.
+	max_candidates : int
+		Наибольшее число кандидатов на одно решение.
+	max_stretch : float
+		Наибольшее допустимое относительное растяжение пружин.
+	executor : ProcessPoolExecutor или None
+		Процессы для проверки кандидатов.
+	decision_times : list
+		Время каждого решения в секундах (перебор кандидатов, проверка и выбор).
+	'''
+	def __init__(self, simulation, workers=None, rollout_time=1.0, max_candidates=32, max_stretch=0.5):
+		self.simulation 	= simulation
+		self.workers 		= os.cpu_count() if workers is None else workers
+		self.rollout_steps 	= int(rollout_time * simulation.fps)
+		self.max_candidates = max_candidates
+		self.max_stretch 	= max_stretch
+		self.executor 		= None
+		self.decision_times = []
+		settings = simulation_settings(simulation)
+		if self.workers > 0:
+			self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(settings,))
+		else:
+			init_worker(settings)
+
+
+	def evaluate(self, batch):
+		''' Метод, проверяющий кандидатов на текущем состоянии симуляции.
+
+		Аргументы:
+		----------
+		batch : list
+			Объекты Candidate.
+
+		Возвращаемое значение:
+		----------
+		list : Объекты Outcome (или None) в порядке кандидатов.
+		'''
+		data = save_state(self.simulation)
+		if self.executor is None:
+			return rollout(data, batch, self.rollout_steps)
+		# Пачки по числу процессов: снимок передается в процесс один раз на пачку.
+		chunks = [batch[i::self.workers] for i in range(self.workers)]
+		futures = [self.executor.submit(rollout, data, chunk, self.rollout_steps) for chunk in chunks]
+		outcomes = [None] * len(batch)
+		for i, future in enumerate(futures):
+			# Пачка i -- кандидаты batch[i], batch[i + workers], batch[i + 2*workers], ...
+			outcomes[i::self.workers] = future.result()
+		return outcomes
+
+	def decide(self):
+		''' Метод, выбирающий следующую постройку.
+
+		Возвращаемое значение:
+		----------
+		Outcome или None : Лучший результат проверки (None, если строить негде).
+		'''
+		start = time.perf_counter()
+		best = choose(self.evaluate(candidates(self.simulation, max_candidates=self.max_candidates)), self.max_stretch)
+		self.decision_times.append(time.perf_counter() - start)
+		return best
+
+	def commit(self, candidate):
+		''' Метод, выполняющий постройку в настоящей симуляции так же, как её сделал бы игрок.
+
+		Аргументы:
+		----------
+		candidate : Candidate
+			Место для постройки.
+
+		Если игра достроила бы башню не к той паре узлов, которая была проверена, то Ду отпускается без постройки.
+
+		Возвращаемое значение:
+		----------
+		bool : True, если башня достроена.
+		'''
+		simulation = self.simulation
+		springs = len(simulation.space.constraints)
+		if drop(simulation, candidate.x, candidate.y) != sorted((candidate.first, candidate.second)):
+			simulation.graph.fixed_doo_for_build.clear()
+		simulation.handle_input((candidate.x, candidate.y), ['release'])
+		return len(simulation.space.constraints) > springs
+
+	def build(self, builds, settle_steps=30, on_build=None):
+		''' Метод, строящий башню: builds решений, после каждой постройки симуляция идет settle_steps шагов.
+
+		Аргументы:
+		----------
+		builds : int
+			Число построек.
+		settle_steps : int
+			Число шагов после каждой постройки.
+		on_build : function или None
+			Функция, вызываемая после каждой постройки с номером постройки и результатом проверки (Outcome).
+
+		Возвращаемое значение:
+		----------
+		int : Число выполненных построек (меньше builds, если строить стало негде).
+		'''
+		built = 0
+		for i in range(builds):
+			best = self.decide()
+			if best is None or not self.commit(best.candidate):
+				break
+			built += 1
+			for j in range(settle_steps):
+				self.simulation.step()
+			if on_build is not None:
+				on_build(i, best)
+		return built
+
+	def close(self):
+		''' Метод, завершающий процессы проверки кандидатов.
+		'''
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то строим высокую башню и выводим время решений.
+	'''
+	parser = argparse.ArgumentParser(description='Автоматическое строительство башни World of Doo.')
+	parser.add_argument('--builds', type=int, default=50, help='число построек')
+	parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию -- число ядер, 0 -- без процессов)')
+	parser.add_argument('--candidates', type=int, default=32, help='наибольшее число кандидатов на одно решение')
+	parser.add_argument('--rollout-time', type=float, default=1.0, help='сколько секунд симуляции проверяется каждая постройка')
+	parser.add_argument('--settle-steps', type=int, default=30, help='число шагов после каждой постройки')
+	parser.add_argument('--max-stretch', type=float, default=0.5, help='наибольшее допустимое растяжение пружин')
+	parser.add_argument('--out', default=None, help='файл уровня для готовой башни (см. модуль level)')
+	args = parser.parse_args()
+
+	game = HeadlessGame()
+	simulation = game.simulation
+	planner = Planner(simulation, args.workers, args.rollout_time, args.candidates, args.max_stretch)
+
+	def on_build(i, best):
+		print('\r{0}/{1}: высота {2:.0f}, решение {3:.0f} мс'.format(i + 1, args.builds, best.height, planner.decision_times[-1] * 1000),
+			end='', flush=True)
+
+	try:
+		built = planner.build(args.builds, args.settle_steps, on_build)
+	finally:
+		planner.close()
+	print()
+	height = simulation.world.ground_y - min(fixed_doo.body.position.y for fixed_doo in simulation.graph)
+	times = sorted(planner.decision_times)
+	print('построек: {0}, узлов: {1}, высота башни: {2:.0f}'.format(built, len(simulation.graph), height))
+	if times:
+		print('решение: медиана {0:.0f} мс, максимум {1:.0f} мс'.format(times[len(times) // 2] * 1000, times[-1] * 1000))
+	if args.out is not None:
+		save_level(capture_level(simulation), args.out)
+		print('башня сохранена в ' + args.out)
@@ -0,0 +1,182 @@
+''' Пул Ду: повторное использование удаленных Ду вместо создания новых.
+
+Каждый новый Ду -- это объекты pm.Body и pm.Poly (и объекты Chipmunk за ними, созданные через CFFI).
+Если Ду часто создаются и удаляются (например, вылетают за границы игровой области), то на это уходит заметное время
+и работа сборщика мусора. Поэтому удаленные Ду кладутся в пул, а при создании нового Ду сначала берется Ду из пула.
+Ду из пула ведет себя в симуляции точно так же (бит в бит), как новый Ду.
+
+У взятого из пула Ду сбрасываются положение, скорость, угол, угловая скорость, силы, ground, collision_type и трение,
+а у фиксированных Ду еще масса, момент инерции, order и цвет. Тело и фигура остаются связанными друг с другом.
+Ду в пуле не находятся в пространстве симуляции: класть в пул можно только Ду, уже удаленных из пространства.
+'''
+import pymunk as pm
+# Импортируем классы DooFree и DooFixed из файла doo.py
+from doo import DooFree, DooFixed
+
+
+# Радиусы, с которыми создаются новые Ду каждого вида (см. классы DooFree и DooFixed).
+DEFAULT_RADIUS = {DooFree: 10, DooFixed: 8}
+
+
+class DooPool():
+	''' Класс, хранящий удаленных свободных и фиксированных Ду для повторного использования.
+
+	Аргументы:
+	----------
+	native_filter : bool
+		Если True, то новые Ду получают фильтры столкновений (см. класс Doo).
+	capacity : int
+		Наибольшее число Ду каждого вида в пуле. Лишние Ду выбрасываются. 0 -- пул выключен.
+
+	Атрибуты:
+	----------
+	native_filter : bool
+		Если True, то новые Ду получают фильтры столкновений.
+	capacity : int
+		Наибольшее число Ду каждого вида в пуле.
+	free : dict
+		Словарь {класс Ду: список Ду в пуле}.
+	hits : int
+		Сколько раз Ду был взят из пула.
+	misses : int
+		Сколько раз пул был пуст и Ду был создан заново.
+	released : int
+		Сколько Ду было положено в пул.
+	dropped : int
+		Сколько Ду было выброшено, потому что пул был полон.
+	'''
+	def __init__(self, native_filter=False, capacity=512):
+		self.native_filter 	= native_filter
+		self.capacity 		= capacity
+		self.free 			= {DooFree: [], DooFixed: []}
+		self.hits 			= 0
+		self.misses 		= 0
+		self.released 		= 0
+		self.dropped 		= 0
+
+
+	@property
+	def size(self):
+		''' Число Ду в пуле.
+		'''
+		return sum(len(doos) for doos in self.free.values())
+
+	@property
+	def hit_rate(self):
+		''' Доля запросов, выполненных из пула (0, если запросов не было).
+		'''
+		requests = self.hits + self.misses
+		return self.hits / requests if requests else 0.0
+
+	def stats(self):
+		''' Метод, возвращающий статистику пула.
+
+		Возвращаемое значение:
+		----------
+		dict : Размер пула, число попаданий и промахов, доля попаданий, число положенных и выброшенных Ду.
+		'''
+		return {'size': self.size, 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+				'released': self.released, 'dropped': self.dropped}
+
+	def reset_body(self, doo, x, y):
+		''' Метод для сброса общих для всех Ду параметров.
+
+		Кроме скорости, в Chipmunk у тела есть поправка скорости (v_bias), которую решатель копит для устранения перекрытий.
+		Она обнуляется только при интегрировании положения, а из pymunk недоступна.
+		Поэтому сначала интегрируем положение с шагом 0: положение не меняется, а поправка обнуляется.
+		Иначе Ду из пула на первом шаге сдвинулся бы не так, как новый Ду.
+
+		Аргументы:
+		----------
+		doo : Doo
+			Ду из пула.
+		x : float или int
+			Позиция центра масс Ду по оси X.
+		y : float или int
+			Позиция центра масс Ду по оси Y.
+		'''
+		body = doo.body
+		pm.Body.update_position(body, 0)
+		body.position 			= x, y
+		body.velocity 			= 0, 0
+		body.angle 				= 0
+		body.angular_velocity 	= 0
+		body.force 				= 0, 0
+		body.torque 			= 0
+		doo.ground 				= False
+
+	def free_doo(self, x, y):
+		''' Метод, возвращающий свободного Ду: из пула или новый.
+
+		Аргументы:
+		----------
+		x : float или int
+			Позиция центра масс Ду по оси X.
+		y : float или int
+			Позиция центра масс Ду по оси Y.
+
+		Возвращаемое значение:
+		----------
+		DooFree : Свободный Ду (еще не добавленный в пространство симуляции).
+		'''
+		doos = self.free[DooFree]
+		if not doos:
+			self.misses += 1
+			return DooFree(x, y, native_filter=self.native_filter)
+		self.hits += 1
+		free_doo = doos.pop()
+		self.reset_body(free_doo, x, y)
+		free_doo.friction 		= 10
+		free_doo.collision_type = 0
+		return free_doo
+
+	def fixed_doo(self, x, y, mass, moment):
+		''' Метод, возвращающий фиксированного Ду: из пула или новый.
+
+		Аргументы:
+		----------
+		x : float или int
+			Позиция центра масс Ду по оси X.
+		y : float или int
+			Позиция центра масс Ду по оси Y.
+		mass : float или int
+			Масса Ду.
+		moment : float или int
+			Момент инерции Ду.
+
+		Возвращаемое значение:
+		----------
+		DooFixed : Фиксированный Ду (еще не добавленный в пространство симуляции).
+		'''
+		doos = self.free[DooFixed]
+		if not doos:
+			self.misses += 1
+			return DooFixed(x, y, mass=mass, moment=moment, native_filter=self.native_filter)
+		self.hits += 1
+		fixed_doo = doos.pop()
+		self.reset_body(fixed_doo, x, y)
+		fixed_doo.body.mass 		= mass
+		fixed_doo.body.moment 		= moment
+		fixed_doo.friction 			= 100
+		fixed_doo.collision_type 	= 1
+		fixed_doo.order 			= 0
+		fixed_doo.color 			= (200, 200, 0, 255)
+		return fixed_doo
+
+	def release(self, doos):
+		''' Метод, кладущий в пул Ду, удаленных из пространства симуляции.
+
+		Ду, оставшиеся в пространстве симуляции, и Ду нестандартного размера в пул не кладутся.
+
+		Аргументы:
+		----------
+		doos : list
+			Удаленные Ду.
+		'''
+		for doo in doos:
+			pooled = self.free.get(type(doo))
+			if pooled is None or len(pooled) >= self.capacity or doo.body.space is not None or doo.rad != DEFAULT_RADIUS[type(doo)]:
+				self.dropped += 1
+				continue
+			pooled.append(doo)
+			self.released += 1
@@ -0,0 +1,204 @@
+import csv
+import json
+from collections import deque
+import pygame as pg
+# Импортируем класс PhaseTimer из файла phase_timer
+from phase_timer import PhaseTimer
+
+
+class Profiler():
+	''' Класс для измерения времени этапов кадра игры и отображения его поверх игры.
+
+	Игровой цикл после каждого этапа вызывает timer.lap(название_этапа), а в конце кадра -- end_frame.
+	Время этапов одного кадра складывается (за кадр может быть несколько шагов физики) и сохраняется в frames.
+	В frames хранятся только последние window кадров.
+	На панели рисуется график времени кадров: каждый кадр -- столбец из отрезков разного цвета (по одному на этап).
+	Каждый кадр график сдвигается на пиксель влево и дорисовывается только новый столбец.
+	Под графиком выводятся числа тел (из них спящих), фигур, пружин и узлов графа и среднее время каждого этапа.
+	Если задан stream_path, то время этапов каждого кадра записывается в файл: CSV (если путь оканчивается на .csv) или JSONL.
+
+	Когда профайлер выключен (enabled = False), игровой цикл не передает таймер никуда, и измерения ничего не стоят.
+
+	Аргументы:
+	----------
+	phases : list
+		Названия этапов в порядке выполнения.
+	window : int
+		Число последних кадров, которые хранятся и отображаются на графике.
+	graph_height : int
+		Высота графика в пикселях.
+	ms_per_pixel : float
+		Сколько миллисекунд соответствует одному пикселю графика по вертикали.
+	stream_path : str или None
+		Путь к файлу для записи измерений.
+
+	Атрибуты:
+	----------
+	phases : list
+		Названия этапов в порядке выполнения.
+	enabled : bool
+		Включен ли профайлер.
+	timer : PhaseTimer
+		Таймер для измерения времени этапов текущего кадра.
+	frames : collections.deque
+		Время этапов последних window кадров в миллисекундах (списки в порядке phases).
+	counts : dict
+		Числа тел, спящих тел, фигур, пружин и узлов графа в последнем кадре.
+	frame_number : int
+		Число измеренных кадров.
+	window : int
+		Число последних кадров на графике.
+	graph_height : int
+		Высота графика в пикселях.
+	ms_per_pixel : float
+		Сколько миллисекунд соответствует одному пикселю графика.
+	budget_ms : float
+		Время одного кадра при 60 FPS. На графике отмечается линией.
+	colors : list
+		Цвета этапов в формате RGB.
+	graph : pygame.Surface или None
+		Поверхность с графиком.
+	stream_path : str или None
+		Путь к файлу для записи измерений.
+	stream : file или None
+		Открытый файл для записи измерений.
+	writer : csv.writer или None
+		Объект для записи строк CSV.
+	'''
+	def __init__(self, phases, window=240, graph_height=80, ms_per_pixel=0.25, stream_path=None):
+		self.phases 		= list(phases)
+		self.enabled 		= False
+		self.timer 			= PhaseTimer()
+		self.frames 		= deque(maxlen=window)
+		self.counts 		= {}
+		self.frame_number 	= 0
+		self.window 		= window
+		self.graph_height 	= graph_height
+		self.ms_per_pixel 	= ms_per_pixel
+		self.budget_ms 		= 1000/60
+		self.colors 		= [(52, 152, 219), (231, 76, 60), (46, 204, 113), (241, 196, 15), (155, 89, 182), (230, 126, 34), (26, 188, 156), (127, 140, 141)]
+		self.graph 			= None
+		self.stream_path 	= stream_path
+		self.stream 		= None
+		self.writer 		= None
+
+
+	def toggle(self):
+		''' Метод для включения и выключения профайлера.
+		'''
+		self.enabled = not self.enabled
+		self.timer.clear()
+		self.timer.start()
+
+	def end_frame(self, simulation, counts=None):
+		''' Метод, завершающий измерение кадра.
+
+		Складываем время этапов кадра, сохраняем его, дорисовываем график и (если нужно) записываем в файл.
+
+		Аргументы:
+		----------
+		simulation : Simulation или None
+			Симуляция. Числа тел, фигур, пружин и узлов берутся из Simulation.counts.
+		counts : dict или None
+			Готовые числа тел, фигур, пружин и узлов (если физика идет в отдельном потоке, см. модуль physics_thread).
+			Если заданы, то simulation не читается.
+		'''
+		samples = self.timer.samples
+		row = [sum(samples.get(phase, ())) * 1000 for phase in self.phases]
+		self.timer.clear()
+		self.frames.append(row)
+		if counts is None:
+			counts = simulation.counts()
+		self.counts = counts
+		self.add_column(row)
+		if self.stream_path is not None:
+			self.write(row)
+		self.frame_number += 1
+
+	def add_column(self, row):
+		''' Метод, сдвигающий график на пиксель влево и рисующий справа столбец нового кадра.
+
+		Аргументы:
+		----------
+		row : list
+			Время этапов кадра в миллисекундах.
+		'''
+		if self.graph is None:
+			self.graph = pg.Surface((self.window, self.graph_height))
+			self.graph.fill((255, 255, 255))
+		graph = self.graph
+		x = self.window - 1
+		graph.scroll(-1, 0)
+		pg.draw.line(graph, (255, 255, 255), (x, 0), (x, self.graph_height))
+		y = self.graph_height
+		for value, color in zip(row, self.colors):
+			height = value / self.ms_per_pixel
+			if height >= 1:
+				pg.draw.line(graph, color, (x, y), (x, max(0, y - height)))
+			y -= height
+		graph.set_at((x, max(0, int(self.graph_height - self.budget_ms / self.ms_per_pixel))), (0, 0, 0))
+
+	def draw(self, surface, font, position=(10, 30)):
+		''' Метод для отображения панели профайлера.
+
+		Аргументы:
+		----------
+		surface : pygame.Surface
+			Поверхность (экран игры), на которой рисуем.
+		font : pygame.font.Font
+			Шрифт для вывода текста.
+		position : tuple
+			Координаты левого верхнего угла панели.
+
+		Возвращаемое значение:
+		----------
+		pygame.Rect : Область, занятая панелью.
+		'''
+		if self.graph is None:
+			return pg.Rect(position, (0, 0))
+		x, y = position
+		rect = surface.blit(self.graph, (x, y))
+		y += self.graph_height + 2
+		counts = self.counts
+		text = 'тел {0} (спят {1})  фигур {2}  пружин {3}  узлов {4}'.format(counts['bodies'], counts['sleeping'], counts['shapes'], counts['constraints'], counts['nodes'])
+		rect.union_ip(surface.blit(font.render(text, True, (50, 50, 50), (255, 255, 255)), (x, y)))
+		y += font.get_linesize()
+		frames = len(self.frames)
+		for i, phase in enumerate(self.phases):
+			mean = sum(row[i] for row in self.frames) / frames
+			rect.union_ip(surface.fill(self.colors[i], (x, y + 3, 8, 8)))
+			rect.union_ip(surface.blit(font.render('{0} {1:.2f} мс'.format(phase, mean), True, (50, 50, 50), (255, 255, 255)), (x + 12, y)))
+			y += font.get_linesize()
+		return rect
+
+	def write(self, row):
+		''' Метод для записи времени этапов кадра в файл stream_path.
+
+		Файл открывается при первой записи. Формат выбирается по расширению: .csv -- CSV, иначе -- JSONL.
+
+		Аргументы:
+		----------
+		row : list
+			Время этапов кадра в миллисекундах.
+		'''
+		counts = self.counts
+		if self.stream is None:
+			self.stream = open(self.stream_path, 'w', encoding='utf-8', newline='')
+			if self.stream_path.endswith('.csv'):
+				self.writer = csv.writer(self.stream)
+				self.writer.writerow(['frame'] + self.phases + list(counts))
+		if self.writer is not None:
+			self.writer.writerow([self.frame_number] + ['{0:.4f}'.format(value) for value in row] + list(counts.values()))
+		else:
+			sample = {'frame': self.frame_number}
+			sample.update(zip(self.phases, row))
+			sample.update(counts)
+			self.stream.write(json.dumps(sample) + '\n')
+
+	def close(self):
+		''' Метод для закрытия файла с измерениями.
+		'''
+		if self.stream is not None:
+			self.stream.close()
+			self.stream = None
+			self.writer = None
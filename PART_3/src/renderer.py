@@ -0,0 +1,502 @@
+import pygame as pg
+import pymunk as pm
+import math	# Нужны градусы при выборе повернутого спрайта.
+
+
+class DooRenderer():
+	''' Класс для быстрого отображения пространства симуляции на поверхности world (замена space.debug_draw).
+
+	space.debug_draw вызывает Python-функцию для каждой фигуры и пружины и рисует каждого Ду отдельным pg.draw.polygon.
+	Здесь всё устроено иначе:
+	1. Статические тела (пол и стены) никогда не двигаются, поэтому один раз рисуем их вместе с фоном на отдельной поверхности static_layer.
+	   В каждом кадре копируем с неё на world только те области, где в прошлом кадре что-то было нарисовано (world.previous_rects).
+	   Нарисованные в этом кадре области запоминаем в world.dirty_rects, чтобы потом скопировать на экран только их (см. World.blit_me).
+	2. Положения и углы поворота всех тел читаем за один проход по space.bodies.
+	3. Ду -- квадраты, поэтому повернутый на 90 градусов Ду выглядит так же, как неповернутый.
+	   Заранее поворачиваем спрайт Ду на углы от 0 до 90 градусов (angle_steps вариантов) и храним результат в словаре sprites.
+	   Всех Ду рисуем одним вызовом world.blits.
+	4. Пружины разбиваем на цепочки (пути в графе, где соседние пружины имеют общий конец).
+	   Каждую цепочку рисуем одним вызовом pg.draw.lines. Разбиение пересчитывается только при изменении набора пружин.
+	5. Если задан stress (карта нагрузки), то каждая пружина рисуется отдельно цветом, зависящим от её деформации:
+	   от зеленого (не деформирована) через желтый к красному (деформация heatmap_scale и больше).
+	6. Если задан viewport (игровая область больше окна), то рисуется только видимая часть (см. метод draw_view).
+	   Видимые фигуры находим запросом space.bb_query к пространственному индексу Chipmunk,
+	   поэтому Ду и пружины за пределами экрана не стоят ничего.
+	7. Если физика идет в отдельном потоке, то рисуется снимок кадра из этого потока (см. метод draw_state и модуль physics_thread).
+
+	Аргументы:
+	----------
+	world : World
+		Игровая область, на которой рисуем.
+	space : pymunk.Space
+		Пространство симуляции.
+	angle_steps : int
+		Число вариантов поворота спрайта на отрезке от 0 до 90 градусов.
+
+	Атрибуты:
+	----------
+	world : World
+		Игровая область, на которой рисуем.
+	space : pymunk.Space
+		Пространство симуляции.
+	angle_steps : int
+		Число вариантов поворота спрайта на отрезке от 0 до 90 градусов.
+	dynamic_color : tuple
+		Цвет динамических тел без атрибута color (свободных Ду) в формате RGB. Такой же, как у space.debug_draw.
+	static_color : tuple
+		Цвет статических тел в формате RGB. Такой же, как у space.debug_draw.
+	spring_color : tuple
+		Цвет пружин в формате RGB. Такой же, как у space.debug_draw.
+	static_layer : pygame.Surface или None
+		Поверхность с фоном и статическими телами.
+	shapes : list
+		Набор фигур пространства симуляции, для которого вычислены static_shapes и doos.
+	static_shapes : list
+		Статические фигуры, нарисованные на static_layer. Если их набор изменился, то static_layer рисуется заново.
+	doos : list
+		Динамические фигуры (Ду) в виде кортежей (тело, цвет, радиус).
+	sprites : dict
+		Словарь sprites[(цвет, радиус, номер_поворота)] = повернутый спрайт Ду.
+	trails : list
+		Цепочки пружин: списки тел, соседние тела в которых соединены пружиной.
+	trail_constraints : list
+		Набор пружин, для которого вычислены цепочки trails.
+	stress : StressAnalyzer или None
+		Объект с деформациями пружин. Если задан, то пружины рисуются как карта нагрузки (методы draw и draw_view).
+	heatmap : bool
+		Рисовать ли карту нагрузки по снимку кадра (метод draw_state). Когда физика идет в отдельном потоке,
+		объект stress меняется в потоке физики, поэтому основной поток хранит только этот флаг.
+	heatmap_scale : float
+		Деформация (по модулю), которой соответствует красный цвет на карте нагрузки.
+	heatmap_colors : list
+		Цвета карты нагрузки от зеленого к красному.
+	viewport : Viewport или None
+		Видимая часть игровой области. Если None, то рисуется вся игровая область.
+	graph : Graph или None
+		Граф башни. Если задан viewport, то пружины видимых узлов берутся из графа (иначе перебираются все пружины).
+	cull_margin : float
+		Запас вокруг видимой части в пикселях пространства симуляции. Ду, задевающие экран, и пружины, пересекающие край экрана,
+		находятся запросом с этим запасом (пружина рисуется, если хотя бы один её конец попал в запрос).
+	view_key : tuple или None
+		Положение и масштаб камеры, для которых нарисован static_layer.
+	drawn : tuple
+		Числа Ду и пружин, нарисованных в последнем кадре.
+	'''
+	def __init__(self, world, space, angle_steps=90):
+		self.world 				= world
+		self.space 				= space
+		self.angle_steps 		= angle_steps
+		self.dynamic_color 		= (52, 152, 219)
+		self.static_color 		= (149, 165, 166)
+		self.spring_color 		= (142, 68, 173)
+		self.static_layer 		= None
+		self.shapes 			= []
+		self.static_shapes 		= []
+		self.doos 				= []
+		self.sprites 			= {}
+		self.trails 			= []
+		self.trail_constraints 	= []
+		self.stress 			= None
+		self.heatmap 			= False
+		self.heatmap_scale 		= 0.2
+		self.heatmap_colors 	= [(min(255, 510*i//31), min(255, 510*(31-i)//31), 0) for i in range(32)]
+		self.viewport 			= None
+		self.graph 				= None
+		self.cull_margin 		= 100
+		self.view_key 			= None
+		self.drawn 				= (0, 0)
+
+
+	def draw(self, interpolator=None, alpha=1.0):
+		''' Метод для отображения пространства симуляции на поверхности world.
+
+		Аргументы:
+		----------
+		interpolator : Interpolator или None
+			Объект, хранящий положения тел перед последним шагом физики. Если None, то тела рисуются в текущем положении.
+		alpha : float
+			Доля шага физики, прошедшая после последнего шага (см. FixedStepLoop.alpha).
+		'''
+		if self.viewport is not None:
+			self.draw_view(interpolator, alpha)
+			return
+		world = self.world
+		if self.view_key is not None:
+			# static_layer нарисован для камеры, а теперь нужна вся игровая область.
+			self.static_layer = None
+			self.view_key = None
+		if self.sort_shapes() or world.full_redraw or not world.track_dirty:
+			world.blit(self.static_layer, (0, 0))
+			world.full_redraw = True
+		else:
+			# Стираем нарисованное в прошлом кадре, копируя фон из static_layer.
+			world.blits([(self.static_layer, rect, rect) for rect in world.previous_rects], False)
+		# Читаем положения и углы поворота всех тел за один проход.
+		transforms = {}
+		for body in self.space.bodies:
+			if interpolator is None:
+				position = body.position
+				transforms[body] = (position.x, position.y, body.angle)
+			else:
+				transforms[body] = interpolator.transform(body, alpha)
+		self.draw_springs(transforms)
+		self.draw_doos(transforms)
+		self.drawn = (len(self.doos), len(self.space.constraints))
+
+	def draw_view(self, interpolator=None, alpha=1.0):
+		''' Метод для отображения только видимой части игровой области (если задан viewport).
+
+		Видимые фигуры (и статические, и Ду) находим одним запросом space.bb_query. Chipmunk отвечает на него
+		с помощью своего пространственного индекса, поэтому время не зависит от числа фигур за пределами экрана.
+		static_layer имеет размер экрана и рисуется заново, только если камера сдвинулась или изменился масштаб.
+		Пока камера неподвижна, стираем и копируем на экран только изменившиеся области (как в методе draw).
+		Пружины берем из графа: у каждого видимого узла есть словарь {сосед: пружина}.
+
+		Аргументы:
+		----------
+		interpolator : Interpolator или None
+			Объект, хранящий положения тел перед последним шагом физики. Если None, то тела рисуются в текущем положении.
+		alpha : float
+			Доля шага физики, прошедшая после последнего шага (см. FixedStepLoop.alpha).
+		'''
+		world = self.world
+		viewport = self.viewport
+		zoom = viewport.zoom
+		static_shapes = []
+		shapes = []
+		doos = []
+		transforms = {}
+		for shape in self.space.bb_query(viewport.bb(self.cull_margin), pm.ShapeFilter()):
+			body = shape.body
+			if body.body_type == pm.Body.STATIC:
+				static_shapes.append(shape)
+				continue
+			shapes.append(shape)
+			doos.append((body, getattr(shape, 'color', self.dynamic_color), shape.rad*zoom))
+			transforms[body] = self.screen_transform(body, interpolator, alpha)
+		if static_shapes != self.static_shapes or viewport.key != self.view_key or world.full_redraw or not world.track_dirty:
+			if self.static_layer is None or self.static_layer.get_size() != world.get_size():
+				self.static_layer = pg.Surface(world.get_size(), 0, world)
+			self.static_layer.fill(world.color)
+			for shape in static_shapes:
+				self.draw_static_shape(self.static_layer, shape, viewport)
+			self.static_shapes = static_shapes
+			self.view_key = viewport.key
+			# Набор фигур для метода draw больше не соответствует static_layer.
+			self.shapes = []
+			world.blit(self.static_layer, (0, 0))
+			world.full_redraw = True
+		else:
+			world.blits([(self.static_layer, rect, rect) for rect in world.previous_rects], False)
+		springs = self.draw_view_springs(shapes, transforms, interpolator, alpha)
+		self.draw_doos(transforms, doos)
+		self.drawn = (len(doos), springs)
+
+	def draw_state(self, state, previous=None, alpha=1.0):
+		''' Метод для отображения снимка кадра из потока физики (см. модуль physics_thread).
+
+		Пространство симуляции в этом методе не читается: положения Ду и концов пружин берутся из снимка.
+		Снимок уже содержит только видимые Ду (если задан viewport), поэтому запрос space.bb_query не нужен.
+		Фон и статические фигуры рисуются на static_layer так же, как в методах draw и draw_view.
+
+		Аргументы:
+		----------
+		state : FrameState
+			Последний снимок кадра.
+		previous : FrameState или None
+			Снимок, сделанный на шаг раньше. Если задан, то тела рисуются между двумя снимками.
+		alpha : float
+			Доля шага физики, прошедшая после последнего снимка.
+		'''
+		world = self.world
+		viewport = self.viewport
+		zoom = 1 if viewport is None else viewport.zoom
+		key = None if viewport is None else viewport.key
+		if (state.static_shapes is not self.static_shapes or key != self.view_key or self.static_layer is None
+				or self.static_layer.get_size() != world.get_size() or world.full_redraw or not world.track_dirty):
+			if self.static_layer is None or self.static_layer.get_size() != world.get_size():
+				self.static_layer = pg.Surface(world.get_size(), 0, world)
+			self.static_layer.fill(world.color)
+			for shape in state.static_shapes:
+				self.draw_static_shape(self.static_layer, shape, viewport)
+			self.static_shapes = state.static_shapes
+			self.view_key = key
+			# Набор фигур для метода draw больше не соответствует static_layer.
+			self.shapes = []
+			world.blit(self.static_layer, (0, 0))
+			world.full_redraw = True
+		else:
+			world.blits([(self.static_layer, rect, rect) for rect in world.previous_rects], False)
+		transforms = state.blend(previous, alpha)
+		if viewport is not None:
+			transforms = [viewport.world_to_screen(x, y) + (angle,) for x, y, angle in transforms]
+		rects = world.dirty_rects
+		# Деформации пружин вычислены в потоке физики (StressAnalyzer) и лежат в снимке.
+		heatmap = self.heatmap and state.strain is not None
+		width = 2 if heatmap else 1
+		scale = 31 / self.heatmap_scale
+		for i, (a, b, rest_length) in enumerate(state.springs):
+			a = transforms[a]
+			b = transforms[b]
+			color = self.spring_color
+			if heatmap and state.strain[i] is not None:
+				color = self.heatmap_colors[min(31, int(abs(state.strain[i]) * scale))]
+			rects.append(pg.draw.line(world, color, a[:2], b[:2], width))
+		self.draw_doos(transforms, [(i, color or self.dynamic_color, r*zoom) for i, color, r in state.doos])
+		self.drawn = (len(state.doos), len(state.springs))
+
+	def screen_transform(self, body, interpolator=None, alpha=1.0):
+		''' Метод, возвращающий положение тела на экране и его угол поворота (с учетом viewport).
+
+		Аргументы:
+		----------
+		body : pymunk.Body
+			Тело.
+		interpolator : Interpolator или None
+			Объект для интерполяции положения тела.
+		alpha : float
+			Доля шага физики, прошедшая после последнего шага.
+
+		Возвращаемое значение:
+		----------
+		tuple : (x, y, angle), где x и y -- координаты на экране.
+		'''
+		if interpolator is None:
+			position = body.position
+			x, y, angle = position.x, position.y, body.angle
+		else:
+			x, y, angle = interpolator.transform(body, alpha)
+		x, y = self.viewport.world_to_screen(x, y)
+		return x, y, angle
+
+	def draw_view_springs(self, shapes, transforms, interpolator=None, alpha=1.0):
+		''' Метод для отображения пружин, хотя бы один конец которых находится в видимой части (с запасом cull_margin).
+
+		Каждую пружину рисуем один раз: если видны оба конца, то со стороны узла с меньшим order.
+		Если задан stress, то цвет пружины зависит от её деформации (как на карте нагрузки).
+
+		Аргументы:
+		----------
+		shapes : list
+			Видимые Ду.
+		transforms : dict
+			Словарь transforms[body] = (x, y, angle) для видимых тел (координаты экрана).
+		interpolator : Interpolator или None
+			Объект для интерполяции положения тел.
+		alpha : float
+			Доля шага физики, прошедшая после последнего шага.
+
+		Возвращаемое значение:
+		----------
+		int : Число нарисованных пружин.
+		'''
+		world = self.world
+		rects = world.dirty_rects
+		# Деформации берем из анализа нагрузки, если они вычислены для текущего набора пружин.
+		stress = self.stress if self.stress is not None and self.stress.current() else None
+		if stress is not None:
+			strain = stress.strain.tolist()
+			scale = 31 / self.heatmap_scale
+		width = 2 if stress is not None else 1
+		graph = self.graph
+		if graph is not None:
+			springs = []
+			for shape in shapes:
+				if shape in graph:
+					for neighbour, spring in graph[shape].items():
+						if neighbour.body not in transforms or shape.order < neighbour.order:
+							springs.append(spring)
+		else:
+			springs = [spring for spring in self.space.constraints if spring.a in transforms or spring.b in transforms]
+		for spring in springs:
+			a = transforms.get(spring.a) or self.screen_transform(spring.a, interpolator, alpha)
+			b = transforms.get(spring.b) or self.screen_transform(spring.b, interpolator, alpha)
+			color = self.spring_color
+			if stress is not None and spring in stress.index:
+				color = self.heatmap_colors[min(31, int(abs(strain[stress.index[spring]]) * scale))]
+			rects.append(pg.draw.line(world, color, a[:2], b[:2], width))
+		return len(springs)
+
+	def sort_shapes(self):
+		''' Метод для разделения фигур на статические и динамические.
+
+		Разделение пересчитывается, только если набор фигур пространства симуляции изменился.
+		Сравнение списков фигур выполняется внутри интерпретатора (без вызова Python-кода для каждой фигуры), поэтому оно быстрое.
+		Если изменился набор статических фигур, то заново рисуем static_layer.
+
+		Возвращаемое значение:
+		----------
+		bool : True, если static_layer был нарисован заново.
+		'''
+		shapes = self.space.shapes
+		if shapes == self.shapes and self.static_layer is not None:
+			return False
+		redrawn = False
+		static_shapes = []
+		self.doos = []
+		for shape in shapes:
+			if shape.body.body_type == pm.Body.STATIC:
+				static_shapes.append(shape)
+			else:
+				self.doos.append((shape.body, getattr(shape, 'color', self.dynamic_color), shape.rad))
+		if static_shapes != self.static_shapes or self.static_layer is None:
+			self.static_layer = pg.Surface(self.world.get_size(), 0, self.world)
+			self.static_layer.fill(self.world.color)
+			for shape in static_shapes:
+				self.draw_static_shape(self.static_layer, shape)
+			self.static_shapes = static_shapes
+			redrawn = True
+		self.shapes = shapes
+		return redrawn
+
+	def draw_static_shape(self, surface, shape, viewport=None):
+		''' Метод для рисования одной статической фигуры.
+
+		Аргументы:
+		----------
+		surface : pygame.Surface
+			Поверхность, на которой рисуем.
+		shape : pymunk.Shape
+			Статическая фигура (pymunk.Segment или pymunk.Poly).
+		viewport : Viewport или None
+			Если задан, то координаты фигуры переводятся в координаты экрана.
+		'''
+		body = shape.body
+		zoom = 1 if viewport is None else viewport.zoom
+		def point(v):
+			p = body.local_to_world(v)
+			return p if viewport is None else viewport.world_to_screen(p.x, p.y)
+		if isinstance(shape, pm.Segment):
+			pg.draw.line(surface, self.static_color, point(shape.a), point(shape.b), max(1, round(shape.radius*2*zoom)))
+		else:
+			pg.draw.polygon(surface, self.static_color, [point(v) for v in shape.get_vertices()])
+
+	def draw_doos(self, transforms, doos=None):
+		''' Метод для отображения всех Ду одним вызовом world.blits.
+
+		Аргументы:
+		----------
+		transforms : dict или list
+			Словарь transforms[body] = (x, y, angle) или список положений (для снимка кадра, см. метод draw_state).
+		doos : list или None
+			Ду в виде кортежей (тело или номер в transforms, цвет, радиус на экране). Если None, то рисуются все Ду (атрибут doos).
+		'''
+		sequence = []
+		for body, color, r in (self.doos if doos is None else doos):
+			x, y, angle = transforms[body]
+			sprite = self.sprite(color, r, angle)
+			w, h = sprite.get_size()
+			sequence.append((sprite, (x - w/2, y - h/2)))
+		self.world.dirty_rects.extend(self.world.blits(sequence))
+
+	def sprite(self, color, r, angle):
+		''' Метод, возвращающий спрайт Ду, повернутый на угол angle.
+
+		Поворот на 90 градусов не меняет квадрат, поэтому угол берем по модулю 90 градусов и округляем до одного из angle_steps вариантов.
+		Повернутые спрайты храним в словаре sprites и создаем только при первом обращении.
+		Угол в pygame отсчитывается против часовой стрелки, а в пространстве симуляции (ось Y вниз) -- по часовой, поэтому меняем знак.
+
+		Аргументы:
+		----------
+		color : tuple
+			Цвет Ду.
+		r : int или float
+			Радиус Ду, т.е. половина стороны квадрата.
+		angle : float
+			Угол поворота Ду в радианах.
+
+		Возвращаемое значение:
+		----------
+		pygame.Surface : Повернутый спрайт.
+		'''
+		step = int((-math.degrees(angle) % 90) / 90 * self.angle_steps + 0.5) % self.angle_steps
+		# При масштабировании радиус может быть дробным. Округляем его, чтобы спрайтов было немного.
+		r = max(1, round(r))
+		key = (tuple(color), r, step)
+		sprite = self.sprites.get(key)
+		if sprite is None:
+			square = pg.Surface((2*r, 2*r), pg.SRCALPHA)
+			square.fill(color)
+			sprite = pg.transform.rotate(square, step * 90 / self.angle_steps)
+			if pg.display.get_surface() is not None:
+				sprite = sprite.convert_alpha()
+			self.sprites[key] = sprite
+		return sprite
+
+	def draw_springs(self, transforms):
+		''' Метод для отображения всех пружин.
+
+		Каждую цепочку пружин рисуем одним вызовом pg.draw.lines.
+
+		Аргументы:
+		----------
+		transforms : dict
+			Словарь transforms[body] = (x, y, angle).
+		'''
+		# Карту нагрузки рисуем, только если деформации вычислены для текущего набора пружин.
+		if self.stress is not None and self.stress.current():
+			self.draw_heatmap(transforms)
+			return
+		constraints = self.space.constraints
+		if constraints != self.trail_constraints:
+			self.trails = self.find_trails(constraints)
+			self.trail_constraints = constraints
+		for trail in self.trails:
+			self.world.dirty_rects.append(pg.draw.lines(self.world, self.spring_color, False, [transforms[body][:2] for body in trail]))
+
+	def draw_heatmap(self, transforms):
+		''' Метод для отображения пружин цветами, соответствующими их деформации.
+
+		Номер цвета каждой пружины вычисляется в NumPy для всех пружин сразу.
+
+		Аргументы:
+		----------
+		transforms : dict
+			Словарь transforms[body] = (x, y, angle).
+		'''
+		buckets = (abs(self.stress.strain) * (31 / self.heatmap_scale)).clip(0, 31).astype(int).tolist()
+		colors = self.heatmap_colors
+		world = self.world
+		rects = world.dirty_rects
+		for spring, bucket in zip(self.stress.springs, buckets):
+			rects.append(pg.draw.line(world, colors[bucket], transforms[spring.a][:2], transforms[spring.b][:2], 2))
+
+	def find_trails(self, constraints):
+		''' Метод для разбиения пружин на цепочки.
+
+		Каждую пружину включаем ровно в одну цепочку.
+		Цепочки начинаем с тел, у которых осталось нечетное число неиспользованных пружин: так цепочек получается меньше.
+
+		Аргументы:
+		----------
+		constraints : list
+			Пружины пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		list : Список цепочек. Цепочка -- список тел.
+		'''
+		adjacency = {}
+		for i, constraint in enumerate(constraints):
+			adjacency.setdefault(constraint.a, []).append((i, constraint.b))
+			adjacency.setdefault(constraint.b, []).append((i, constraint.a))
+		used = [False] * len(constraints)
+		degree = {body: len(edges) for body, edges in adjacency.items()}
+		starts = [body for body in adjacency if degree[body] % 2 == 1] + list(adjacency)
+		trails = []
+		for start in starts:
+			while degree[start] > 0:
+				trail = [start]
+				body = start
+				while degree[body] > 0:
+					edges = adjacency[body]
+					while used[edges[-1][0]]:
+						edges.pop()
+					i, other = edges.pop()
+					used[i] = True
+					degree[body] -= 1
+					degree[other] -= 1
+					trail.append(other)
+					body = other
+				trails.append(trail)
+		return trails
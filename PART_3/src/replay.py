@@ -0,0 +1,309 @@
+''' Запись действий игрока и их воспроизведение без дисплея.
+
+Recorder стоит между игровым циклом и симуляцией: передает в симуляцию вызовы handle_input и step и записывает их.
+Записываются:
+	- каждый вызов handle_input: номер кадра, координаты курсора и действия игрока
+	  (вызовы без действий и без движения мыши пропускаются, они ничего не меняют);
+	- контрольная сумма состояния после каждого checksum_every-го шага физики (см. функцию state_checksum);
+	- контрольная сумма полного снимка состояния в конце записи (см. модуль snapshot);
+	- уровень (в двоичном формате, см. модуль level) и то, подгружается ли он по регионам;
+	- регионы уровня, подгруженные во время игры (см. метод Recorder.stream_level), в тех кадрах, в которых они подгружены.
+Запись должна начинаться сразу после создания объекта Simulation.
+Номер кадра -- число шагов физики с начала записи (Recorder.steps), а не Simulation.step_count:
+отмена постройки и восстановление снимка возвращают step_count назад, а номера кадров записи должны только расти.
+
+Функция replay создает HeadlessGame такого же размера (и с такими же настройками режима сна и разрыва пружин), выполняет записанные вызовы handle_input в тех же кадрах
+и после каждого шага сравнивает контрольные суммы. Первый кадр, в котором сумма не совпала, -- место расхождения.
+Если расхождения нет, то в конце сравнивается сумма полного снимка, т.е. проверяется совпадение состояний бит в бит.
+
+Формат файла: заголовок (HEADER), затем уровень, затем записи вызовов (INPUT), затем контрольные суммы (uint32).
+Вызов handle_input записывается как запись 'move' с координатами курсора и по одной записи на каждое действие.
+Подгрузка регионов записывается как записи 'region' (по одной на регион, в полях x, y -- номер региона).
+
+Запуск из консоли:
+	python replay.py session.rec
+'''
+import argparse
+import struct
+import time
+import zlib
+from array import array
+from collections import namedtuple
+# Импортируем класс HeadlessGame и кортеж Action из файла headless
+from headless import HeadlessGame, Action
+# Импортируем функцию save_state из файла snapshot
+from snapshot import save_state
+# Импортируем класс Level из файла level
+from level import Level
+
+
+# Метка формата и его версия.
+MAGIC = b'DOOR'
+VERSION = 4
+# Заголовок: метка, версия, ширина, высота, частота шагов физики, checksum_every, число шагов,
+# число записей вызовов, число контрольных сумм, контрольная сумма финального снимка,
+# время до засыпания (отрицательное, если режим сна выключен), скорость покоя,
+# деформация разрыва пружин (отрицательная, если пружины не рвутся, см. модуль stress),
+# длина уровня в байтах и подгружается ли уровень по регионам.
+HEADER = struct.Struct('<4sHIIdIQQQIdddQ?')
+# Запись вызова: номер кадра, x, y, код действия.
+INPUT = struct.Struct('<IddB')
+# Коды действий. 'move' начинает новый вызов handle_input, 'region' -- подгруженный регион уровня.
+KINDS = ('move', 'pick', 'create', 'release', 'restart', 'undo', 'save', 'load', 'region')
+CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Содержимое файла записи. inputs -- список объектов Action, checksums -- массив контрольных сумм.
+Recording = namedtuple('Recording', ['width', 'height', 'fps', 'checksum_every', 'steps', 'inputs', 'checksums', 'final_checksum',
+									'sleep_time', 'idle_speed', 'break_strain', 'level', 'lazy_level'])
+# Результат воспроизведения. diverged_step -- первый кадр с несовпавшей контрольной суммой или None.
+ReplayResult = namedtuple('ReplayResult', ['steps', 'diverged_step', 'identical', 'elapsed'])
+
+
+def state_checksum(space):
+	''' Функция для вычисления контрольной суммы состояния всех тел пространства симуляции.
+
+	В сумму входят положение, скорость, угол поворота и угловая скорость каждого тела (в порядке space.bodies).
+	Числа сравниваются бит в бит, поэтому любое расхождение в физике сразу меняет сумму.
+
+	Аргументы:
+	----------
+	space : pymunk.Space
+		Пространство симуляции.
+
+	Возвращаемое значение:
+	----------
+	int : Контрольная сумма CRC32.
+	'''
+	values = array('d')
+	for body in space.bodies:
+		position = body.position
+		velocity = body.velocity
+		values.extend((position.x, position.y, velocity.x, velocity.y, body.angle, body.angular_velocity))
+	return zlib.crc32(values)
+
+
+class Recorder():
+	''' Класс для записи действий игрока и контрольных сумм состояния симуляции.
+
+	Используется вместо симуляции в игровом цикле: методы handle_input, step и stream_level записывают вызов и передают его в simulation.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция, которую записываем. Должна быть только что создана.
+	checksum_every : int
+		Через сколько шагов физики записывать контрольную сумму. 1 -- место расхождения определяется точно до кадра.
+
+	Атрибуты:
+	----------
+	simulation : Simulation
+		Симуляция, которую записываем.
+	checksum_every : int
+		Через сколько шагов физики записывать контрольную сумму.
+	inputs : bytearray
+		Упакованные записи вызовов handle_input.
+	checksums : array.array
+		Контрольные суммы состояния.
+	last_pos : tuple или None
+		Координаты курсора в последнем записанном вызове.
+	steps : int
+		Число шагов физики с начала записи (номер текущего кадра записи).
+	'''
+	def __init__(self, simulation, checksum_every=1):
+		self.simulation 	= simulation
+		self.checksum_every = checksum_every
+		self.inputs 		= bytearray()
+		self.checksums 		= array('I')
+		self.last_pos 		= None
+		self.steps 			= 0
+
+	def handle_input(self, mouse_pos, actions=()):
+		''' Метод для записи и выполнения Simulation.handle_input.
+
+		Аргументы:
+		----------
+		mouse_pos : tuple или list
+			Координаты курсора мыши в этом кадре.
+		actions : list
+			Действия игрока в этом кадре (см. метод Simulation.handle).
+		'''
+		mouse_pos = tuple(mouse_pos)
+		if actions or mouse_pos != self.last_pos:
+			step = self.steps
+			x, y = mouse_pos
+			self.inputs += INPUT.pack(step, x, y, CODES['move'])
+			for action in actions:
+				self.inputs += INPUT.pack(step, x, y, CODES[action])
+			self.last_pos = mouse_pos
+		self.simulation.handle_input(mouse_pos, actions)
+
+	def stream_level(self, bb):
+		''' Метод для выполнения Simulation.stream_level и записи подгруженных регионов.
+
+		Записываются не прямоугольники, а сами регионы, и только если что-то подгрузилось (метод вызывается в каждом кадре).
+
+		Аргументы:
+		----------
+		bb : pymunk.BB
+			Прямоугольник в координатах пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		int : Число загруженных узлов.
+		'''
+		loader = self.simulation.level_loader
+		loaded = set(loader.loaded)
+		count = self.simulation.stream_level(bb)
+		if len(loader.loaded) != len(loaded):
+			step = self.steps
+			for x, y in sorted(loader.loaded - loaded):
+				self.inputs += INPUT.pack(step, x, y, CODES['region'])
+		return count
+
+	def step(self):
+		''' Метод для выполнения Simulation.step и записи контрольной суммы.
+		'''
+		self.simulation.step()
+		self.steps += 1
+		if self.steps % self.checksum_every == 0:
+			self.checksums.append(state_checksum(self.simulation.space))
+
+	def save(self, path):
+		''' Метод для сохранения записи в файл.
+
+		Аргументы:
+		----------
+		path : str
+			Путь к файлу записи.
+		'''
+		simulation = self.simulation
+		break_strain = simulation.stress.break_strain if simulation.stress is not None else None
+		level = simulation.level.to_bytes()
+		header = HEADER.pack(MAGIC, VERSION, simulation.world.width, simulation.world.height, simulation.fps, self.checksum_every,
+							self.steps, len(self.inputs) // INPUT.size, len(self.checksums), zlib.crc32(save_state(simulation)),
+							-1.0 if simulation.sleep_time is None else simulation.sleep_time, simulation.idle_speed,
+							-1.0 if break_strain is None else break_strain, len(level), simulation.lazy_level)
+		with open(path, 'wb') as f:
+			f.write(header)
+			f.write(level)
+			f.write(self.inputs)
+			f.write(self.checksums.tobytes())
+
+
+
+def load_recording(path):
+	''' Функция для чтения записи из файла.
+
+	Аргументы:
+	----------
+	path : str
+		Путь к файлу записи.
+
+	Возвращаемое значение:
+	----------
+	Recording : Содержимое записи.
+	'''
+	with open(path, 'rb') as f:
+		data = f.read()
+	magic, version = struct.unpack_from('<4sH', data)
+	if magic != MAGIC or version != VERSION:
+		raise ValueError('Неизвестный формат записи: {0} версии {1}'.format(magic, version))
+	(magic, version, width, height, fps, checksum_every, steps, n_inputs, n_checksums, final_checksum,
+		sleep_time, idle_speed, break_strain, level_size, lazy_level) = HEADER.unpack_from(data)
+	offset = HEADER.size
+	level = Level.from_bytes(data[offset:offset + level_size])
+	offset += level_size
+	inputs = []
+	for step, x, y, code in INPUT.iter_unpack(data[offset:offset + n_inputs*INPUT.size]):
+		inputs.append(Action(step, KINDS[code], x, y))
+	offset += n_inputs * INPUT.size
+	checksums = array('I')
+	checksums.frombytes(data[offset:offset + n_checksums*checksums.itemsize])
+	return Recording(width, height, fps, checksum_every, steps, inputs, checksums, final_checksum,
+					None if sleep_time < 0 else sleep_time, idle_speed, None if break_strain < 0 else break_strain, level, lazy_level)
+
+
+def replay(recording, stop_on_divergence=True):
+	''' Функция для воспроизведения записи без дисплея.
+
+	Аргументы:
+	----------
+	recording : Recording
+		Запись (см. функцию load_recording).
+	stop_on_divergence : bool
+		Если True, то воспроизведение останавливается в первом кадре с несовпавшей контрольной суммой.
+
+	Возвращаемое значение:
+	----------
+	ReplayResult : Число выполненных шагов, первый кадр расхождения (или None),
+		совпал ли финальный снимок бит в бит и время воспроизведения в секундах.
+	'''
+	game = HeadlessGame(recording.width, recording.height, recording.fps, recording.sleep_time, recording.idle_speed,
+						recording.level, recording.lazy_level)
+	simulation = game.simulation
+	# Разрыв пружин меняет физику, поэтому анализ нагрузки включаем так же, как в записанной игре.
+	if recording.break_strain is not None:
+		# NumPy нужен только для анализа нагрузки, поэтому модуль stress импортируем только здесь.
+		from stress import StressAnalyzer
+		simulation.stress = StressAnalyzer(simulation, recording.break_strain)
+	inputs = recording.inputs
+	every = recording.checksum_every
+	diverged_step = None
+	i = 0
+	steps = 0
+	start = time.perf_counter()
+	for step in range(recording.steps + 1):
+		# Выполняем все вызовы этого кадра в записанном порядке. Вызов handle_input начинается с записи 'move',
+		# подряд идущие записи 'region' -- одна подгрузка регионов.
+		while i < len(inputs) and inputs[i].step == step:
+			if inputs[i].kind == 'region':
+				keys = []
+				while i < len(inputs) and inputs[i].step == step and inputs[i].kind == 'region':
+					keys.append((int(inputs[i].x), int(inputs[i].y)))
+					i += 1
+				simulation.level_loader.load(keys)
+				continue
+			mouse_pos = (inputs[i].x, inputs[i].y)
+			i += 1
+			actions = []
+			while i < len(inputs) and inputs[i].step == step and inputs[i].kind not in ('move', 'region'):
+				actions.append(inputs[i].kind)
+				i += 1
+			simulation.handle_input(mouse_pos, actions)
+		if step == recording.steps:
+			break
+		simulation.step()
+		steps = step + 1
+		if steps % every == 0 and diverged_step is None:
+			if state_checksum(simulation.space) != recording.checksums[steps // every - 1]:
+				diverged_step = steps
+				if stop_on_divergence:
+					break
+	elapsed = time.perf_counter() - start
+	identical = diverged_step is None and zlib.crc32(save_state(simulation)) == recording.final_checksum
+	return ReplayResult(steps, diverged_step, identical, elapsed)
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то воспроизводим запись и сообщаем, совпало ли состояние.
+	'''
+	parser = argparse.ArgumentParser(description='Воспроизведение записи World of Doo без дисплея.')
+	parser.add_argument('path', help='файл записи')
+	args = parser.parse_args()
+
+	recording = load_recording(args.path)
+	result = replay(recording)
+	print('{0} шагов за {1:.3f} с'.format(result.steps, result.elapsed))
+	if result.identical:
+		print('Состояние совпало бит в бит.')
+	elif result.diverged_step is not None:
+		if recording.checksum_every == 1:
+			print('Расхождение началось в кадре {0}.'.format(result.diverged_step))
+		else:
+			first = max(result.diverged_step - recording.checksum_every + 1, 1)
+			print('Расхождение началось в кадрах {0}-{1}.'.format(first, result.diverged_step))
+		raise SystemExit(1)
+	else:
+		print('Контрольные суммы совпали, но финальный снимок отличается.')
+		raise SystemExit(1)
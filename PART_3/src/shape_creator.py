@@ -1,6 +1,6 @@
 import pymunk as pm
-# Импортируем классы DooFree и DooFixed из файла doo.py
-from doo import DooFree, DooFixed
+# Импортируем класс DooPool из файла pool.py
+from pool import DooPool
 
 
 class ShapeCreator():
@@ -12,6 +12,10 @@ class ShapeCreator():
 		Объект, хранящий объекты некоторых типов и содержащий методы для нахождения расстояний.
 	space : pymunk.Space
 		Пространство симуляции, в которое будут добавляться создаваемые объекты.
+	native_filter : bool
+		Если True, то создаваемые Ду получают фильтры столкновений (pm.ShapeFilter), и Ду проходят сквозь друг друга без обработчиков столкновений.
+	pool_capacity : int
+		Наибольшее число Ду каждого вида в пуле удаленных Ду (см. класс DooPool). 0 -- Ду всегда создаются заново.
 
 	Атрибуты:
 	----------
@@ -24,12 +28,24 @@ class ShapeCreator():
 		При низких значениях башня схлопывается, а при крайне высоких -- башня не изгибается так, как в исходной игре.
 	damping : int или float
 		Коэффициент затухания колебаний пружины. Определяет то, как быстро пружины перестают колебаться. Значение подобрано эмпирически.
+	fixed_doo_mass : int или float
+		Масса фиксированных Ду по умолчанию (кроме узлов уровня с заданной массой, например, тяжелого нижнего основания фундамента).
+	fixed_doo_moment : int или float
+		Момент инерции фиксированных Ду.
+	native_filter : bool
+		Если True, то создаваемые Ду получают фильтры столкновений (pm.ShapeFilter).
+	pool : DooPool
+		Пул удаленных Ду. Новые Ду сначала берутся из пула, удаленные Ду кладутся в пул.
 	'''
-	def __init__(self, world, space):
+	def __init__(self, world, space, native_filter=False, pool_capacity=512):
 		self.world = world
 		self.space = space
 		self.spring_strength = 10000
 		self.damping = 100
+		self.fixed_doo_mass = 10
+		self.fixed_doo_moment = 10000
+		self.native_filter = native_filter
+		self.pool = DooPool(native_filter, pool_capacity)
 		
 
 	def create_free_doo(self, x, y):
@@ -37,6 +53,7 @@ class ShapeCreator():
 
 		Для динамических тел в пространство симуляции добавляются и body, и shape.
 		Свободных Ду также добавляем в массив free_doos.
+		Если в пуле есть удаленный свободный Ду, то используем его (см. класс DooPool).
 
 		Аргументы:
 		----------
@@ -44,15 +61,21 @@ class ShapeCreator():
 			Позиция центра масс (body) свободного Ду в пространстве симуляции по оси X.
 		y : float или int
 			озиция центра масс (body) свободного Ду в пространстве симуляции по оси Y.
+
+		Возвращаемое значение:
+		----------
+		DooFree : Созданный свободный Ду.
 		'''
-		free_doo = DooFree(x,y)
+		free_doo = self.pool.free_doo(x, y)
 		self.space.add(free_doo.body, free_doo)
 		self.world.free_doos.append(free_doo)
+		return free_doo
 
-	def create_fixed_doo(self, x, y, mass=10):
+	def create_fixed_doo(self, x, y, mass=None):
 		""" Метод для создания фиксированных Ду.
 
 		Для динамических тел в пространство симуляции добавляются и body, и shape.
+		Если в пуле есть удаленный фиксированный Ду, то используем его (см. класс DooPool).
 
 		Аргументы:
 		----------
@@ -60,14 +83,16 @@ class ShapeCreator():
 			Позиция центра масс (body) свободного Ду в пространстве симуляции по оси X.
 		y : float или int
 			Позиция центра масс (body) свободного Ду в пространстве симуляции по оси Y.
-		mass : float или int
-			Масса фиксированного Ду. Иногда нужно задать массу отличную от значения по умолчанию.
+		mass : float или int или None
+			Масса фиксированного Ду. Иногда нужно задать массу отличную от значения по умолчанию (fixed_doo_mass).
 
 		Возвращаемое значение:
 		----------
 		DooFixed : Возвращаем фиксированного Ду для дальнейшей работы с ним.
 		"""
-		fixed_doo = DooFixed(x, y, mass=mass)
+		if mass is None:
+			mass = self.fixed_doo_mass
+		fixed_doo = self.pool.fixed_doo(x, y, mass, self.fixed_doo_moment)
 		self.space.add(fixed_doo.body, fixed_doo)
 		return fixed_doo
 
@@ -85,146 +110,104 @@ class ShapeCreator():
 			Второй фиксированный Ду.
 		lenght : float или int
 			Длина пружины в расслабленном состоянии (без воздействия внешних сил).
+
+		Возвращаемое значение:
+		----------
+		pymunk.DampedSpring : Созданная пружина (её нужно сохранить в графе, см. Graph.add_edge).
 		"""
 		d = self.world.distance_between_bodies(b1, b2)
 		ds = pm.DampedSpring(b1, b2, (0, 0), (0, 0), d, self.spring_strength, self.damping)
 		self.space.add(ds)
+		return ds
+
+	def connect(self, graph, fd_1, fd_2):
+		""" Метод для соединения двух узлов графа пружиной: создаем пружину и добавляем ребро в граф.
+
+		Аргументы:
+		----------
+		graph : Graph
+			Объект, описывающий башню в игре.
+		fd_1 : DooFixed
+			Первый фиксированный Ду (уже есть в графе).
+		fd_2 : DooFixed
+			Второй фиксированный Ду (уже есть в графе).
+		"""
+		graph.add_edge(fd_1, fd_2, self.create_spring(fd_1.body, fd_2.body))
+
+	def disconnect(self, graph, fd_1, fd_2):
+		""" Метод для удаления ребра графа вместе с его пружиной.
+
+		Аргументы:
+		----------
+		graph : Graph
+			Объект, описывающий башню в игре.
+		fd_1 : DooFixed
+			Первый фиксированный Ду.
+		fd_2 : DooFixed
+			Второй фиксированный Ду.
+
+		Возвращаемое значение:
+		----------
+		set : Узлы, отделившиеся от компоненты связности (см. Graph.remove_edge).
+		"""
+		self.space.remove(graph[fd_1][fd_2])
+		return graph.remove_edge(fd_1, fd_2)
 
 	def remove_escaped_doos(self):
 		''' Метод для удаления Ду, вышедших за границы игровой области.
 
+		Сначала собираем всех вылетевших Ду, а потом удаляем их (удалять Ду из free_doos во время перебора нельзя).
 		Для динамических тел нужно удалять из пространства симуляции и body, и shape.
-		Свободных Ду так же удаляем из списка free_doos.
+		Все вылетевшие Ду удаляем из пространства симуляции одним вызовом space.remove.
+		Свободных Ду так же удаляем из списка free_doos. Удаленных Ду кладем в пул.
+		Если вылетел схваченный Ду, то отпускаем его, иначе при строительстве он будет удален повторно.
 		'''
+		escaped = []
 		for doo in self.world.free_doos:
-			if doo.body.position.y > self.world.height:
-				self.world.free_doos.remove(doo)
-				self.space.remove(doo.body, doo)
-			elif doo.body.position.x < 0 or doo.body.position.x > self.world.width:
-				self.world.free_doos.remove(doo)
-				self.space.remove(doo.body, doo)
+			position = doo.body.position
+			if position.y > self.world.height or position.x < 0 or position.x > self.world.width:
+				escaped.append(doo)
+		if not escaped:
+			return
+		self.world.free_doos.remove_many(escaped)
+		self.space.remove(*[obj for doo in escaped for obj in (doo.body, doo)])
+		self.pool.release(escaped)
+		if self.world.shape_being_dragged in escaped:
+			self.world.shape_being_dragged = None
 
 	def remove_all_doos(self):
 		''' Метод для удаления всех свободных Ду. 
 
 		Используется для рестарта игры.
 		Для динамических тел нужно удалять из пространства симуляции и body, и shape.
-		Очищаем список free_doos.
+		Всех свободных Ду удаляем из пространства симуляции одним вызовом space.remove.
+		Очищаем список free_doos, удаленных Ду кладем в пул.
 		Очищаем переменную shape_being_dragged.
 		'''
 		self.world.shape_being_dragged = None
-		for free_doo in self.world.free_doos:
-			self.space.remove(free_doo.body, free_doo)
+		self.space.remove(*[obj for doo in self.world.free_doos for obj in (doo.body, doo)])
+		self.pool.release(self.world.free_doos)
 		self.world.free_doos.clear()
 
-	def create_static_floor(self, height=15, friction=10):
-		''' Метод для создания пола, т.е. нижней границы игровой области.
-
-		Для статических тел в пространство симуляции добавляется только shape.
-		Переопределяем значения атрибутов friction и collision_type.
-		Collision_type равный 2 будет соответствовать полу.
-		Выбрал форму Poly, а не Segment в надежде, что Ду не будут пролетать сквозь пол при больших скоростях движения.
-		(Например, при падении с большой высоты)
-
-		Аргументы:
-		----------
-		height : float или int
-			Толщина пола. Значение выбрано совершенно произвольно.
-		friction : float или int
-			Коэффициент трения пола. Значение подобрано эмпирически.
-			В Pymunk используется модель Кулона для трения. 
-			Результирующий коэффициент трения находится перемножением коэффициентов трения соприкасающихся шейпов.
-		'''
-		body = pm.Body(body_type = pm.Body.STATIC)
-		body.position = [self.world.width/2, self.world.ground_y]
-		semiwidth = self.world.width/2
-		vs = [(-semiwidth,0), (semiwidth,0), (-semiwidth,height), (semiwidth,height)]
-		poly = pm.Poly(body,vs)
-		poly.friction = friction
-		poly.collision_type = 2
-		self.space.add(poly)
-
-	def create_static_wall(self, x, y, width=1, friction=100):
-		''' Метод для создания вертикальных стен, которые буду боковыми границами игровой области.
-
-		Для статических тел в пространство симуляции добавляется только shape.
-		Переопределяем значения атрибутов friction и collision_type.
-		Collision_type равный 3 будет соответствовать стенам.
-		Центр масс стены расположен в нижней вершине.
-
-		Аргументы:
-		----------
-		x : float или int
-			Позиция центра масс (body) стены в пространстве симуляции по оси X.
-		y : float или int
-			Позиция центра масс (body) стены в пространстве симуляции по оси Y.
-		width : int
-			Толщина стены. Значение выбрано совершенно произвольно.
-		friction : float или int
-			Коэффициент трения стен. Значение подобрано эмпирически. 
-			В Pymunk используется модель Кулона для трения. 
-			Результирующий коэффициент трения находится перемножением коэффициентов трения соприкасающихся шейпов.
-		'''
-		body = pm.Body(body_type = pm.Body.STATIC)
-		body.position = [x,y]
-		line = pm.Segment(body,(0,0),(0,-self.world.height), width)
-		line.friction = friction
-		line.collision_type = 3
-		self.space.add(line)
-
-	def create_start_construction(self, graph, y, semiwidth_bottom=70, semiwidth_top=55, height=122):
-		""" Метод для создания стартовой конструкции из четырех вершин, которая будет служить фундаментом башни.
-
-		Создаем фиксированных Ду, образующих вершины трапеции.
-		Заполняем граф.
-		Находим расстояния между парами соседей (2 значения повторяются, поэтому рассчитываем только 4 из 6).
-		Необходимо предварительно рассчитать длины пружин, чтобы в конструкции не было напряжения, и её не дёргало.
-		Соединяем соседних Ду пружинами.
-
-		Аргументы:
-		----------
-		graph : Graph
-			Объект, описывающий башню в игре.
-		y : float или int
-			Положение нижнего основания фундамента башни в пространстве симуляции по оси Y.
-			Откуда он будет падать вниз на старте.
-		semiwidth_bottom : float или int
-			Полуширина нижнего основания фундамента башни. Значение выбрано совершенно произвольно.
-		semiwidth_top : float или int
-			Полуширина верхнего основания фундамента башни. Значение выбрано совершенно произвольно.
-		height : float или int
-			Высота стартовой конструкции. Значение выбрано совершенно произвольно.
-		"""
-		fd_1 = self.create_fixed_doo(self.world.width//2-semiwidth_bottom, y, mass=1000)
-		fd_2 = self.create_fixed_doo(self.world.width//2+semiwidth_bottom, y, mass=1000)
-		fd_3 = self.create_fixed_doo(self.world.width//2-semiwidth_top, y-height)
-		fd_4 = self.create_fixed_doo(self.world.width//2+semiwidth_top, y-height)
-		graph[fd_1] = [fd_2, fd_3, fd_4]
-		graph[fd_2] = [fd_1, fd_3, fd_4]
-		graph[fd_3] = [fd_1, fd_2, fd_4]
-		graph[fd_4] = [fd_1, fd_2, fd_3]
-		self.create_spring(fd_1.body, fd_2.body)
-		self.create_spring(fd_1.body, fd_3.body)
-		self.create_spring(fd_1.body, fd_4.body)
-		self.create_spring(fd_2.body, fd_3.body)
-		self.create_spring(fd_2.body, fd_4.body)
-		self.create_spring(fd_3.body, fd_4.body)
-
 	def remove_construction(self, graph):
 		""" Метод для удаления башни из игры. 
 
 		Используется для рестарта игры.
 		Надо удалить фиксированных Ду (узлы графа) и пружины (ребра графа) и очистить сам граф.
-		Для получения доступа к пружинам используем атрибут constraints тел фиксированных Ду.
+		Пружины хранятся в графе (см. класс Graph), поэтому всё удаляем одним вызовом space.remove.
+		Удаленных фиксированных Ду кладем в пул.
 
 		Аргументы:
 		----------
 		graph : Graph
 			Объект, описывающий башню в игре.
 		"""
-		for fixed_doo in graph.keys():
-			self.space.remove(fixed_doo.body.constraints)
-			self.space.remove(fixed_doo.body, fixed_doo)
+		objects = graph.springs()
+		for fixed_doo in graph:
+			objects.append(fixed_doo.body)
+			objects.append(fixed_doo)
+		self.space.remove(*objects)
+		self.pool.release(graph)
 		graph.clear()
 
 	def build(self, graph):
@@ -235,8 +218,8 @@ class ShapeCreator():
 			2. Подходящие фиксированные Ду (в fixed_doo_for_build) соседи друг другу.
 		В первом случае просто соединяем фиксированных Ду пружиной.
 		Во втором случае на месте схваченного Ду создаем фиксированного Ду, которого соединяем с башней двумя пружинами.
-		Нужно обновить граф башни.
-		В конце удаляем схваченного свободного Ду из пространства симуляции и списка free_doos.
+		Нужно обновить граф башни (методами add_node и connect, чтобы обновились компоненты связности и пружины ребер).
+		В конце удаляем схваченного свободного Ду из пространства симуляции и списка free_doos (за O(1), см. класс DooList) и кладем его в пул.
 		Для динамических тел нужно удалять из пространства симуляции и body, и shape.
 
 		Аргументы:
@@ -249,15 +232,12 @@ class ShapeCreator():
 		if graph.fixed_doo_for_build[0] in graph[graph.fixed_doo_for_build[1]]:
 			### ВТОРОЙ СЛУЧАЙ
 			new_fixed_doo= self.create_fixed_doo(free_doo.body.position.x, free_doo.body.position.y)
-			graph[graph.fixed_doo_for_build[0]].append(new_fixed_doo)
-			graph[graph.fixed_doo_for_build[1]].append(new_fixed_doo)
-			graph[new_fixed_doo] = [graph.fixed_doo_for_build[0], graph.fixed_doo_for_build[1]]
-			self.create_spring(new_fixed_doo.body, graph.fixed_doo_for_build[0].body)
-			self.create_spring(new_fixed_doo.body, graph.fixed_doo_for_build[1].body)
+			graph.add_node(new_fixed_doo)
+			self.connect(graph, new_fixed_doo, graph.fixed_doo_for_build[0])
+			self.connect(graph, new_fixed_doo, graph.fixed_doo_for_build[1])
 		else:
 			### ПЕРВЫЙ СЛУЧАЙ
-			graph[graph.fixed_doo_for_build[0]].append(graph.fixed_doo_for_build[1])
-			graph[graph.fixed_doo_for_build[1]].append(graph.fixed_doo_for_build[0])
-			self.create_spring(graph.fixed_doo_for_build[0].body, graph.fixed_doo_for_build[1].body)
+			self.connect(graph, graph.fixed_doo_for_build[0], graph.fixed_doo_for_build[1])
 		self.world.free_doos.remove(free_doo)
 		self.space.remove(free_doo.body, free_doo)
+		self.pool.release((free_doo,))
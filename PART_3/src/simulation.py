@@ -0,0 +1,405 @@
+import os
+import pymunk as pm
+from collections import deque
+# Импортируем функции save_state и load_state из файла snapshot
+from snapshot import save_state, load_state
+# Импортируем функцию default_level и класс LevelLoader из файла level
+from level import default_level, LevelLoader
+# Импортируем класс ShapeCreator из файла shape_creator
+from shape_creator import ShapeCreator
+# Импортируем класс Graph из файла graph
+from graph import Graph
+# Импортируем словарь DEFAULT_RADIUS из файла pool
+from pool import DEFAULT_RADIUS
+
+
+# Наибольшее число потоков многопоточного пространства симуляции (больше Chipmunk не использует).
+MAX_THREADS = 2
+
+
+class Simulation():
+	''' Класс, создающий пространство симуляции со всеми игровыми объектами и выполняющий один кадр игры без отображения.
+
+	Используется и в игре (класс Game), и в режиме без дисплея (модуль headless).
+	Благодаря этому пространство симуляции в обоих случаях настраивается одинаково.
+	Действия игрока передаются в симуляцию в виде строк (см. метод handle), а не событий pygame.
+
+	Аргументы:
+	----------
+	world : WorldState или World
+		Игровая область. Для работы без дисплея достаточно объекта класса WorldState.
+	fps : int
+		Частота кадров. Шаг физики равен 1/fps.
+	native_filter : bool
+		Способ сделать так, чтобы Ду проходили сквозь друг друга.
+		Если True, то Ду получают фильтры столкновений (pm.ShapeFilter), и Chipmunk отбрасывает пары Ду-Ду сам, без вызова Python.
+		Если False, то для пар Ду-Ду регистрируются обработчики столкновений, возвращающие False (как раньше).
+	undo_depth : int
+		Сколько последних построек можно отменить (действие 'undo').
+	pool_capacity : int
+		Наибольшее число удаленных Ду каждого вида, которые хранятся для повторного использования (см. модуль pool).
+	sleep_time : float или None
+		Режим сна: если тела острова (связанные пружинами или касанием Ду) покоятся sleep_time секунд, то Chipmunk усыпляет весь остров.
+		Спящие тела не интегрируются и не участвуют в решении связей, поэтому успокоившаяся башня почти ничего не стоит.
+		В режиме сна фиксированные Ду не вращаются (см. __init__).
+		None -- режим сна выключен.
+	idle_speed : float
+		Скорость [пиксели/секунда], ниже которой тело считается покоящимся. 0 -- Chipmunk выбирает её сам (по гравитации и шагу физики).
+	level : Level или None
+		Уровень: статическая геометрия, начальная башня, спаунеры и цели (см. модуль level). None -- стандартный уровень (пол, стены и фундамент).
+	lazy_level : bool
+		Если True, то начальная башня уровня сразу не загружается: её регионы подгружаются методом stream_level
+		(например, по мере прокрутки камеры). Если False, то уровень загружается целиком.
+	threads : int
+		Число потоков для шага физики. 1 -- обычное пространство симуляции в основном потоке.
+		2 -- многопоточное пространство (pm.Space(threaded=True)): контакты и пружины решаются в двух потоках.
+		Больше MAX_THREADS потоков Chipmunk не использует, поэтому большие значения уменьшаются до MAX_THREADS.
+		0 -- выбирать автоматически по числу тел (см. метод update_threads).
+		Результат шага многопоточного пространства зависит от порядка работы потоков,
+		поэтому запись и воспроизведение (см. модуль replay) совпадают бит в бит только при threads=1.
+
+	Атрибуты:
+	----------
+	world : WorldState или World
+		Игровая область.
+	fps : int
+		Частота кадров. Шаг физики равен 1/fps.
+	native_filter : bool
+		Используются ли фильтры столкновений вместо обработчиков столкновений.
+	sleep_time : float или None
+		Время покоя в секундах, после которого остров засыпает. None -- режим сна выключен.
+	idle_speed : float
+		Скорость, ниже которой тело считается покоящимся.
+	space : pymunk.Space
+		Пространство симуляции.
+	shape_creator : ShapeCreator
+		Объект для создания и удаления игровых объектов.
+	graph : Graph
+		Башня из фиксированных Ду.
+	mouse_pos : tuple
+		Координаты курсора мыши в текущем кадре.
+	step_count : int
+		Число выполненных кадров (шагов физики) с начала симуляции.
+	history : collections.deque
+		Снимки состояния (см. модуль snapshot), сделанные перед последними постройками. Нужны для отмены.
+	checkpoint : bytes или None
+		Снимок, сохраненный действием 'save'.
+	timer : PhaseTimer или None
+		Если задан, то метод step измеряет время этапов 'step', 'remove_escaped' и 'candidates' (см. модуль phase_timer).
+	stress : StressAnalyzer или None
+		Если задан, то после каждого шага физики вычисляется деформация пружин и рвутся перегруженные пружины (см. модуль stress).
+	start_height : int
+		Высота над полом, на которой появляется фундамент башни стандартного уровня (потом он падает на пол).
+	level : Level
+		Уровень.
+	lazy_level : bool
+		Подгружается ли уровень по регионам.
+	level_loader : LevelLoader
+		Объект, загружающий уровень в пространство симуляции.
+	threads : int
+		Число потоков для шага физики (0 -- выбирается автоматически).
+	thread_bodies : int
+		При автоматическом выборе второй поток включается, если тел не меньше thread_bodies и у процессора больше одного ядра.
+		Значение -- порог из отчета bench_threads.py: на меньшем числе тел накладные расходы на потоки больше выигрыша.
+	active_threads : int
+		Число потоков, с которым сейчас работает пространство симуляции.
+	'''
+	def __init__(self, world, fps=60, native_filter=True, undo_depth=20, pool_capacity=512, sleep_time=None, idle_speed=0,
+				level=None, lazy_level=False, threads=1):
+		self.world 			= world
+		self.fps 			= fps
+		self.native_filter 	= native_filter
+		self.sleep_time 	= sleep_time
+		self.idle_speed 	= idle_speed
+		self.threads 		= min(threads, MAX_THREADS)
+		self.thread_bodies 	= 2000
+		self.active_threads = 1
+		self.space 			= self.create_space()
+		self.shape_creator 	= ShapeCreator(world, self.space, native_filter, pool_capacity)
+		# Пружины крепятся к центрам фиксированных Ду, поэтому вращение фиксированного Ду ни на что не влияет,
+		# но и ничем не гасится: Ду, закрученный ударом о пол или стену, вращался бы вечно и не давал острову уснуть.
+		# Поэтому в режиме сна фиксированные Ду не вращаются (бесконечный момент инерции).
+		if sleep_time is not None:
+			self.shape_creator.fixed_doo_moment = pm.inf
+		self.graph 			= Graph()
+		self.mouse_pos 		= (0, 0)
+		self.step_count 	= 0
+		self.history 		= deque(maxlen=undo_depth)
+		self.checkpoint 	= None
+		self.timer 			= None
+		self.stress 		= None
+		self.start_height 	= 290
+		self.level 			= level
+		self.lazy_level 	= lazy_level
+		self.level_loader 	= None
+		self.create_level()
+
+
+	def create_space(self):
+		''' Метод для создания и настройки пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		pymunk.Space : Настроенное пространство симуляции.
+		'''
+		# Создаем пространство симуляции. Если нужно больше одного потока, то многопоточное (в Chipmunk -- cpHastySpace).
+		if self.threads == 1:
+			space = pm.Space()
+		else:
+			space = pm.Space(threaded=True)
+			space.threads = self.active_threads = self.threads or 1
+		# Устанавливаем ускорение свободного падения вдоль оси Y.
+		space.gravity = (0.0,900.0)
+		# Настраиваем число итераций физических расчетов для одного кадра игры
+		# чем больше, тем точнее рассчитывается поведение объектов и меньше всяких отклонений
+		# (объектов, проваливающихся сквозь пол и друг друга)
+		# по умолчанию = 10.
+		space.iterations = 20
+		# Режим сна. Острова -- это компоненты связности графа башни (тела, связанные пружинами) и касающиеся друг друга тела.
+		# Chipmunk сам будит остров, если к его телу добавляется или удаляется пружина (постройка, разрыв пружины),
+		# если тело острова удаляется из пространства и если его касается неспящее тело.
+		if self.sleep_time is not None:
+			space.sleep_time_threshold = self.sleep_time
+			space.idle_speed_threshold = self.idle_speed
+		# Если Ду получают фильтры столкновений, то пары Ду-Ду отбрасываются самим Chipmunk, и обработчики не нужны.
+		if self.native_filter:
+			return space
+		# Создаем обработчики столкновений. В качестве аргументов передаем значения collision_type объектов.
+		# С помощью pre_solve мы зададим правила взаимодействия указанных объектов при столкновении.
+		# Обрабатываем столкновения свободных Ду с другими свободными Ду.
+		ch1 = space.add_collision_handler(0,0)
+		ch1.pre_solve = self.world.collide_doo_with_doo
+		# Обрабатываем столкновения свободных Ду с фиксированными Ду.
+		ch2 = space.add_collision_handler(0,1)
+		ch2.pre_solve = self.world.collide_doo_with_doo
+		# Обрабатываем столкновения фиксированных Ду с другими фиксированными Ду.
+		ch3 = space.add_collision_handler(1,1)
+		ch3.pre_solve = self.world.collide_doo_with_doo
+		return space
+
+	def create_level(self):
+		''' Метод для создания статической геометрии уровня и начальной башни.
+		'''
+		if self.level is None:
+			self.level = default_level(self.world.width, self.world.height, self.world.ground_y, self.start_height)
+		self.level_loader = LevelLoader(self, self.level)
+		self.create_bounds()
+		self.load_level()
+
+	def create_bounds(self):
+		''' Метод для создания статической геометрии уровня (пола, стен и т.д.).
+		'''
+		self.level_loader.create_statics()
+
+	def load_level(self):
+		''' Метод для загрузки начальной башни уровня целиком (если уровень не подгружается по регионам).
+		'''
+		if not self.lazy_level:
+			self.level_loader.load()
+
+	def stream_level(self, bb):
+		''' Метод, подгружающий регионы уровня, которые пересекаются с прямоугольником bb (например, с видимой частью уровня).
+
+		Аргументы:
+		----------
+		bb : pymunk.BB
+			Прямоугольник в координатах пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		int : Число загруженных узлов.
+		'''
+		return self.level_loader.stream(bb)
+
+	def spawn(self):
+		''' Метод, создающий свободных Ду в спаунерах уровня, у которых подошел срок (каждые period секунд).
+		'''
+		for spawner in self.level.spawners:
+			if self.step_count % max(1, round(spawner['period'] * self.fps)) == 0:
+				self.shape_creator.create_free_doo(spawner['x'], spawner['y'])
+
+	def new_space(self):
+		''' Метод, заменяющий пространство симуляции новым: с полом и стенами, но без Ду и пружин.
+
+		Удалять тысячи объектов из пространства симуляции по одному долго (Chipmunk ищет каждую пружину в массиве перебором).
+		Проще выбросить старое пространство целиком. Используется при восстановлении снимков (см. модуль snapshot).
+		Граф и список свободных Ду очищаются, схваченный Ду отпускается.
+		Все, кто рисует или изменяет пространство симуляции, должны брать его из атрибута space, а не запоминать.
+
+		Ду старого пространства кладутся в пул (см. модуль pool), и load_state берет их оттуда, а не создает заново.
+		В пул можно положить только Ду, удаленного из пространства, поэтому из старого пространства удаляем
+		(одним вызовом space.remove, вместе с их пружинами) только тех Ду, для которых в пуле есть место.
+		'''
+		pool = self.shape_creator.pool
+		room = {kind: pool.capacity - len(doos) for kind, doos in pool.free.items()}
+		doos = []
+		for doos_of_kind in (self.graph, self.world.free_doos):
+			for doo in doos_of_kind:
+				kind = type(doo)
+				if room.get(kind, 0) > 0 and doo.rad == DEFAULT_RADIUS[kind]:
+					room[kind] -= 1
+					doos.append(doo)
+		if doos:
+			springs = dict.fromkeys(spring for doo in doos for spring in doo.body.constraints)
+			self.space.remove(*springs, *(obj for doo in doos for obj in (doo, doo.body)))
+			pool.release(doos)
+		self.space = self.create_space()
+		self.shape_creator.space = self.space
+		self.create_bounds()
+		self.graph.clear()
+		self.graph.fixed_doo_for_build.clear()
+		self.world.free_doos.clear()
+		self.world.shape_being_dragged = None
+		self.world.free_doo_under_cursor = None
+
+	def handle(self, action):
+		''' Метод для обработки одного действия игрока.
+
+		Действия:
+			'pick' -- нажатие ЛКМ (хватание свободного Ду);
+			'create' -- нажатие ПКМ (создание свободного Ду в позиции курсора);
+			'release' -- отпускание ЛКМ (отпускание схваченного Ду и строительство);
+			'restart' -- перезапуск игры;
+			'undo' -- отмена последней постройки;
+			'save' -- сохранение снимка состояния (контрольной точки);
+			'load' -- восстановление сохраненного снимка.
+
+		Аргументы:
+		----------
+		action : str
+			Название действия.
+		'''
+		if action == 'pick':
+			self.world.pick_free_doo()
+		elif action == 'create':
+			if self.world.shape_being_dragged is None and self.mouse_pos[1] < self.world.ground_y:
+				self.shape_creator.create_free_doo(self.mouse_pos[0], self.mouse_pos[1])
+		elif action == 'release':
+			# Перед постройкой запоминаем состояние, чтобы её можно было отменить.
+			if self.world.shape_being_dragged is not None and len(self.graph.fixed_doo_for_build)==2:
+				self.history.append(save_state(self))
+			self.world.release_picked_doo(self.graph, self.shape_creator)
+		elif action == 'restart':
+			self.restart()
+		elif action == 'undo':
+			if self.history:
+				load_state(self, self.history.pop())
+		elif action == 'save':
+			self.checkpoint = save_state(self)
+		elif action == 'load':
+			if self.checkpoint is not None:
+				load_state(self, self.checkpoint)
+		else:
+			raise ValueError('Неизвестное действие: {0}'.format(action))
+
+	def frame(self, mouse_pos, actions=()):
+		''' Метод, выполняющий один кадр игры (без отображения).
+
+		Порядок действий такой же, как в игровом цикле:
+		определяем свободного Ду под курсором, обрабатываем действия игрока, делаем шаг физики,
+		удаляем вылетевших Ду, перетаскиваем схваченного Ду и ищем узлы для строительства.
+
+		Аргументы:
+		----------
+		mouse_pos : tuple или list
+			Координаты курсора мыши в этом кадре.
+		actions : list
+			Действия игрока в этом кадре (см. метод handle).
+		'''
+		self.handle_input(mouse_pos, actions)
+		self.step()
+
+	def handle_input(self, mouse_pos, actions=()):
+		''' Метод, определяющий свободного Ду под курсором и обрабатывающий действия игрока (без шага физики).
+
+		Используется отдельно от step, когда за один кадр делается несколько шагов физики или ни одного (см. класс FixedStepLoop).
+
+		Аргументы:
+		----------
+		mouse_pos : tuple или list
+			Координаты курсора мыши в этом кадре.
+		actions : list
+			Действия игрока в этом кадре (см. метод handle).
+		'''
+		self.mouse_pos = mouse_pos
+		self.world.find_free_doo_under_cursor(self.space, mouse_pos)
+		for action in actions:
+			self.handle(action)
+
+	def step(self):
+		''' Метод, выполняющий шаг физики и всё, что нужно сделать сразу после него.
+
+		Если задан таймер, то время каждого этапа сохраняется в нем. Без таймера проверка стоит одно сравнение на этап.
+		'''
+		timer = self.timer
+		if timer is not None:
+			timer.start()
+		if self.threads == 0:
+			self.update_threads()
+		self.space.step(1/self.fps)
+		self.step_count += 1
+		if self.level.spawners:
+			self.spawn()
+		if self.stress is not None:
+			self.stress.update()
+		if timer is not None:
+			timer.lap('step')
+		# Удаляем свободных Ду, вылетевших за пределы игровой области (иногда бывает).
+		self.shape_creator.remove_escaped_doos()
+		if timer is not None:
+			timer.lap('remove_escaped')
+		# Перетаскивание схваченного Ду
+		self.world.move_picked_doo(self.mouse_pos)
+		if self.world.shape_being_dragged is not None:
+			self.graph.find_fixed_doo_for_build(self.world, self.space)
+		if timer is not None:
+			timer.lap('candidates')
+
+	def update_threads(self):
+		''' Метод, выбирающий число потоков по числу тел (при threads=0).
+
+		На небольшом числе тел второй поток только мешает: его нужно будить и ждать на каждой итерации решателя.
+		Поэтому второй поток включается, когда тел становится не меньше thread_bodies (и у процессора больше одного ядра).
+		Число тел берется из графа и списка свободных Ду (space.bodies каждый раз создает новый список).
+		'''
+		bodies = len(self.graph) + len(self.world.free_doos)
+		threads = MAX_THREADS if bodies >= self.thread_bodies and (os.cpu_count() or 1) > 1 else 1
+		if threads != self.active_threads:
+			self.space.threads = self.active_threads = threads
+
+	def sleep_counts(self):
+		''' Метод, возвращающий числа неспящих и спящих динамических тел.
+
+		Возвращаемое значение:
+		----------
+		tuple : (число неспящих тел, число спящих тел).
+		'''
+		bodies = self.space.bodies
+		sleeping = 0
+		for body in bodies:
+			if body.is_sleeping:
+				sleeping += 1
+		return len(bodies) - sleeping, sleeping
+
+	def counts(self):
+		''' Метод, возвращающий числа тел, фигур, пружин и узлов (для профайлера, см. модуль profiler).
+
+		Возвращаемое значение:
+		----------
+		dict : Словарь с ключами 'bodies', 'sleeping', 'shapes', 'constraints' и 'nodes'.
+		'''
+		active, sleeping = self.sleep_counts()
+		return {'bodies': active + sleeping, 'sleeping': sleeping, 'shapes': len(self.space.shapes),
+				'constraints': len(self.space.constraints), 'nodes': len(self.graph)}
+
+	def restart(self):
+		''' Метод, возврщающий игру к исходному состоянию.
+
+		Удаляем всех свободных Ду.
+		Удаляем башню (всех фиксированных Ду и все пружины).
+		Заново загружаем начальную башню уровня.
+		'''
+		self.shape_creator.remove_all_doos()
+		self.shape_creator.remove_construction(self.graph)
+		self.level_loader.reset()
+		self.load_level()
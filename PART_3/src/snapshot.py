@@ -0,0 +1,232 @@
+''' Сохранение и восстановление полного состояния симуляции (снимки).
+
+Снимок -- это строка байтов (bytes). В нем хранятся:
+	- все свободные и фиксированные Ду: положение, скорость, угол поворота, угловая скорость, масса, момент инерции, радиус, ground;
+	- граф башни: порядок узлов, их номера order, списки соседей (в том же порядке, что и в графе) и узлы фундамента;
+	- все пружины: концы, длина в расслабленном состоянии, жесткость и затухание
+	  (точки крепления не храним: пружины всегда крепятся к центрам Ду, см. ShapeCreator.create_spring);
+	- состояние загрузки уровня: загруженные регионы и номера узлов уровня у узлов графа (см. класс LevelLoader),
+	  чтобы после восстановления пружины к узлам еще не загруженных регионов создавались так же, как и без восстановления;
+	- номер кадра симуляции.
+Пол, стены и настройки пространства симуляции не сохраняются: они одинаковые во всех снимках.
+Схваченный Ду тоже не сохраняется: после восстановления ничего не схвачено.
+
+Числа хранятся массивами (модуль array), а не по одному, поэтому сами байты снимка упаковываются и распаковываются мгновенно.
+Почти всё время уходит на чтение свойств тел pymunk (при сохранении) и на создание объектов pymunk (при восстановлении).
+При восстановлении создается новое пространство симуляции (см. Simulation.new_space), и тела, фигуры и пружины
+добавляются в него одним вызовом space.add в том же порядке, в котором они были при сохранении.
+Ду стандартного размера берутся из пула (см. модуль pool): в него new_space кладет Ду старого пространства.
+Ду из пула ведет себя так же, как новый, поэтому пул на продолжение симуляции не влияет.
+Поэтому два восстановления одного снимка дают одинаковое продолжение симуляции.
+Но оно может немного отличаться от продолжения исходной симуляции, т.к. в снимке нет кэша контактов Chipmunk.
+'''
+import gc
+import struct
+from array import array
+import pymunk as pm
+# Импортируем класс DooFixed из файла doo.py
+from doo import DooFixed
+# Импортируем словарь DEFAULT_RADIUS из файла pool
+from pool import DEFAULT_RADIUS
+
+
+# Метка формата и его версия. Версию нужно увеличивать при любом изменении формата.
+MAGIC = b'DOOS'
+VERSION = 3
+# Заголовок: метка, версия, число тел, число узлов графа, число записей в списках соседей, число пружин, номер кадра, node_count графа,
+# число загруженных регионов уровня.
+HEADER = struct.Struct('<4sHIIIIQQI')
+# Числа с плавающей точкой на одно тело: x, y, vx, vy, angle, angular_velocity, mass, moment, r.
+BODY_FLOATS = 9
+# Числа с плавающей точкой на одну пружину: rest_length, stiffness, damping.
+SPRING_FLOATS = 3
+# Вид тела.
+FREE = 0
+FIXED = 1
+
+
+def save_state(simulation):
+	''' Функция для создания снимка состояния симуляции.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция, состояние которой сохраняем.
+
+	Возвращаемое значение:
+	----------
+	bytes : Снимок.
+	'''
+	graph = simulation.graph
+	free_doos = simulation.world.free_doos
+	# Словарь owner[body] = (Ду, вид Ду). Нужен, чтобы перебирать тела в порядке пространства симуляции.
+	owner = {}
+	for fixed_doo in graph:
+		owner[fixed_doo.body] = (fixed_doo, FIXED)
+	for free_doo in free_doos:
+		owner[free_doo.body] = (free_doo, FREE)
+	bodies = []
+	kinds = array('B')
+	floats = array('d')
+	ground = array('B')
+	for body in simulation.space.bodies:
+		if body not in owner:
+			continue
+		doo, kind = owner[body]
+		kinds.append(kind)
+		position = body.position
+		velocity = body.velocity
+		floats.extend((position.x, position.y, velocity.x, velocity.y, body.angle, body.angular_velocity, body.mass, body.moment, doo.rad))
+		ground.append(doo.ground)
+		bodies.append(body)
+	index = {body: i for i, body in enumerate(bodies)}
+
+	# Граф: узлы в порядке графа, их номера order и списки соседей.
+	nodes = array('I')
+	orders = array('I')
+	lengths = array('I')
+	neighbours = array('I')
+	base = array('B')
+	for fixed_doo, adjacent in graph.items():
+		nodes.append(index[fixed_doo.body])
+		orders.append(fixed_doo.order)
+		lengths.append(len(adjacent))
+		base.append(fixed_doo in graph.base)
+		neighbours.extend(index[neighbour.body] for neighbour in adjacent)
+	# Свободные Ду в порядке списка free_doos.
+	free = array('I', (index[free_doo.body] for free_doo in free_doos))
+	# Номера узлов уровня у узлов графа (-1 -- узел построен игроком) и загруженные регионы.
+	loader = simulation.level_loader
+	level_index = {fixed_doo: i for i, fixed_doo in loader.doos.items()}
+	level_nodes = array('i', (level_index.get(fixed_doo, -1) for fixed_doo in graph))
+	regions = array('i')
+	for key in sorted(loader.loaded):
+		regions.extend(key)
+
+	# Пружины в порядке пространства симуляции.
+	ends = array('I')
+	springs = array('d')
+	for constraint in simulation.space.constraints:
+		if not isinstance(constraint, pm.DampedSpring):
+			continue
+		ends.extend((index[constraint.a], index[constraint.b]))
+		springs.extend((constraint.rest_length, constraint.stiffness, constraint.damping))
+
+	header = HEADER.pack(MAGIC, VERSION, len(bodies), len(nodes), len(neighbours), len(ends)//2, simulation.step_count, graph.node_count,
+						len(regions)//2)
+	# Сначала массивы double (выравнивание по 8 байт), потом целые числа.
+	return b''.join((header, floats.tobytes(), springs.tobytes(), nodes.tobytes(), orders.tobytes(), lengths.tobytes(),
+					neighbours.tobytes(), ends.tobytes(), array('I', [len(free)]).tobytes(), free.tobytes(), level_nodes.tobytes(), regions.tobytes(),
+					kinds.tobytes(), ground.tobytes(), base.tobytes()))
+
+
+def load_state(simulation, data):
+	''' Функция для восстановления состояния симуляции из снимка.
+
+	Заменяем пространство симуляции новым (с полом и стенами),
+	затем создаем тела, фигуры и пружины из снимка и добавляем их в пространство симуляции одним вызовом space.add.
+	Пока создаются тысячи объектов, сборщик мусора выключен: он все равно ничего не найдет, а работает долго.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция, состояние которой восстанавливаем.
+	data : bytes
+		Снимок, созданный функцией save_state.
+	'''
+	magic, version = struct.unpack_from('<4sH', data)
+	if magic != MAGIC or version != VERSION:
+		raise ValueError('Неизвестный формат снимка: {0} версии {1}'.format(magic, version))
+	magic, version, n_bodies, n_nodes, n_neighbours, n_springs, step_count, node_count, n_regions = HEADER.unpack_from(data)
+	view = memoryview(data)
+	offset = HEADER.size
+
+	def read(typecode, count):
+		nonlocal offset
+		values = array(typecode)
+		size = values.itemsize * count
+		values.frombytes(view[offset:offset+size])
+		offset += size
+		return values
+
+	floats = read('d', n_bodies * BODY_FLOATS)
+	springs = read('d', n_springs * SPRING_FLOATS)
+	nodes = read('I', n_nodes)
+	orders = read('I', n_nodes)
+	lengths = read('I', n_nodes)
+	neighbours = read('I', n_neighbours)
+	ends = read('I', n_springs * 2)
+	n_free = read('I', 1)[0]
+	free = read('I', n_free)
+	level_nodes = read('i', n_nodes)
+	regions = read('i', n_regions * 2)
+	kinds = read('B', n_bodies)
+	ground = read('B', n_bodies)
+	base = read('B', n_nodes)
+
+	world = simulation.world
+	graph = simulation.graph
+	simulation.new_space()
+
+	native_filter = simulation.shape_creator.native_filter
+	pool = simulation.shape_creator.pool
+	doos = []
+	objects = []
+	gc_enabled = gc.isenabled()
+	gc.disable()
+	try:
+		for i in range(n_bodies):
+			x, y, vx, vy, angle, angular_velocity, mass, moment, r = floats[i*BODY_FLOATS:(i+1)*BODY_FLOATS]
+			if kinds[i] != FIXED:
+				doo = pool.free_doo(x, y)
+			elif r == DEFAULT_RADIUS[DooFixed]:
+				doo = pool.fixed_doo(x, y, mass, moment)
+			else:
+				doo = DooFixed(x, y, r=r, mass=mass, native_filter=native_filter)
+			body = doo.body
+			body.moment = moment
+			body.velocity = vx, vy
+			body.angle = angle
+			body.angular_velocity = angular_velocity
+			doo.ground = bool(ground[i])
+			doos.append(doo)
+			objects.append(body)
+			objects.append(doo)
+		for i in range(n_springs):
+			rest_length, stiffness, damping = springs[i*SPRING_FLOATS:(i+1)*SPRING_FLOATS]
+			a = doos[ends[2*i]].body
+			b = doos[ends[2*i+1]].body
+			objects.append(pm.DampedSpring(a, b, (0, 0), (0, 0), rest_length, stiffness, damping))
+	finally:
+		if gc_enabled:
+			gc.enable()
+	simulation.space.add(*objects)
+
+	# Пружины по номерам тел концов (в обоих направлениях): по ним строим словари соседей графа сразу с пружинами.
+	spring_of = {}
+	for i in range(n_springs):
+		spring = objects[2*n_bodies + i]
+		spring_of[ends[2*i], ends[2*i+1]] = spring
+		spring_of[ends[2*i+1], ends[2*i]] = spring
+	start = 0
+	for i in range(n_nodes):
+		node = nodes[i]
+		adjacent = {}
+		for j in neighbours[start:start+lengths[i]]:
+			spring = spring_of.get((node, j))
+			if spring is None:
+				raise ValueError('Испорченный снимок: у ребра графа нет пружины')
+			adjacent[doos[j]] = spring
+		graph[doos[node]] = adjacent
+		start += lengths[i]
+	for i in range(n_nodes):
+		doos[nodes[i]].order = orders[i]
+		if base[i]:
+			graph.base.add(doos[nodes[i]])
+	graph.node_count = node_count
+	loader = simulation.level_loader
+	loader.doos = {level_nodes[i]: doos[nodes[i]] for i in range(n_nodes) if level_nodes[i] >= 0}
+	loader.loaded = {(regions[2*i], regions[2*i+1]) for i in range(n_regions)}
+	for i in free:
+		world.free_doos.append(doos[i])
+	simulation.step_count = step_count
@@ -0,0 +1,149 @@
+''' Выгрузка состояния симуляции в массивы NumPy (structure of arrays) и загрузка положений и скоростей обратно.
+
+Функция export_state за один вызов возвращает объект StateArrays:
+	position (n, 2), velocity (n, 2), angle (n,), angular_velocity (n,) -- все фиксированные и свободные Ду;
+	kind (n,) -- вид Ду (FIXED или FREE);
+	edges (m, 2) -- ребра графа башни (каждое ребро один раз) в виде индексов Ду;
+	spring_ends (k, 2), rest_length (k,), length (k,) -- пружины: индексы концов, длина в расслабленном состоянии и текущая длина.
+Сначала идут фиксированные Ду в порядке графа, затем свободные Ду в порядке списка free_doos.
+Текущие длины пружин вычисляются из массива position, без обращения к пружинам.
+
+pymunk не умеет отдавать свойства тел массивом, поэтому тела читаются одним проходом в плоский список,
+который превращается в массив одним вызовом numpy.array. Всё остальное (длины, ребра, анализ) делается уже в NumPy.
+
+Функция import_state записывает положения, скорости и углы обратно в тела (в том же порядке, что и export_state).
+
+NumPy -- необязательная зависимость: игре он не нужен, только этому модулю.
+'''
+import numpy as np
+# Импортируем константы FIXED и FREE из файла snapshot
+from snapshot import FIXED, FREE
+
+
+class StateArrays():
+	''' Класс, хранящий состояние симуляции в виде массивов NumPy.
+
+	Атрибуты:
+	----------
+	doos : list
+		Ду в порядке строк массивов (сначала фиксированные, затем свободные).
+	kind : numpy.ndarray
+		Вид каждого Ду: FIXED или FREE (uint8).
+	position : numpy.ndarray
+		Положения центров Ду, массив (n, 2).
+	velocity : numpy.ndarray
+		Скорости Ду, массив (n, 2).
+	angle : numpy.ndarray
+		Углы поворота Ду в радианах, массив (n,).
+	angular_velocity : numpy.ndarray
+		Угловые скорости Ду, массив (n,).
+	edges : numpy.ndarray
+		Ребра графа башни: пары индексов Ду (i < j), массив (m, 2).
+	springs : list
+		Пружины в порядке строк spring_ends.
+	spring_ends : numpy.ndarray
+		Индексы Ду на концах пружин, массив (k, 2).
+	rest_length : numpy.ndarray
+		Длины пружин в расслабленном состоянии, массив (k,).
+	'''
+	def __init__(self, doos, kind, body_data, edges, springs, spring_ends, rest_length):
+		self.doos 				= doos
+		self.kind 				= kind
+		self.position 			= np.ascontiguousarray(body_data[:, 0:2])
+		self.velocity 			= np.ascontiguousarray(body_data[:, 2:4])
+		self.angle 				= np.ascontiguousarray(body_data[:, 4])
+		self.angular_velocity 	= np.ascontiguousarray(body_data[:, 5])
+		self.edges 				= edges
+		self.springs 			= springs
+		self.spring_ends 		= spring_ends
+		self.rest_length 		= rest_length
+
+	@property
+	def length(self):
+		''' Текущие длины пружин, вычисленные из массива position.
+		'''
+		delta = self.position[self.spring_ends[:, 0]] - self.position[self.spring_ends[:, 1]]
+		return np.hypot(delta[:, 0], delta[:, 1])
+
+
+def export_state(simulation):
+	''' Функция для выгрузки состояния симуляции в массивы NumPy.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+
+	Возвращаемое значение:
+	----------
+	StateArrays : Состояние симуляции.
+	'''
+	graph = simulation.graph
+	doos = list(graph)
+	fixed_count = len(doos)
+	doos.extend(simulation.world.free_doos)
+	kind = np.full(len(doos), FREE, dtype=np.uint8)
+	kind[:fixed_count] = FIXED
+
+	values = []
+	extend = values.extend
+	for doo in doos:
+		body = doo.body
+		position = body.position
+		velocity = body.velocity
+		extend((position.x, position.y, velocity.x, velocity.y, body.angle, body.angular_velocity))
+	body_data = np.array(values, dtype=np.float64).reshape(len(doos), 6)
+
+	order = {doo: i for i, doo in enumerate(doos)}
+	pairs = []
+	for i, fixed_doo in enumerate(doos[:fixed_count]):
+		for neighbour in graph[fixed_doo]:
+			j = order[neighbour]
+			if i < j:
+				pairs.extend((i, j))
+	edges = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+	# Пружины знают только тела, поэтому для них нужен словарь по телам.
+	index = {doo.body: i for i, doo in enumerate(doos)}
+	springs = []
+	ends = []
+	rest = []
+	for constraint in simulation.space.constraints:
+		if constraint.a in index and constraint.b in index:
+			springs.append(constraint)
+			ends.extend((index[constraint.a], index[constraint.b]))
+			rest.append(constraint.rest_length)
+	spring_ends = np.array(ends, dtype=np.intp).reshape(-1, 2)
+	rest_length = np.array(rest, dtype=np.float64)
+	return StateArrays(doos, kind, body_data, edges, springs, spring_ends, rest_length)
+
+
+def import_state(state, position=None, velocity=None, angle=None, angular_velocity=None):
+	''' Функция для записи положений, скоростей и углов обратно в тела pymunk.
+
+	Строки массивов соответствуют state.doos. Если массив не передан, то берется соответствующий массив из state.
+	Массивы переводятся в списки python одним вызовом tolist, поэтому в цикле нет обращений к NumPy.
+
+	Аргументы:
+	----------
+	state : StateArrays
+		Состояние, полученное функцией export_state.
+	position : numpy.ndarray или None
+		Новые положения, массив (n, 2).
+	velocity : numpy.ndarray или None
+		Новые скорости, массив (n, 2).
+	angle : numpy.ndarray или None
+		Новые углы поворота, массив (n,).
+	angular_velocity : numpy.ndarray или None
+		Новые угловые скорости, массив (n,).
+	'''
+	positions = (state.position if position is None else position).tolist()
+	velocities = (state.velocity if velocity is None else velocity).tolist()
+	angles = (state.angle if angle is None else angle).tolist()
+	angular_velocities = (state.angular_velocity if angular_velocity is None else angular_velocity).tolist()
+	for doo, p, v, a, w in zip(state.doos, positions, velocities, angles, angular_velocities):
+		body = doo.body
+		body.position = p
+		body.velocity = v
+		body.angle = a
+		body.angular_velocity = w
@@ -0,0 +1,149 @@
+''' Анализ нагрузки на башню: деформация пружин и их разрыв.
+
+Деформация пружины (strain) -- относительное изменение её длины: (длина - rest_length) / rest_length.
+Положительная деформация -- растяжение, отрицательная -- сжатие.
+Деформация пружины нулевой длины в расслабленном состоянии считается равной 0 (такие пружины не рвутся).
+
+Деформации всех пружин вычисляются в NumPy одним выражением. Для этого хранятся массивы индексов концов пружин
+и длин в расслабленном состоянии. Они пересчитываются, только если изменился граф башни (см. Graph.edge_version):
+проверка стоит одно сравнение целых чисел, а не сравнение списков всех пружин в каждом шаге.
+В каждом шаге из pymunk читаются только положения узлов графа (один проход по телам, без обращения к пружинам).
+
+Если задан break_strain, то пружины, деформация которых по модулю больше break_strain, рвутся:
+они удаляются из пространства симуляции (одним вызовом space.remove) и из графа (Graph.remove_edge).
+
+NumPy -- необязательная зависимость: модуль импортируется, только если анализ нагрузки включен.
+'''
+import numpy as np
+
+
+class StressAnalyzer():
+	''' Класс для вычисления деформации всех пружин башни и разрыва перегруженных пружин.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	break_strain : float или None
+		Деформация (по модулю), при которой пружина рвется. None -- пружины не рвутся.
+
+	Атрибуты:
+	----------
+	simulation : Simulation
+		Симуляция.
+	break_strain : float или None
+		Деформация (по модулю), при которой пружина рвется.
+	version : int или None
+		Версия графа (Graph.edge_version), для которой построены массивы.
+	bodies : list
+		Тела узлов графа. Их положения читаются в каждом шаге.
+	doos : list
+		Узлы графа в том же порядке, что и bodies.
+	springs : list
+		Пружины между узлами графа в том же порядке, что и массивы ends, rest_length и strain.
+	index : dict
+		Словарь {пружина: её номер в springs}.
+	ends : numpy.ndarray
+		Индексы (в bodies) концов пружин, массив (k, 2).
+	rest_length : numpy.ndarray
+		Длины пружин в расслабленном состоянии, массив (k,).
+	strain : numpy.ndarray
+		Деформации пружин после последнего вызова update, массив (k,).
+	broken_count : int
+		Число порванных пружин.
+	'''
+	def __init__(self, simulation, break_strain=None):
+		self.simulation 	= simulation
+		self.break_strain 	= break_strain
+		self.version 		= None
+		self.bodies 		= []
+		self.doos 			= []
+		self.springs 		= []
+		self.index 			= {}
+		self.ends 			= np.zeros((0, 2), dtype=np.intp)
+		self.rest_length 	= np.zeros(0)
+		self.strain 		= np.zeros(0)
+		self.broken_count 	= 0
+
+
+	def rebuild(self):
+		''' Метод для построения массивов индексов концов пружин и длин в расслабленном состоянии.
+
+		Пружины берутся из графа (каждая один раз, со стороны узла с меньшим order).
+		'''
+		graph = self.simulation.graph
+		self.doos = list(graph)
+		self.bodies = [doo.body for doo in self.doos]
+		index = {doo: i for i, doo in enumerate(self.doos)}
+		springs = []
+		ends = []
+		rest = []
+		for doo, neighbours in graph.items():
+			for neighbour, spring in neighbours.items():
+				if doo.order < neighbour.order:
+					springs.append(spring)
+					ends.extend((index[doo], index[neighbour]))
+					rest.append(spring.rest_length)
+		self.springs = springs
+		self.index = {spring: i for i, spring in enumerate(springs)}
+		self.ends = np.array(ends, dtype=np.intp).reshape(-1, 2)
+		self.rest_length = np.array(rest, dtype=np.float64)
+		self.version = graph.edge_version
+
+	def current(self):
+		''' Метод, проверяющий, что деформации вычислены для текущего набора пружин (граф не менялся после update).
+		'''
+		return self.version == self.simulation.graph.edge_version and len(self.strain) == len(self.springs)
+
+	def update(self):
+		''' Метод, вычисляющий деформации всех пружин и разрывающий перегруженные пружины.
+
+		Вызывается после каждого шага физики (см. Simulation.step).
+		'''
+		if self.simulation.graph.edge_version != self.version:
+			self.rebuild()
+		if not self.springs:
+			self.strain = np.zeros(0)
+			return
+		values = []
+		extend = values.extend
+		for body in self.bodies:
+			position = body.position
+			extend((position.x, position.y))
+		positions = np.array(values).reshape(-1, 2)
+		delta = positions[self.ends[:, 0]] - positions[self.ends[:, 1]]
+		rest_length = self.rest_length
+		# Делим только на ненулевые длины: иначе inf и nan рвали бы пружины случайным образом.
+		self.strain = np.divide(np.hypot(delta[:, 0], delta[:, 1]) - rest_length, rest_length,
+								out=np.zeros(len(rest_length)), where=rest_length > 0)
+		if self.break_strain is not None:
+			broken = np.abs(self.strain) > self.break_strain
+			if broken.any():
+				self.break_springs(broken)
+
+	def break_springs(self, broken):
+		''' Метод для разрыва пружин.
+
+		Пружины удаляются из пространства симуляции и из графа. Массивы сокращаются так, чтобы не строить их заново.
+
+		Аргументы:
+		----------
+		broken : numpy.ndarray
+			Логический массив (k,): True для пружин, которые нужно порвать.
+		'''
+		indices = np.flatnonzero(broken).tolist()
+		graph = self.simulation.graph
+		springs = [self.springs[i] for i in indices]
+		for i in indices:
+			a, b = self.ends[i].tolist()
+			graph.remove_edge(self.doos[a], self.doos[b])
+		self.simulation.space.remove(*springs)
+		keep = ~broken
+		self.springs = [spring for spring, kept in zip(self.springs, keep.tolist()) if kept]
+		self.index = {spring: i for i, spring in enumerate(self.springs)}
+		self.ends = self.ends[keep]
+		self.rest_length = self.rest_length[keep]
+		self.strain = self.strain[keep]
+		# Граф изменили мы сами, и массивы уже сокращены: перестраивать их не нужно.
+		self.version = graph.edge_version
+		self.broken_count += len(indices)
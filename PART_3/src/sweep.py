@@ -0,0 +1,282 @@
+''' Перебор параметров симуляции (sweep) на нескольких процессах.
+
+Для каждой комбинации параметров из сетки запускается симуляция без дисплея (см. модуль headless):
+к стартовой конструкции достраивается builds узлов, как если бы игрок строил башню вверх (см. функцию build_tower),
+после каждой постройки симуляция идет settle_steps шагов. Потом симуляция идет до тех пор, пока башня не успокоится.
+
+Собираемые метрики:
+	height -- высота башни (от пола до самого высокого узла) в конце;
+	built -- сколько узлов удалось построить (остальные постройки не нашли подходящих узлов);
+	max_stretch -- наибольшее относительное растяжение (или сжатие) пружины за всю симуляцию;
+	steps_per_second -- скорость симуляции (учитывается только время Simulation.step, без вычисления метрик);
+	rest_time -- время успокоения башни в секундах симуляции (None, если башня не успокоилась за rest_steps шагов).
+
+Каждая комбинация выполняется в отдельной задаче ProcessPoolExecutor, поэтому каждый процесс создает свое пространство симуляции.
+Результаты записываются в одну таблицу CSV по мере готовности (concurrent.futures.as_completed).
+
+Параметры:
+	spring_strength, damping -- пружины (ShapeCreator);
+	mass, moment -- масса и момент инерции фиксированных Ду (ShapeCreator.fixed_doo_mass и fixed_doo_moment);
+	iterations -- число итераций Chipmunk (space.iterations);
+	closest_dist, furthest_dist, between_dist -- условия строительства (Graph).
+
+Запуск из консоли:
+	python sweep.py --set spring_strength=5000,10000,20000 --set damping=50,100 --builds 20 --out sweep.csv
+'''
+import argparse
+import csv
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+# Импортируем класс HeadlessGame из файла headless
+from headless import HeadlessGame
+# Импортируем класс PhaseTimer из файла phase_timer
+from phase_timer import PhaseTimer
+
+
+# Где находится каждый параметр: (объект симуляции, атрибут).
+PARAMETERS = {
+	'spring_strength': ('shape_creator', 'spring_strength'),
+	'damping': ('shape_creator', 'damping'),
+	'mass': ('shape_creator', 'fixed_doo_mass'),
+	'moment': ('shape_creator', 'fixed_doo_moment'),
+	'iterations': ('space', 'iterations'),
+	'closest_dist': ('graph', 'closest_dist'),
+	'furthest_dist': ('graph', 'furthest_dist'),
+	'between_dist': ('graph', 'between_dist'),
+}
+# Метрики в порядке столбцов таблицы.
+METRICS = ('height', 'built', 'max_stretch', 'steps_per_second', 'rest_time')
+
+
+def apply_params(simulation, params):
+	''' Функция для установки параметров симуляции. Стартовая конструкция создается заново с новыми параметрами.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	params : dict
+		Словарь {название_параметра: значение}.
+	'''
+	for name, value in params.items():
+		if name not in PARAMETERS:
+			raise ValueError('Неизвестный параметр: {0}'.format(name))
+		owner, attribute = PARAMETERS[name]
+		setattr(getattr(simulation, owner), attribute, value)
+	simulation.restart()
+
+
+def max_spring_stretch(space):
+	''' Функция, возвращающая наибольшее относительное растяжение (или сжатие) пружин: |длина - rest_length| / rest_length.
+
+	Аргументы:
+	----------
+	space : pymunk.Space
+		Пространство симуляции.
+	'''
+	stretch = 0.0
+	for spring in space.constraints:
+		a = spring.a.position
+		b = spring.b.position
+		length = math.hypot(a.x - b.x, a.y - b.y)
+		stretch = max(stretch, abs(length - spring.rest_length) / spring.rest_length)
+	return stretch
+
+
+def top_edge(graph):
+	''' Функция, возвращающая верхнее ребро башни: самый высокий узел и самого высокого из его соседей.
+
+	Аргументы:
+	----------
+	graph : Graph
+		Башня из фиксированных Ду.
+	'''
+	top = min(graph, key=lambda fixed_doo: fixed_doo.body.position.y)
+	neighbour = min(graph[top], key=lambda fixed_doo: fixed_doo.body.position.y)
+	return top, neighbour
+
+
+def build_target(a, b, distance=70):
+	''' Функция, возвращающая точку над ребром (a, b) на расстоянии distance от обоих узлов (или над серединой ребра).
+
+	Аргументы:
+	----------
+	a, b : DooFixed
+		Концы ребра.
+	distance : float
+		Желаемое расстояние от точки до концов ребра.
+	'''
+	pa = a.body.position
+	pb = b.body.position
+	mx, my = (pa.x + pb.x) / 2, (pa.y + pb.y) / 2
+	dx, dy = pb.x - pa.x, pb.y - pa.y
+	half = math.hypot(dx, dy) / 2
+	height = math.sqrt(max(distance*distance - half*half, 0)) or distance/2
+	# Перпендикуляр к ребру, направленный вверх (ось Y направлена вниз).
+	nx, ny = -dy, dx
+	if ny > 0:
+		nx, ny = -nx, -ny
+	norm = math.hypot(nx, ny)
+	return mx + nx/norm*height, my + ny/norm*height
+
+
+def build_tower(simulation, builds, settle_steps, on_step):
+	''' Функция, строящая башню вверх так, как это делал бы игрок.
+
+	Для каждой постройки: создаем свободного Ду над верхним ребром башни, хватаем его, делаем шаг (ищутся узлы для строительства)
+	и отпускаем. Затем симуляция идет settle_steps шагов.
+
+	Аргументы:
+	----------
+	simulation : Simulation
+		Симуляция.
+	builds : int
+		Число построек.
+	settle_steps : int
+		Число шагов после каждой постройки.
+	on_step : function
+		Функция, вызываемая после каждого шага.
+
+	Возвращаемое значение:
+	----------
+	int : Число построенных узлов.
+	'''
+	built = 0
+	for i in range(builds):
+		target = build_target(*top_edge(simulation.graph))
+		nodes = len(simulation.graph)
+		simulation.handle_input(target, ['create'])
+		simulation.handle_input(target, ['pick'])
+		simulation.step()
+		on_step()
+		simulation.handle_input(target, ['release'])
+		built += len(simulation.graph) - nodes
+		for j in range(settle_steps):
+			simulation.step()
+			on_step()
+	return built
+
+
+def run_config(params, builds=20, settle_steps=60, rest_steps=1200, rest_speed=5.0):
+	''' Функция, выполняющая одну симуляцию с параметрами params. Выполняется в отдельном процессе.
+
+	Аргументы:
+	----------
+	params : dict
+		Словарь {название_параметра: значение}.
+	builds : int
+		Число построек.
+	settle_steps : int
+		Число шагов после каждой постройки.
+	rest_steps : int
+		Наибольшее число шагов, за которое башня должна успокоиться после последней постройки.
+	rest_speed : float
+		Башня успокоилась, если скорость всех её узлов меньше rest_speed [пиксели/секунда].
+
+	Возвращаемое значение:
+	----------
+	dict : Параметры и метрики.
+	'''
+	game = HeadlessGame()
+	simulation = game.simulation
+	apply_params(simulation, params)
+	space = simulation.space
+	stretch = [0.0]
+
+	def on_step():
+		stretch[0] = max(stretch[0], max_spring_stretch(space))
+
+	# Время шагов измеряет таймер симуляции: проверка растяжения пружин в on_step в скорость симуляции не входит.
+	simulation.timer = PhaseTimer()
+	steps = simulation.step_count
+	built = build_tower(simulation, builds, settle_steps, on_step)
+	rest_time = None
+	for i in range(rest_steps):
+		if all(fixed_doo.body.velocity.length < rest_speed for fixed_doo in simulation.graph):
+			rest_time = i / simulation.fps
+			break
+		simulation.step()
+		on_step()
+	elapsed = sum(sum(samples) for samples in simulation.timer.samples.values())
+	height = simulation.world.ground_y - min(fixed_doo.body.position.y for fixed_doo in simulation.graph)
+	result = dict(params)
+	result.update({'height': height, 'built': built, 'max_stretch': stretch[0],
+					'steps_per_second': (simulation.step_count - steps) / elapsed, 'rest_time': rest_time})
+	return result
+
+
+def parse_grid(items):
+	''' Функция для разбора параметров командной строки вида name=v1,v2,v3.
+
+	Аргументы:
+	----------
+	items : list
+		Строки вида name=v1,v2,v3.
+
+	Возвращаемое значение:
+	----------
+	dict : Словарь {название_параметра: [значения]}.
+	'''
+	grid = {}
+	for item in items:
+		name, values = item.split('=')
+		grid[name] = [float(value) if '.' in value or 'e' in value else int(value) for value in values.split(',')]
+	return grid
+
+
+def sweep(grid, out, workers=None, **options):
+	''' Функция, выполняющая симуляции для всех комбинаций параметров и записывающая результаты в CSV по мере готовности.
+
+	Аргументы:
+	----------
+	grid : dict
+		Словарь {название_параметра: [значения]}.
+	out : str
+		Путь к файлу CSV.
+	workers : int или None
+		Число процессов. None -- по числу ядер процессора.
+	options : dict
+		Остальные аргументы функции run_config.
+
+	Возвращаемое значение:
+	----------
+	int : Число выполненных симуляций.
+	'''
+	for name in grid:
+		if name not in PARAMETERS:
+			raise ValueError('Неизвестный параметр: {0}'.format(name))
+	names = list(grid)
+	configs = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+	done = 0
+	with open(out, 'w', encoding='utf-8', newline='') as f, ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+		writer = csv.DictWriter(f, names + list(METRICS))
+		writer.writeheader()
+		futures = [executor.submit(run_config, params, **options) for params in configs]
+		for future in as_completed(futures):
+			writer.writerow(future.result())
+			f.flush()
+			done += 1
+			print('\r{0}/{1}'.format(done, len(configs)), end='', flush=True)
+	print()
+	return done
+
+
+
+if __name__ == '__main__':
+	''' Если скрипт запущен самостоятельно, то перебираем параметры и сохраняем таблицу.
+	'''
+	parser = argparse.ArgumentParser(description='Перебор параметров симуляции World of Doo.')
+	parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2', help='значения параметра: ' + ', '.join(PARAMETERS))
+	parser.add_argument('--builds', type=int, default=20, help='число построек')
+	parser.add_argument('--settle-steps', type=int, default=60, help='число шагов после каждой постройки')
+	parser.add_argument('--rest-steps', type=int, default=1200, help='наибольшее число шагов до успокоения башни')
+	parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию -- число ядер)')
+	parser.add_argument('--out', default='sweep.csv', help='файл для таблицы результатов')
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	count = sweep(parse_grid(args.set), args.out, args.workers, builds=args.builds, settle_steps=args.settle_steps, rest_steps=args.rest_steps)
+	print('{0} симуляций за {1:.1f} с, результаты в {2}'.format(count, time.perf_counter() - start, args.out))
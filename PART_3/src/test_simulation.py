@@ -0,0 +1,162 @@
+''' Проверки симуляции: воспроизведение записей, пул Ду, цикл с фиксированным шагом и автоматический строитель
+(запуск: python -m pytest -q из папки src).
+
+	- запись игры воспроизводится без расхождений (контрольные суммы каждого шага и финальный снимок);
+	- симуляция с пулом Ду идет бит в бит так же, как симуляция без пула (Ду из пула ведет себя как новый);
+	- FixedStepLoop не теряет и не придумывает время: шаги, остаток и выброшенное время в сумме дают время кадров;
+	- Planner.build(n) на стандартном уровне выполняет все n построек (проверка и постройка достраивают одну и ту же пару узлов).
+'''
+import pymunk as pm
+import pytest
+# Импортируем класс FixedStepLoop из файла fixed_step
+from fixed_step import FixedStepLoop
+# Импортируем класс HeadlessGame из файла headless
+from headless import HeadlessGame
+# Импортируем функцию generate_level из файла level
+from level import generate_level
+# Импортируем класс Recorder и функции для воспроизведения из файла replay
+from replay import Recorder, load_recording, replay, state_checksum
+# Импортируем функцию save_state из файла snapshot
+from snapshot import save_state
+# Импортируем функции для выбора места постройки из файла sweep
+from sweep import build_target, top_edge
+
+
+def play(control, simulation, builds=4, settle_steps=30):
+	''' Функция, играющая за игрока: строит башню вверх, разбрасывает свободных Ду, отменяет постройку,
+	сохраняет и восстанавливает снимок и перезапускает игру. Все вызовы идут через control (Simulation или Recorder).
+
+	Аргументы:
+	----------
+	control : Simulation или Recorder
+		Объект, через который вызываются handle_input и step.
+	simulation : Simulation
+		Симуляция (из неё берется граф башни для выбора места постройки).
+	builds : int
+		Число построек.
+	settle_steps : int
+		Число шагов после каждого действия.
+	'''
+	def wait(steps=settle_steps):
+		for i in range(steps):
+			control.step()
+
+	for i in range(builds):
+		target = build_target(*top_edge(simulation.graph))
+		control.handle_input(target, ['create'])
+		control.handle_input(target, ['pick'])
+		control.step()
+		control.handle_input(target, ['release'])
+		wait()
+		if i == 1:
+			control.handle_input(target, ['save'])
+	for x in range(40, 360, 40):
+		control.handle_input((x, 100), ['create'])
+	wait()
+	control.handle_input((0, 0), ['undo'])
+	wait()
+	control.handle_input((0, 0), ['load'])
+	wait()
+	control.handle_input((0, 0), ['restart'])
+	for x in range(60, 360, 60):
+		control.handle_input((x, 150), ['create'])
+	wait()
+
+
+@pytest.mark.parametrize('break_strain', [None, 0.1])
+def test_record_replay(tmp_path, break_strain):
+	''' Запись игры (с разрывом пружин и без) воспроизводится без расхождений.
+	'''
+	simulation = HeadlessGame().simulation
+	if break_strain is not None:
+		stress = pytest.importorskip('stress')
+		simulation.stress = stress.StressAnalyzer(simulation, break_strain)
+	recorder = Recorder(simulation)
+	play(recorder, simulation)
+	path = str(tmp_path / 'session.rec')
+	recorder.save(path)
+	recording = load_recording(path)
+	assert recording.break_strain == break_strain
+	result = replay(recording)
+	assert result.diverged_step is None
+	assert result.steps == recorder.steps
+	assert result.identical
+
+
+def test_record_replay_streamed_level(tmp_path):
+	''' Запись игры на уровне, подгружаемом по регионам: подгрузки записываются и повторяются в тех же шагах.
+	'''
+	level = generate_level(300, width=1200, seed=4)
+	simulation = HeadlessGame(level=level, lazy_level=True).simulation
+	recorder = Recorder(simulation)
+	for x in range(0, level.width, 200):
+		recorder.stream_level(pm.BB(x, 0, x + 400, level.height))
+		for i in range(10):
+			recorder.step()
+	recorder.handle_input((200, 100), ['create'])
+	for i in range(30):
+		recorder.step()
+	path = str(tmp_path / 'streamed.rec')
+	recorder.save(path)
+	recording = load_recording(path)
+	assert recording.lazy_level
+	assert recording.level.to_bytes() == level.to_bytes()
+	result = replay(recording)
+	assert result.diverged_step is None
+	assert result.identical
+
+
+def test_pool_matches_new_doos():
+	''' Симуляция, берущая Ду из пула (после перезапуска и восстановления снимков), идет бит в бит так же,
+	как симуляция, создающая всех Ду заново (пул выключен).
+	'''
+	pooled = HeadlessGame().simulation
+	fresh = HeadlessGame().simulation
+	fresh.shape_creator.pool.capacity = 0
+	play(pooled, pooled)
+	play(fresh, fresh)
+	assert pooled.shape_creator.pool.hits > 0
+	assert fresh.shape_creator.pool.hits == 0
+	assert state_checksum(pooled.space) == state_checksum(fresh.space)
+	assert save_state(pooled) == save_state(fresh)
+
+
+def test_fixed_step_loop():
+	''' Число шагов, остаток и выброшенное время согласованы со временем кадров.
+	'''
+	loop = FixedStepLoop(physics_rate=60, max_substeps=5)
+	assert loop.advance(1/60) == 1
+	assert loop.advance(0.5/60) == 0
+	assert loop.alpha == pytest.approx(0.5)
+	assert loop.advance(0.5/60) == 1
+	# Слишком долгий кадр: не больше max_substeps шагов, остальные целые шаги выбрасываются.
+	assert loop.advance(1.0) == 5
+	assert 0 <= loop.accumulator < loop.dt
+	assert loop.dropped_time > 0
+	total = 0.0
+	steps = 0
+	loop = FixedStepLoop(physics_rate=60, max_substeps=5)
+	for frame_time in [0.007, 0.016, 0.033, 0.25, 0.001, 0.02] * 10:
+		total += frame_time
+		steps += loop.advance(frame_time)
+		assert 0 <= loop.accumulator < loop.dt
+	assert steps * loop.dt + loop.accumulator + loop.dropped_time == pytest.approx(total)
+
+
+def test_planner_builds():
+	''' Автоматический строитель на стандартном уровне выполняет все заказанные постройки.
+	'''
+	pytest.importorskip('numpy')
+	# Импортируем класс Planner из файла planner (нужен NumPy)
+	from planner import Planner
+	simulation = HeadlessGame().simulation
+	nodes = len(simulation.graph)
+	planner = Planner(simulation, workers=0, rollout_time=0.3, max_candidates=8)
+	try:
+		# С settle_steps по умолчанию (30) пара узлов при проверке менялась местами, и строитель останавливался после 2 построек.
+		built = planner.build(6)
+	finally:
+		planner.close()
+	assert built == 6
+	assert len(simulation.graph) >= nodes + 6
+	assert len(planner.decision_times) == 6
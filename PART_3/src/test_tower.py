@@ -0,0 +1,154 @@
+''' Проверки графа башни, снимков и уровней (запуск: python -m pytest -q из папки src).
+
+	- компоненты связности (класс Connectivity) сравниваются с обычным обходом в ширину при случайном удалении ребер и узлов;
+	- снимок после восстановления сохраняется в те же байты (save_state -> load_state -> save_state);
+	- уровень после записи в файл и чтения сохраняется в те же байты (save_level -> load_level) в обоих форматах.
+'''
+import random
+from collections import deque
+import pymunk as pm
+import pytest
+# Импортируем класс HeadlessGame из файла headless
+from headless import HeadlessGame
+# Импортируем функции для работы с уровнями из файла level
+from level import capture_level, generate_level, load_level, save_level
+# Импортируем функции save_state и load_state из файла snapshot
+from snapshot import save_state, load_state
+# Импортируем функцию build_tower из файла sweep
+from sweep import build_tower
+
+
+def reachable(graph, start):
+	''' Функция, возвращающая узлы, достижимые из start обходом в ширину по словарям соседей графа.
+
+	Аргументы:
+	----------
+	graph : Graph
+		Граф башни.
+	start : iterable
+		Начальные узлы.
+
+	Возвращаемое значение:
+	----------
+	set : Узлы.
+	'''
+	seen = set(start)
+	queue = deque(seen)
+	while queue:
+		for neighbour in graph[queue.popleft()]:
+			if neighbour not in seen:
+				seen.add(neighbour)
+				queue.append(neighbour)
+	return seen
+
+
+def components(graph):
+	''' Функция, возвращающая компоненты связности графа, найденные обходом в ширину.
+
+	Возвращаемое значение:
+	----------
+	list : Множества узлов.
+	'''
+	found = []
+	seen = set()
+	for node in graph:
+		if node not in seen:
+			part = reachable(graph, [node])
+			seen |= part
+			found.append(part)
+	return found
+
+
+def build(builds=6, settle_steps=30):
+	''' Функция, создающая симуляцию со стандартным уровнем и построенной над ним башней.
+
+	Возвращаемое значение:
+	----------
+	Simulation : Симуляция.
+	'''
+	simulation = HeadlessGame().simulation
+	build_tower(simulation, builds, settle_steps, lambda: None)
+	return simulation
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_connectivity_matches_bfs(seed):
+	''' Удаляем случайные ребра (и иногда узлы) и после каждого удаления сравниваем компоненты с обходом в ширину.
+	'''
+	rnd = random.Random(seed)
+	graph = HeadlessGame(level=generate_level(120, width=600, seed=seed)).simulation.graph
+	assert graph.base
+	edges = [(a, b) for a in graph for b in graph[a] if a.order < b.order]
+	rnd.shuffle(edges)
+	for a, b in edges:
+		if a not in graph or b not in graph or b not in graph[a]:
+			continue
+		if rnd.random() < 0.1:
+			neighbours = list(graph[a])
+			parts = graph.remove_node(a)
+			assert len(parts) == len({frozenset(reachable(graph, [node])) for node in neighbours}) - 1
+			for part in parts:
+				assert part == reachable(graph, [next(iter(part))])
+		else:
+			split = graph.remove_edge(a, b)
+			if b in reachable(graph, [a]):
+				assert split == set()
+			else:
+				assert split in (reachable(graph, [a]), reachable(graph, [b]))
+		expected = components(graph)
+		assert sorted(map(len, graph.connectivity.members.values())) == sorted(map(len, expected))
+		for part in expected:
+			assert len({graph.connectivity.component[node] for node in part}) == 1
+		grounded = reachable(graph, graph.base)
+		for node in graph:
+			assert graph.is_grounded(node) == (node in grounded)
+		detached = graph.detached()
+		assert set().union(*detached) == set(graph) - grounded
+		assert all(part in expected for part in detached)
+
+
+def test_snapshot_round_trip():
+	''' Снимок восстановленной симуляции совпадает с исходным снимком байт в байт, в том числе в новой симуляции.
+	'''
+	simulation = build()
+	data = save_state(simulation)
+	load_state(simulation, data)
+	assert save_state(simulation) == data
+	other = HeadlessGame().simulation
+	load_state(other, data)
+	assert save_state(other) == data
+	assert len(other.space.constraints) == len(other.graph.springs())
+
+
+def test_snapshot_round_trip_lazy_level():
+	''' То же для уровня, подгружаемого по регионам: в снимке хранятся загруженные регионы и номера узлов уровня.
+	'''
+	simulation = HeadlessGame(level=generate_level(300, seed=3), lazy_level=True).simulation
+	simulation.stream_level(pm.BB(0, 0, 800, simulation.level.height))
+	for i in range(10):
+		simulation.step()
+	data = save_state(simulation)
+	load_state(simulation, data)
+	assert save_state(simulation) == data
+	simulation.stream_level(pm.BB(0, 0, simulation.level.width, simulation.level.height))
+	assert len(simulation.graph) == len(simulation.level.nodes)
+
+
+@pytest.mark.parametrize('name', ['tower.level', 'tower.json'])
+@pytest.mark.parametrize('region_size', [None, 200])
+def test_level_round_trip(tmp_path, name, region_size):
+	''' Уровень, записанный в файл и прочитанный обратно, совпадает с исходным (и снова записывается в те же байты).
+	'''
+	level = capture_level(build(), region_size)
+	path = str(tmp_path / name)
+	save_level(level, path)
+	loaded = load_level(path)
+	assert loaded.to_dict() == level.to_dict()
+	assert loaded.to_bytes() == level.to_bytes()
+	again = str(tmp_path / ('again_' + name))
+	save_level(loaded, again)
+	with open(path, 'rb') as f, open(again, 'rb') as g:
+		assert f.read() == g.read()
+	# Уровень загружается в симуляцию и снова сохраняется без изменений.
+	simulation = HeadlessGame(level=loaded).simulation
+	assert capture_level(simulation, region_size).to_bytes() == level.to_bytes()
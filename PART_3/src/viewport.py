@@ -0,0 +1,160 @@
+import pymunk as pm
+
+
+class Viewport():
+	''' Класс, описывающий видимую на экране часть игровой области (камеру с прокруткой и масштабом).
+
+	Игровая область может быть больше окна игры. Тогда на экране видна только её часть: прямоугольник,
+	левый верхний угол которого находится в точке (x, y) пространства симуляции, а размер равен размеру экрана, деленному на zoom.
+	Точка пространства симуляции (px, py) отображается в точку экрана ((px - x)*zoom, (py - y)*zoom).
+
+	Масштаб меняется ступенями (в zoom_step раз), поэтому спрайтов разного размера получается немного (см. DooRenderer.sprite).
+	Камера не выходит за левую, правую и нижнюю границы игровой области. Вверх её можно прокручивать без ограничений,
+	потому что башня растет вверх и может подняться выше игровой области.
+
+	Аргументы:
+	----------
+	width : int
+		Ширина экрана в пикселях.
+	height : int
+		Высота экрана в пикселях.
+	level_width : int
+		Ширина игровой области в пикселях.
+	level_height : int
+		Высота игровой области в пикселях.
+
+	Атрибуты:
+	----------
+	width : int
+		Ширина экрана в пикселях.
+	height : int
+		Высота экрана в пикселях.
+	level_width : int
+		Ширина игровой области в пикселях.
+	level_height : int
+		Высота игровой области в пикселях.
+	x : float
+		Координата X левого верхнего угла видимой части в пространстве симуляции.
+	y : float
+		Координата Y левого верхнего угла видимой части в пространстве симуляции.
+	zoom : float
+		Масштаб: сколько пикселей экрана приходится на один пиксель пространства симуляции.
+	zoom_step : float
+		Во сколько раз меняется масштаб за один шаг.
+	min_zoom : float
+		Наименьший масштаб.
+	max_zoom : float
+		Наибольший масштаб.
+	pan_speed : float
+		Скорость прокрутки клавишами в [пиксели экрана/секунда].
+	'''
+	def __init__(self, width, height, level_width, level_height):
+		self.width 			= width
+		self.height 		= height
+		self.level_width 	= level_width
+		self.level_height 	= level_height
+		self.x 				= 0.0
+		self.y 				= 0.0
+		self.zoom 			= 1.0
+		self.zoom_step 		= 1.25
+		self.min_zoom 		= 1.25**-6
+		self.max_zoom 		= 1.25**4
+		self.pan_speed 		= 600
+		self.look_at(level_width/2, level_height)
+
+
+	@property
+	def key(self):
+		''' Положение и масштаб камеры. Если они не изменились, то не изменилась и картинка неподвижных объектов.
+		'''
+		return (self.x, self.y, self.zoom)
+
+	def world_to_screen(self, x, y):
+		''' Метод, переводящий координаты пространства симуляции в координаты экрана.
+		'''
+		return (x - self.x)*self.zoom, (y - self.y)*self.zoom
+
+	def screen_to_world(self, position):
+		''' Метод, переводящий координаты экрана (например, курсора мыши) в координаты пространства симуляции.
+
+		Аргументы:
+		----------
+		position : tuple
+			Координаты точки экрана.
+
+		Возвращаемое значение:
+		----------
+		tuple : Координаты точки в пространстве симуляции.
+		'''
+		return self.x + position[0]/self.zoom, self.y + position[1]/self.zoom
+
+	def bb(self, margin=0):
+		''' Метод, возвращающий видимую часть игровой области, расширенную на margin во все стороны.
+
+		Аргументы:
+		----------
+		margin : float
+			Запас в пикселях пространства симуляции.
+
+		Возвращаемое значение:
+		----------
+		pymunk.BB : Прямоугольник в координатах пространства симуляции (для space.bb_query).
+		'''
+		return pm.BB(self.x - margin, self.y - margin, self.x + self.width/self.zoom + margin, self.y + self.height/self.zoom + margin)
+
+	def look_at(self, x, y):
+		''' Метод, ставящий камеру так, чтобы точка (x, y) была в середине нижнего края экрана (насколько позволяют границы).
+
+		Аргументы:
+		----------
+		x : float
+			Координата X точки в пространстве симуляции.
+		y : float
+			Координата Y точки в пространстве симуляции.
+		'''
+		self.x = x - self.width/self.zoom/2
+		self.y = y - self.height/self.zoom
+		self.clamp()
+
+	def pan(self, dx, dy):
+		''' Метод для прокрутки камеры.
+
+		Аргументы:
+		----------
+		dx : float
+			Сдвиг по оси X в пикселях экрана.
+		dy : float
+			Сдвиг по оси Y в пикселях экрана.
+		'''
+		self.x += dx/self.zoom
+		self.y += dy/self.zoom
+		self.clamp()
+
+	def zoom_at(self, position, steps):
+		''' Метод для изменения масштаба. Точка пространства симуляции под position остается на месте.
+
+		Аргументы:
+		----------
+		position : tuple
+			Координаты точки экрана (например, курсора мыши).
+		steps : int
+			Число шагов масштаба: больше нуля -- приближение, меньше нуля -- отдаление.
+		'''
+		x, y = self.screen_to_world(position)
+		self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * self.zoom_step**steps))
+		self.x = x - position[0]/self.zoom
+		self.y = y - position[1]/self.zoom
+		self.clamp()
+
+	def clamp(self):
+		''' Метод, возвращающий камеру в границы игровой области (слева, справа и снизу).
+
+		Если видимая часть шире игровой области, то игровая область располагается посередине экрана.
+		'''
+		view_width = self.width/self.zoom
+		view_height = self.height/self.zoom
+		if view_width >= self.level_width:
+			self.x = (self.level_width - view_width)/2
+		else:
+			self.x = min(max(self.x, 0.0), self.level_width - view_width)
+		self.y = min(self.y, self.level_height - view_height)
@@ -1,57 +1,68 @@
 import pygame as pg
-import pymunk as pm
-from pymunk.pygame_util import to_pygame
-import math	# Нужен квадратный корень при нахождении расстояний.
+# Импортируем класс WorldState из файла world_state. В нем находится вся игровая логика, не связанная с отображением.
+from world_state import WorldState
 
 
-class World(pg.Surface):
+class World(pg.Surface, WorldState):
 	''' Класс, регулирующий игровой процесс и служащий для отображения всей игровой области. Также содержит вспомогательные методы.
 
-	Этот класс является модификацией класса pg.Surface.
+	Этот класс является модификацией классов pg.Surface и WorldState.
 	Мы не создаем класс с нуля, чтобы использовать возможность отображения на объекте класса World чего-либо. 
 	При этом мы добавляем необходимые нам атрибуты и методы, сохраняя атрибуты и методы родительского класса.
+	Игровая логика (захват, перемещение и отпускание Ду, расстояния, столкновения) находится в классе WorldState.
+
+	Игровая область может быть больше экрана (level_width и level_height). Тогда поверхность World имеет размер экрана,
+	и на ней рисуется только видимая часть игровой области (см. атрибут viewport и класс Viewport).
 
 	Аргументы:
 	----------
 	width : int
-		Ширина игровой области в пикселях.
+		Ширина поверхности (экрана) в пикселях.
 	height : int
-		Высота игровой области в пикселях.
+		Высота поверхности (экрана) в пикселях.
 	camera : pygame.Surface
 		Экран игры, на который будем отображать игровую область.
 	color : list или tuple
 		Фоновый цвет игровой области в формате RGB.
+	level_width : int или None
+		Ширина игровой области в пикселях. Если None, то равна ширине экрана.
+	level_height : int или None
+		Высота игровой области в пикселях. Если None, то равна высоте экрана.
 
 	Атрибуты: (добавленные и переопределенные в классе World)
 	----------
-	width : int
-		Ширина игровой области в пикселях.
-	height : int
-		Высота игровой области в пикселях.
 	camera : pygame.Surface
 		Экран игры, на который будем отображать игровую область.
 	color : list или tuple
 		Фоновый цвет игровой области в формате RGB.
-	free_doos : list
-		Список, содержащий всех свободных Ду в игре.
-	free_doo_under_cursor : None or DooFree
-		Переменная для хранения свободного Ду, находящегося под курсором мыши в данный момент.
-	shape_being_dragged : None or DooFree
-		Переменная для хранения свободного Ду, схваченного игроком при нажатии ЛКМ. Значение None означает, что никакой свободный Ду не был схвачен.
-	ground_y : int
-		Значение Y в пикселях, которое соответствует уровню земли (пола). Y отсчитывается от верха поверхности world.
+	track_dirty : bool
+		Если True, то на экран копируются только изменившиеся области (dirty rects), а не вся игровая область.
+	full_redraw : bool
+		Если True, то в этом кадре игровая область перерисовывается и копируется на экран целиком (например, в первом кадре).
+	dirty_rects : list
+		Области (pygame.Rect), на которых что-то было нарисовано в этом кадре.
+	previous_rects : list
+		Области, на которых что-то было нарисовано в прошлом кадре. В этом кадре их нужно стереть.
+	max_dirty_rects : int
+		Если изменившихся областей больше, то проще скопировать на экран всю игровую область.
+	viewport : Viewport или None
+		Видимая часть игровой области. Если None, то игровая область совпадает с экраном.
+	Остальные атрибуты описаны в классе WorldState (width и height в нем -- размеры игровой области, а не экрана).
 	'''
 
-	def __init__(self, width, height, camera, color=[250,250,250]):
-		super().__init__([width, height])
-		self.width 					= width
-		self.height 				= height
+	def __init__(self, width, height, camera, color=[250,250,250], level_width=None, level_height=None):
+		# Родительских классов два, поэтому вызываем их методы __init__() явно.
+		# Поверхность создаем в формате пикселей экрана (как после convert), чтобы копирование на экран не преобразовывало пиксели.
+		pg.Surface.__init__(self, [width, height], 0, camera)
+		WorldState.__init__(self, level_width or width, level_height or height)
 		self.camera 				= camera
 		self.color 					= color
-		self.free_doos 				= []
-		self.free_doo_under_cursor 	= None
-		self.shape_being_dragged 	= None
-		self.ground_y 				= self.height - 10
+		self.track_dirty 			= True
+		self.full_redraw 			= True
+		self.dirty_rects 			= []
+		self.previous_rects 		= []
+		self.max_dirty_rects 		= 200
+		self.viewport 				= None
 
 
 	def fill_me(self):
@@ -61,92 +72,46 @@ class World(pg.Surface):
 
 	def blit_me(self):
 		''' Метод для отображения игровой области на экране (= поверхность camera).
-		'''
-		self.camera.blit(self, [0,0])
-
-	def find_free_doo_under_cursor(self, space, mouse_pos):
-		''' Метод, определяющий, находится ли свободный Ду под курсором мыши в данный момент.
 
-		Находим ближайший к позиции мыши объект с помощью метода point_query_nearest объекта space.
-		Этот метод принимает следующие аргументы:
-			mouse_pos - некоторая точка, относительно которой будет производиться поиск объекта, в данной ситуации это координаты курсора мыши.
-			0 - радиус, в котором ищутся объекты класса Shape относительно указанной точки. 0 означает, что возвращаемый объект должен находиться прямо под курсором мыши.
-		Метод возвращает объект класса PointQueryInfo.
-		В атрибуте shape этого объекта содержится ссылка на найденный объект Shape (если что-то было возвращено).
-		Для объекта shape мы можем проверить атрибут collision_type.
-		Если он равен 0, то под курсором оказался свободный Ду.
-		Этого Ду сохраняем в переменную free_doo_under_cursor, чтобы потом его перемещать.
+		Если включено отслеживание изменившихся областей (track_dirty), то копируем на экран только области,
+		где что-то нарисовано в этом кадре (dirty_rects) или было нарисовано в прошлом кадре (previous_rects, теперь там фон).
+		Иначе копируем всю игровую область.
+		Возвращаемый список областей нужно передать в pg.display.update вместо вызова pg.display.flip.
 
-		Аргументы:
+		Возвращаемое значение:
 		----------
-		space : pymunk.Space
-			Пространство симуляции, в котором находится искомый свободный Ду.
-		mouse_pos : tuple или list
-			Координаты курсора мыши. Ищем свободного Ду, которых находится под курсором мыши.
+		list : Области экрана, которые нужно обновить.
 		'''
-		self.free_doo_under_cursor = None
-		query_info = space.point_query_nearest(mouse_pos, 0, pm.ShapeFilter())
-		if query_info != None:
-			if query_info.shape.collision_type == 0:
-				self.free_doo_under_cursor = query_info.shape
-				
-	def pick_free_doo(self):
-		""" Метод, отвечающий за захват свободного Ду при нажатии на него ЛКМ.
-	
-		Если под курсором находится свободный Ду сохраняем его в переменную shape_being_dragged.
-		"""
-		if self.free_doo_under_cursor != None:
-				self.shape_being_dragged = self.free_doo_under_cursor
-
-	def release_picked_doo(self, graph, shape_creator):
-		''' Метод описывающий, что происходит со схваченным Ду при отпускании ЛКМ.
-
-		Если для схваченного Ду есть подходящие фиксированные Ду в башне, то достраиваем башню.
-		Иначе просто отпускаем схваченного Ду и убираем free_doo_under_cursor, иначе будет баг при строительстве.
+		rects = self.previous_rects + self.dirty_rects
+		if not self.track_dirty or self.full_redraw or len(rects) > self.max_dirty_rects:
+			self.camera.blit(self, [0,0])
+			rects = [self.get_rect()]
+		else:
+			self.camera.blits([(self, rect, rect) for rect in rects], False)
+		self.previous_rects = self.dirty_rects
+		self.dirty_rects = []
+		self.full_redraw = False
+		return rects
+
+	def to_screen(self, position):
+		''' Метод, переводящий точку пространства симуляции в координаты поверхности world (с учетом viewport).
 
 		Аргументы:
 		----------
-		graph : Graph
-			Башня из фиксированных Ду.
-		shape_creator : ShapeCreator
-			Используем метод для строительства башни данного объекта.
-		'''
-		if self.shape_being_dragged is not None:
-			if len(graph.fixed_doo_for_build)==2:
-				shape_creator.build(graph)
-			self.shape_being_dragged = None
-
-	def move_picked_doo(self, mouse_pos):
-		''' Метод, отвечающий за перемещение схваченного Ду.
-
-		Если курсор ниже уровня пола, то отпускаем схваченного Ду. 
-		Это не даст игроку затолкать Ду под пол и позволит избежать ошибок при строительстве.
-		Если курсор выше уровня пола, то ТЕЛЕПОРТИРУЕМ схваченного Ду в позицию курсора мыши.
-		При этом важно обнулить скорость Ду, иначе он не будет следовать за курсором, а будет биться в конвульсиях, набирая очень большую скорость.
-
-		# ПРИМЕЧАНИЕ
-		В документации Chipmunk написано, что лучше избегать таких ТЕЛЕПОРТАЦИЙ для динамических тел.
-		Автор физического движка предлагает использовать для перетаскивания динамических тел объекты constraints.
-		Но код для ТЕЛЕПОРТАЦИЙ очень прост и вроде работает без ошибок, поэтому я оставил так.
-		
-		Аргументы:
+		position : pymunk.Vec2d или tuple
+			Точка пространства симуляции.
+
+		Возвращаемое значение:
 		----------
-		mouse_pos : tuple или list
-			Координаты курсора мыши.
+		tuple : Координаты точки на поверхности world.
 		'''
-		if self.shape_being_dragged != None:
-			if mouse_pos[1] < self.ground_y:
-				self.shape_being_dragged.body.position = mouse_pos
-				self.shape_being_dragged.body.velocity = 0,0
-			else:
-				self.shape_being_dragged = None
+		if self.viewport is None:
+			return int(position[0]), int(position[1])
+		return self.viewport.world_to_screen(position[0], position[1])
 
 	def draw_circle(self, r=12, width=1):
 		''' Метод для рисования окружности около Ду, находящегося под курсором мыши.
 
-		Перед рисованием находим координаты центра Ду в координатной системе поверхности world.
-		Так как окружность рисуем именно на этой поверхности.
-
 		Аргументы:
 		----------
 		r : int
@@ -155,61 +120,64 @@ class World(pg.Surface):
 			Толщина окружности в пикселях.
 		'''
 		if self.free_doo_under_cursor != None:
-			doo_center = to_pygame(self.free_doo_under_cursor.body.position, self)
-			pg.draw.circle(self, [200,0,0], doo_center, r, width)
+			position = self.free_doo_under_cursor.body.position
+			self.draw_circle_at((position.x, position.y), r, width)
+
+	def draw_circle_at(self, position, r=12, width=1):
+		''' Метод для рисования окружности около точки пространства симуляции (например, Ду из снимка кадра, см. модуль physics_thread).
 
-	def distance_between_bodies(self, b1, b2):
-		""" Метод для нахождения расстояния между двумя телами.
+		Перед рисованием находим координаты точки в координатной системе поверхности world.
+		Так как окружность рисуем именно на этой поверхности.
 
 		Аргументы:
 		----------
-		b1 : pymunk.Body
-			Первое тело.
-		b2 : pymunk.Body
-			Второе тело.
+		position : tuple или None
+			Точка пространства симуляции. None -- ничего не рисуем.
+		r : int
+			Радиус окружности в пикселях.
+		width : int
+			Толщина окружности в пикселях.
+		'''
+		if position is not None:
+			self.dirty_rects.append(pg.draw.circle(self, [200,0,0], self.to_screen(position), r, width))
 
-		Возвращаемое значение:
-		----------
-		float : Расстояние между двумя телами.
-		"""
-		dx = b1.position.x - b2.position.x
-		dy = b1.position.y - b2.position.y
-		return math.sqrt(dx*dx + dy*dy)
-
-	def collide_doo_with_doo(self, arbiter, space, data):
-		''' Метод описывающий поведение свободных Ду при их столкновении друг с другом.
-		
-		False означает, что объекты проходят сквозь друг друга без взаимодействия.
-		По умолчанию возвращается True и объекты сталкиваются друг с другом.
+	def draw_build_hint(self, graph, r=8, linewidth=1):
+		''' Метод для рисования подсказки на экране во время строительства.
 
-		Аргументы:
-		----------
-		Требует CollisionHandler, хотя в самом методе аргументы не используются. Без них выдает ошибку.
+		Точки подсказки находит метод build_hint класса WorldState, рисует их метод draw_hint.
 
-		Возвращаемое значение:
+		Аргументы:
 		----------
-		False
+		graph : Graph
+			Объект, который даст нам доступ к фиксированным Ду, подходящим для строительства.
+		r : int
+			Радиус рисуемого круга.
 		'''
-		return False
+		self.draw_hint(self.build_hint(graph), r, linewidth)
 
-	def draw_build_hint(self, graph, r=8, linewidth=1):
-		''' Метод для рисования подсказки на экране во время строительства.
+	def draw_hint(self, hint, r=8, linewidth=1):
+		''' Метод для рисования точек подсказки для строительства.
 
 		Подсказка разная для двух случаев (аналогичны случаям при строительстве, см. метод build в ShapeCreator):
 		Если подходящие для строительства узлы не соседи друг другу, то рисуем линию между ними.
 		Если подходящие для строительства узлы соседи друг другу, то рисуем круг, там где будет новый узел, и 2 линии.
-		
+		Нарисованные области запоминаем в dirty_rects.
+
 		Аргументы:
 		----------
-		graph : Graph
-			Объект, который даст нам доступ к фиксированным Ду, подходящим для строительства.
+		hint : tuple или None
+			Точки подсказки (см. метод WorldState.build_hint). None -- ничего не рисуем.
 		r : int
 			Радиус рисуемого круга.
+		linewidth : int
+			Толщина линий.
 		'''
-		if len(graph.fixed_doo_for_build) == 2:
-			if graph.fixed_doo_for_build[0] in graph[graph.fixed_doo_for_build[1]]:
-				pg.draw.line(self, (0, 200, 0), to_pygame(graph.fixed_doo_for_build[0].body.position, self), to_pygame(self.shape_being_dragged.body.position, self), linewidth)
-				pg.draw.line(self, (0, 200, 0), to_pygame(graph.fixed_doo_for_build[1].body.position, self), to_pygame(self.shape_being_dragged.body.position, self), linewidth)
-				pg.draw.circle(self, (0, 200, 0), to_pygame(self.shape_being_dragged.body.position, self), r)
-			else:
-				pg.draw.line(self, (0, 200, 0), to_pygame(graph.fixed_doo_for_build[0].body.position, self), to_pygame(graph.fixed_doo_for_build[1].body.position, self))
+		if hint is None:
+			return
+		points = [self.to_screen(point) for point in hint]
+		if len(points) == 3:
+			self.dirty_rects.append(pg.draw.line(self, (0, 200, 0), points[0], points[2], linewidth))
+			self.dirty_rects.append(pg.draw.line(self, (0, 200, 0), points[1], points[2], linewidth))
+			self.dirty_rects.append(pg.draw.circle(self, (0, 200, 0), points[2], r))
+		else:
+			self.dirty_rects.append(pg.draw.line(self, (0, 200, 0), points[0], points[1]))
@@ -0,0 +1,180 @@
+import pymunk as pm
+import math	# Нужен квадратный корень при нахождении расстояний.
+# Импортируем класс DooList из файла doo_list
+from doo_list import DooList
+
+
+class WorldState():
+	''' Класс, регулирующий игровой процесс без отображения чего-либо на экране. Также содержит вспомогательные методы.
+
+	Этот класс не зависит от pygame, поэтому его можно использовать на серверах без дисплея (см. модуль headless).
+	Класс World наследует от него всю игровую логику и добавляет к ней отображение.
+
+	Аргументы:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+
+	Атрибуты:
+	----------
+	width : int
+		Ширина игровой области в пикселях.
+	height : int
+		Высота игровой области в пикселях.
+	free_doos : DooList
+		Список, содержащий всех свободных Ду в игре. Добавление и удаление Ду выполняются за O(1).
+	free_doo_under_cursor : None or DooFree
+		Переменная для хранения свободного Ду, находящегося под курсором мыши в данный момент.
+	shape_being_dragged : None or DooFree
+		Переменная для хранения свободного Ду, схваченного игроком при нажатии ЛКМ. Значение None означает, что никакой свободный Ду не был схвачен.
+	ground_y : int
+		Значение Y в пикселях, которое соответствует уровню земли (пола). Y отсчитывается от верха игровой области.
+	'''
+
+	def __init__(self, width, height):
+		self.width 					= width
+		self.height 				= height
+		self.free_doos 				= DooList()
+		self.free_doo_under_cursor 	= None
+		self.shape_being_dragged 	= None
+		self.ground_y 				= self.height - 10
+
+
+	def find_free_doo_under_cursor(self, space, mouse_pos):
+		''' Метод, определяющий, находится ли свободный Ду под курсором мыши в данный момент.
+
+		Находим ближайший к позиции мыши объект с помощью метода point_query_nearest объекта space.
+		Этот метод принимает следующие аргументы:
+			mouse_pos - некоторая точка, относительно которой будет производиться поиск объекта, в данной ситуации это координаты курсора мыши.
+			0 - радиус, в котором ищутся объекты класса Shape относительно указанной точки. 0 означает, что возвращаемый объект должен находиться прямо под курсором мыши.
+		Метод возвращает объект класса PointQueryInfo.
+		В атрибуте shape этого объекта содержится ссылка на найденный объект Shape (если что-то было возвращено).
+		Для объекта shape мы можем проверить атрибут collision_type.
+		Если он равен 0, то под курсором оказался свободный Ду.
+		Этого Ду сохраняем в переменную free_doo_under_cursor, чтобы потом его перемещать.
+
+		Аргументы:
+		----------
+		space : pymunk.Space
+			Пространство симуляции, в котором находится искомый свободный Ду.
+		mouse_pos : tuple или list
+			Координаты курсора мыши. Ищем свободного Ду, которых находится под курсором мыши.
+		'''
+		self.free_doo_under_cursor = None
+		query_info = space.point_query_nearest(mouse_pos, 0, pm.ShapeFilter())
+		if query_info != None:
+			if query_info.shape.collision_type == 0:
+				self.free_doo_under_cursor = query_info.shape
+
+	def pick_free_doo(self):
+		""" Метод, отвечающий за захват свободного Ду при нажатии на него ЛКМ.
+
+		Если под курсором находится свободный Ду сохраняем его в переменную shape_being_dragged.
+		"""
+		if self.free_doo_under_cursor != None:
+				self.shape_being_dragged = self.free_doo_under_cursor
+
+	def release_picked_doo(self, graph, shape_creator):
+		''' Метод описывающий, что происходит со схваченным Ду при отпускании ЛКМ.
+
+		Если для схваченного Ду есть подходящие фиксированные Ду в башне, то достраиваем башню.
+		Иначе просто отпускаем схваченного Ду и убираем free_doo_under_cursor, иначе будет баг при строительстве.
+
+		Аргументы:
+		----------
+		graph : Graph
+			Башня из фиксированных Ду.
+		shape_creator : ShapeCreator
+			Используем метод для строительства башни данного объекта.
+		'''
+		if self.shape_being_dragged is not None:
+			if len(graph.fixed_doo_for_build)==2:
+				shape_creator.build(graph)
+			self.shape_being_dragged = None
+
+	def move_picked_doo(self, mouse_pos):
+		''' Метод, отвечающий за перемещение схваченного Ду.
+
+		Если курсор ниже уровня пола, то отпускаем схваченного Ду.
+		Это не даст игроку затолкать Ду под пол и позволит избежать ошибок при строительстве.
+		Если курсор выше уровня пола, то ТЕЛЕПОРТИРУЕМ схваченного Ду в позицию курсора мыши.
+		При этом важно обнулить скорость Ду, иначе он не будет следовать за курсором, а будет биться в конвульсиях, набирая очень большую скорость.
+		Если включен режим сна (см. Simulation), то будим Ду: схваченный Ду мог уснуть на полу,
+		а изменение положения тело не будит, и после отпускания Ду повис бы в воздухе.
+
+		# ПРИМЕЧАНИЕ
+		В документации Chipmunk написано, что лучше избегать таких ТЕЛЕПОРТАЦИЙ для динамических тел.
+		Автор физического движка предлагает использовать для перетаскивания динамических тел объекты constraints.
+		Но код для ТЕЛЕПОРТАЦИЙ очень прост и вроде работает без ошибок, поэтому я оставил так.
+
+		Аргументы:
+		----------
+		mouse_pos : tuple или list
+			Координаты курсора мыши.
+		'''
+		if self.shape_being_dragged != None:
+			if mouse_pos[1] < self.ground_y:
+				self.shape_being_dragged.body.position = mouse_pos
+				self.shape_being_dragged.body.velocity = 0,0
+				self.shape_being_dragged.body.activate()
+			else:
+				self.shape_being_dragged = None
+
+	def build_hint(self, graph):
+		''' Метод, возвращающий точки подсказки для строительства (без рисования, см. метод World.draw_build_hint).
+
+		Если подходящие для строительства узлы соседи друг другу, то возвращаем их положения и положение схваченного Ду
+		(там будет новый узел). Если не соседи, то только положения узлов (между ними будет новая пружина).
+
+		Аргументы:
+		----------
+		graph : Graph
+			Башня из фиксированных Ду.
+
+		Возвращаемое значение:
+		----------
+		tuple или None : Точки (x, y) в пространстве симуляции. None -- подходящих узлов нет.
+		'''
+		if len(graph.fixed_doo_for_build) != 2:
+			return None
+		a, b = graph.fixed_doo_for_build
+		points = [a.body.position, b.body.position]
+		if a in graph[b]:
+			points.append(self.shape_being_dragged.body.position)
+		return tuple((point.x, point.y) for point in points)
+
+	def distance_between_bodies(self, b1, b2):
+		""" Метод для нахождения расстояния между двумя телами.
+
+		Аргументы:
+		----------
+		b1 : pymunk.Body
+			Первое тело.
+		b2 : pymunk.Body
+			Второе тело.
+
+		Возвращаемое значение:
+		----------
+		float : Расстояние между двумя телами.
+		"""
+		dx = b1.position.x - b2.position.x
+		dy = b1.position.y - b2.position.y
+		return math.sqrt(dx*dx + dy*dy)
+
+	def collide_doo_with_doo(self, arbiter, space, data):
+		''' Метод описывающий поведение свободных Ду при их столкновении друг с другом.
+
+		False означает, что объекты проходят сквозь друг друга без взаимодействия.
+		По умолчанию возвращается True и объекты сталкиваются друг с другом.
+
+		Аргументы:
+		----------
+		Требует CollisionHandler, хотя в самом методе аргументы не используются. Без них выдает ошибку.
+
+		Возвращаемое значение:
+		----------
+		False
+		'''
+		return False